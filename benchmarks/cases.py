@@ -0,0 +1,155 @@
+from dataclasses import dataclass, field
+from typing import Callable
+
+import numpy as np
+
+from kl_evolution.core.data_objects.serie import Serie
+from kl_evolution.core.features.kl_divergence import KLDivergence
+from kl_evolution.core.features.ts_analyzer import ShiftedSerieAnalyzer
+from kl_evolution.core.results_formatting.evaluation import ForecastEvaluation
+
+SERIE_LENGTHS = (10**3, 10**4, 10**5, 10**6, 10**7)
+QUICK_SERIE_LENGTHS = (10**3, 10**4, 10**5)
+HORIZONS = (10, 100)
+
+
+@dataclass
+class BenchmarkCase:
+    """
+    A benchmarked operation.
+    setup builds the inputs out of the measurement and returns the function that is timed.
+    """
+
+    name: str
+    group: str
+    setup: Callable[[], Callable[[], object]]
+    params: dict = field(default_factory=dict)
+
+
+def random_values(length: int, seed: int = 0) -> np.ndarray:
+    """Positive values with a trend and a daily seasonality, like the series the package is used on."""
+    generator = np.random.default_rng(seed)
+    steps = np.arange(length)
+    return (
+        100
+        + 0.001 * steps
+        + 10 * np.sin(2 * np.pi * steps / 24)
+        + generator.normal(scale=5, size=length)
+    )
+
+
+def serie_cases(length: int) -> list[BenchmarkCase]:
+    values = random_values(length)
+    options = {
+        "plain": {},
+        "detrend": {"detrend": True},
+        "deseasonalize": {"deseasonalize": True, "seasonal_period": 24},
+    }
+    return [
+        BenchmarkCase(
+            name=f"serie_construction[{option}-n={length}]",
+            group="serie",
+            setup=lambda kwargs=kwargs: lambda: Serie(values=values, **kwargs),
+            params={"length": length, "option": option},
+        )
+        for option, kwargs in options.items()
+    ]
+
+
+def kl_divergence_cases(lengths: tuple[int, ...]) -> list[BenchmarkCase]:
+    def setup(length: int) -> Callable[[], float]:
+        p = Serie(values=random_values(length, seed=0))
+        q = Serie(values=random_values(length, seed=1))
+        return lambda: KLDivergence.compute(p=p, q=q)
+
+    return [
+        BenchmarkCase(
+            name=f"kl_divergence[n={length}]",
+            group="kl_divergence",
+            setup=lambda length=length: setup(length),
+            params={"length": length},
+        )
+        for length in lengths
+    ]
+
+
+def analyzer_cases(lengths: tuple[int, ...]) -> list[BenchmarkCase]:
+    def setup(length: int, horizon: int, method: str) -> Callable[[], object]:
+        serie = Serie(values=random_values(length))
+        analyzer = ShiftedSerieAnalyzer(max_horizon=horizon, method=method)
+        return lambda: analyzer.compute(serie=serie)
+
+    grid = [(length, horizon, "direct") for length in lengths for horizon in HORIZONS]
+    grid += [(length, 1000, "fft") for length in lengths if length > 1000]
+    return [
+        BenchmarkCase(
+            name=f"shifted_serie_analyzer[{method}-n={length}-h={horizon}]",
+            group="analyzer",
+            setup=lambda args=(length, horizon, method): setup(*args),
+            params={"length": length, "horizon": horizon, "method": method},
+        )
+        for length, horizon, method in grid
+    ]
+
+
+def evaluation_cases(n_forecasts: int, horizon: int) -> list[BenchmarkCase]:
+    def setup_single() -> Callable[[], dict]:
+        train_set = Serie(values=random_values(10 * horizon))
+        test_set = Serie(values=random_values(horizon, seed=1))
+        forecasts = [
+            Serie(values=random_values(horizon, seed=seed), identifier=f"model_{seed}")
+            for seed in range(2, n_forecasts + 2)
+        ]
+        return lambda: ForecastEvaluation.evaluate_forecast(
+            train_set=train_set,
+            test_set=test_set,
+            forecasts=forecasts,
+            seasonal_period=24,
+        )
+
+    def setup_batched() -> Callable[[], object]:
+        train_set = random_values(10 * horizon)
+        test_set = random_values(horizon, seed=1)
+        forecasts = np.stack(
+            [random_values(horizon, seed=seed) for seed in range(2, n_forecasts + 2)]
+        )
+
+        def run():
+            ForecastEvaluation.BASELINE_CACHE.clear()
+            return ForecastEvaluation.evaluate_forecasts(
+                train_sets=train_set,
+                test_sets=test_set,
+                forecasts=forecasts,
+                seasonal_period=24,
+            )
+
+        return run
+
+    params = {"forecasts": n_forecasts, "horizon": horizon}
+    return [
+        BenchmarkCase(
+            name=f"evaluate_forecast[m={n_forecasts}-h={horizon}]",
+            group="evaluation",
+            setup=setup_single,
+            params=params,
+        ),
+        BenchmarkCase(
+            name=f"evaluate_forecasts[m={n_forecasts}-h={horizon}]",
+            group="evaluation",
+            setup=setup_batched,
+            params=params,
+        ),
+    ]
+
+
+def all_cases(quick: bool = False) -> list[BenchmarkCase]:
+    """
+    :param quick: Whether to stop the grids at 1e5 values, instead of 1e7, for a run of a few seconds.
+    """
+    lengths = QUICK_SERIE_LENGTHS if quick else SERIE_LENGTHS
+    return (
+        serie_cases(length=lengths[-1])
+        + kl_divergence_cases(lengths=lengths)
+        + analyzer_cases(lengths=lengths)
+        + evaluation_cases(n_forecasts=100 if quick else 1000, horizon=168)
+    )
@@ -0,0 +1,146 @@
+"""
+Run the benchmarks, write their wall time and peak memory to a JSON file and flag regressions against a baseline.
+Timings depend on the machine, so the baseline is not committed: save one with --save-baseline on the machine
+the benchmarks are compared on, before the changes to measure.
+
+    python -m benchmarks.run --quick
+    python -m benchmarks.run --save-baseline
+    python -m benchmarks.run --baseline benchmarks/baseline.json --threshold 0.2
+"""
+
+import argparse
+import datetime
+import fnmatch
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.cases import BenchmarkCase, all_cases
+
+DEFAULT_OUTPUT = Path(__file__).parent / "results.json"
+DEFAULT_BASELINE = Path(__file__).parent / "baseline.json"
+
+
+def measure(case: BenchmarkCase, repeats: int) -> dict:
+    """
+    Time the case repeats times and keep the best time, which is the least affected by the rest of the machine.
+    Peak memory is measured in a separate run, since tracing allocations slows the code down.
+    """
+    run = case.setup()
+    run()
+
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "group": case.group,
+        "params": case.params,
+        "time": min(times),
+        "times": times,
+        "peak_memory": peak,
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    List the cases whose time or peak memory grew by more than threshold, as a fraction of the baseline.
+    Cases missing from the baseline are not compared.
+    """
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        for metric in ("time", "peak_memory"):
+            if reference[metric] and result[metric] > reference[metric] * (
+                1 + threshold
+            ):
+                regressions.append(
+                    f"{name}: {metric} {reference[metric]:.4g} -> {result[metric]:.4g} "
+                    f"(+{result[metric] / reference[metric] - 1:.0%})"
+                )
+    return regressions
+
+
+def metadata() -> dict:
+    return {
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--quick", action="store_true", help="stop grids at 1e5 values")
+    parser.add_argument("--filter", default="*", help="glob on the case names")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="relative growth over the baseline flagged as a regression",
+    )
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="write the results to the baseline instead of comparing against it",
+    )
+    arguments = parser.parse_args(argv)
+
+    results = {}
+    for case in all_cases(quick=arguments.quick):
+        if not fnmatch.fnmatch(case.name, arguments.filter):
+            continue
+        results[case.name] = measure(case=case, repeats=arguments.repeats)
+        print(
+            f"{case.name:<60} {results[case.name]['time'] * 1e3:>10.2f} ms "
+            f"{results[case.name]['peak_memory'] / 2**20:>10.1f} MiB",
+            flush=True,
+        )
+
+    report = {"metadata": metadata(), "results": results}
+    output = arguments.baseline if arguments.save_baseline else arguments.output
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {output}")
+    if arguments.save_baseline:
+        return 0
+    if not arguments.baseline.exists():
+        print(
+            f"No baseline at {arguments.baseline}, "
+            "save one with --save-baseline (make benchmark-baseline) to flag regressions"
+        )
+        return 0
+
+    baseline = json.loads(arguments.baseline.read_text())["results"]
+    regressions = compare(
+        results=results, baseline=baseline, threshold=arguments.threshold
+    )
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if not regressions:
+        print(f"No regression against {arguments.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,332 @@
+"""
+Command line batch runner.
+
+    kl-evolution analyze "data/*.csv" --columns "sensor_*" --max-horizon 168 --workers 8 --output kl.jsonl
+    kl-evolution evaluate data/ --target demand --forecasts "model_*" --test-size 96 --output scores.jsonl
+
+Each (file, column) item is written to the output as one JSON line as soon as its file is processed.
+The output doubles as the checkpoint: with --resume, the items already in it are skipped and the failed ones retried.
+"""
+
+import argparse
+import fnmatch
+import glob
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterator
+
+import numpy as np
+
+from kl_evolution.core.data_objects.serie import Serie
+from kl_evolution.core.features.ts_analyzer import ShiftedSerieAnalyzer
+from kl_evolution.core.results_formatting.evaluation import ForecastEvaluation
+from kl_evolution.core.utils.result_store import ResultStore
+
+
+class BatchRunner:
+    """
+    Run the analysis or the evaluation of the columns of many files across worker processes,
+    streaming one JSON line per item to the output.
+    """
+
+    EXTENSIONS = (".csv", ".parquet")
+
+    def __init__(self, arguments: argparse.Namespace):
+        self.arguments = arguments
+
+    def run(self) -> int:
+        """
+        :return: The number of items that failed.
+        """
+        files = BatchRunner.find_files(patterns=self.arguments.inputs)
+        if not files:
+            raise FileNotFoundError(
+                f"No CSV or Parquet file in {self.arguments.inputs}"
+            )
+
+        done = self.__load_checkpoint() if self.arguments.resume else set()
+        failures = 0
+        with open(
+            self.arguments.output, "a" if self.arguments.resume else "w"
+        ) as output:
+            for record in self.__records(files=files, done=done):
+                output.write(json.dumps(record) + "\n")
+                output.flush()
+                os.fsync(output.fileno())
+                if "error" in record:
+                    failures += 1
+                    print(f"{record['id']}: {record['error']}", file=sys.stderr)
+        return failures
+
+    @staticmethod
+    def find_files(patterns: list[str]) -> list[str]:
+        """
+        Expand directories and glob patterns into the sorted list of CSV and Parquet files, as absolute paths,
+        so that the identifiers of their items do not depend on how the paths were written.
+        """
+        files = set()
+        for pattern in patterns:
+            if os.path.isdir(pattern):
+                pattern = os.path.join(pattern, "*")
+            files.update(
+                os.path.abspath(path)
+                for path in glob.glob(pattern)
+                if os.path.isfile(path) and path.endswith(BatchRunner.EXTENSIONS)
+            )
+        return sorted(files)
+
+    def __load_checkpoint(self) -> set[str]:
+        """
+        Read the identifiers of the items already written to the output.
+        Items that failed are not done, so that they are computed again, their new record following the failed one.
+        A last line cut by a crash is removed from the file, so that its item is computed again.
+        """
+        if not os.path.exists(self.arguments.output):
+            return set()
+        done, valid_length = set(), 0
+        with open(self.arguments.output, "rb") as output:
+            for line in output:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("Incomplete line")
+                    record = json.loads(line)
+                    if "error" not in record:
+                        done.add(record["id"])
+                except (ValueError, KeyError):
+                    break
+                valid_length += len(line)
+        with open(self.arguments.output, "r+b") as output:
+            output.truncate(valid_length)
+        return done
+
+    def __records(self, files: list[str], done: set[str]) -> Iterator[dict]:
+        """Process the files, one job per file, and yield their records as the jobs finish."""
+        options = vars(self.arguments)
+        done_by_file = {
+            path: {item for item in done if item.startswith(f"{path}::")}
+            for path in files
+        }
+        if self.arguments.workers <= 1 or len(files) == 1:
+            for path in files:
+                yield from BatchRunner._process_file(path, options, done_by_file[path])
+            return
+
+        with ProcessPoolExecutor(max_workers=self.arguments.workers) as executor:
+            futures = {
+                executor.submit(
+                    BatchRunner._process_file, path, options, done_by_file[path]
+                ): path
+                for path in files
+            }
+            for future in as_completed(futures):
+                try:
+                    yield from future.result()
+                except Exception as error:
+                    yield {"id": futures[future], "error": repr(error)}
+
+    @staticmethod
+    def _process_file(path: str, options: dict, done: set[str]) -> list[dict]:
+        """Worker side: read a file and process its selected columns that are not done yet."""
+        try:
+            dataframe = BatchRunner.read_file(path=path, index_col=options["index_col"])
+        except Exception as error:
+            return [{"id": path, "file": path, "error": repr(error)}]
+
+        if options["command"] == "evaluate":
+            items = [(f"{path}::{options['target']}", BatchRunner.__evaluate)]
+        else:
+            items = [
+                (f"{path}::{column}", BatchRunner.__analyze)
+                for column in BatchRunner.select_columns(
+                    columns=dataframe.select_dtypes("number").columns,
+                    spec=options["columns"],
+                )
+            ]
+
+        records = []
+        for identifier, process in items:
+            if identifier in done:
+                continue
+            record = {"id": identifier, "file": path}
+            try:
+                record.update(
+                    process(dataframe=dataframe, identifier=identifier, options=options)
+                )
+            except Exception as error:
+                record["error"] = repr(error)
+            records.append(record)
+        return records
+
+    @staticmethod
+    def read_file(path: str, index_col: int | None):
+        import pandas as pd
+
+        if path.endswith(".parquet"):
+            return pd.read_parquet(path)
+        return pd.read_csv(path, index_col=index_col)
+
+    @staticmethod
+    def select_columns(columns, spec: str | None) -> list[str]:
+        """
+        :param spec: Comma separated column names or glob patterns, None for all the columns.
+        """
+        if spec is None:
+            return [str(column) for column in columns]
+        patterns = spec.split(",")
+        return [
+            str(column)
+            for column in columns
+            if any(fnmatch.fnmatchcase(str(column), pattern) for pattern in patterns)
+        ]
+
+    @staticmethod
+    def __analyze(dataframe, identifier: str, options: dict) -> dict:
+        column = identifier.rsplit("::", 1)[1]
+        serie = Serie(
+            values=dataframe[column].to_numpy(dtype=float),
+            identifier=identifier,
+            detrend=options["detrend"],
+            deseasonalize=options["deseasonalize"],
+            seasonal_period=options["seasonal_period"],
+        )
+        lags = None
+        if options["log_lags"]:
+            lags = ShiftedSerieAnalyzer.log_lags(
+                max_horizon=options["max_horizon"] or len(serie) - 1,
+                n_lags=options["log_lags"],
+            )
+        analyzer = ShiftedSerieAnalyzer(
+            max_horizon=options["max_horizon"],
+            normalized=not options["raw"],
+            method=options["method"],
+            reference=options["reference"],
+            seed=options["seed"],
+            lags=lags,
+            store=ResultStore(directory=options["store"]) if options["store"] else None,
+        )
+        kl_results = analyzer.compute(serie=serie)
+        return {
+            "column": column,
+            "lags": np.asarray(kl_results.index).tolist(),
+            "kl": kl_results.values.tolist(),
+        }
+
+    @staticmethod
+    def __evaluate(dataframe, identifier: str, options: dict) -> dict:
+        target = options["target"]
+        size = options["test_size"]
+        values = dataframe[target].to_numpy(dtype=float)
+        models = BatchRunner.select_columns(
+            columns=[
+                column
+                for column in dataframe.select_dtypes("number").columns
+                if column != target
+            ],
+            spec=options["forecasts"],
+        )
+        scores = ForecastEvaluation.evaluate_forecasts(
+            train_sets=values[:-size],
+            test_sets=values[-size:],
+            forecasts=np.stack(
+                [dataframe[model].to_numpy(dtype=float)[-size:] for model in models]
+            ).reshape(len(models), size),
+            model_names=models,
+            seasonal_period=options["seasonal_period"],
+            normalize=options["normalize"],
+            seed=options["seed"],
+        )
+        return {"column": target, "scores": scores.iloc[0].to_dict()}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="kl-evolution",
+        description="Run KL evolution analyses and forecast evaluations over many files.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument(
+        "inputs", nargs="+", help="CSV or Parquet files, directories or glob patterns"
+    )
+    common.add_argument(
+        "--output",
+        required=True,
+        help="the JSON lines file the results are streamed to",
+    )
+    common.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    common.add_argument(
+        "--resume",
+        action="store_true",
+        help="skip the items already in the output, retrying the failed ones",
+    )
+    common.add_argument(
+        "--index-col",
+        type=int,
+        default=0,
+        help="the index column of CSV files, -1 for none",
+    )
+    common.add_argument("--seasonal-period", type=int, default=None)
+    common.add_argument("--seed", type=int, default=0)
+
+    analyze = commands.add_parser(
+        "analyze", parents=[common], help="KL divergences of series with their shifts"
+    )
+    analyze.add_argument(
+        "--columns", default=None, help="comma separated names or glob patterns"
+    )
+    analyze.add_argument("--max-horizon", type=int, default=None)
+    analyze.add_argument("--method", choices=("direct", "fft"), default="direct")
+    analyze.add_argument(
+        "--log-lags",
+        type=int,
+        default=None,
+        help="compute about that many log-spaced lags up to --max-horizon",
+    )
+    analyze.add_argument(
+        "--reference", choices=ShiftedSerieAnalyzer.REFERENCES, default="seeded"
+    )
+    analyze.add_argument(
+        "--raw", action="store_true", help="do not normalize the divergences"
+    )
+    analyze.add_argument(
+        "--store",
+        default=None,
+        help="a directory keeping the per-shift sums, so that appended rows are computed alone on the next run",
+    )
+    analyze.add_argument("--detrend", action="store_true")
+    analyze.add_argument(
+        "--deseasonalize", action="store_true", help="needs --seasonal-period"
+    )
+
+    evaluate = commands.add_parser(
+        "evaluate", parents=[common], help="KL divergences of forecasts from a test set"
+    )
+    evaluate.add_argument(
+        "--target", required=True, help="the column of the actual values"
+    )
+    evaluate.add_argument(
+        "--forecasts", default=None, help="comma separated names or glob patterns"
+    )
+    evaluate.add_argument(
+        "--test-size",
+        type=int,
+        required=True,
+        help="the number of last rows of the test set",
+    )
+    evaluate.add_argument("--normalize", action="store_true")
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    arguments = build_parser().parse_args(argv)
+    if arguments.index_col is not None and arguments.index_col < 0:
+        arguments.index_col = None
+    failures = BatchRunner(arguments=arguments).run()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
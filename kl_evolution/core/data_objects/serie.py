@@ -1,20 +1,74 @@
 from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterator, Sequence
+
 import numpy as np
-import pandas as pd
-from numpy._typing import ArrayLike
+from numpy._typing import ArrayLike, DTypeLike
+
+if TYPE_CHECKING:
+    import pandas as pd
+    import pyarrow as pa
+
+
+@dataclass(frozen=True)
+class SerieStatistics:
+    """
+    The summary statistics of the values of a serie, NaN values being ignored.
+    The minimum, maximum, mean and std are NaN when the serie holds no other value.
+    """
+
+    minimum: float
+    maximum: float
+    mean: float
+    std: float
+    nan_count: int
+    all_zero: bool
 
 
-@dataclass
 class Serie:
-    values: ArrayLike
-    index: ArrayLike | None = None
-    identifier: str | None = None
-    detrend: bool = False
-    deseasonalize: bool = False
-    seasonal_period: int | None = None
+    """
+    A time serie, holding its values as a contiguous float array.
+    Contiguous float arrays of the requested dtype are adopted as they are, without copy,
+    and the default index is only materialised when it is accessed.
+    Summary statistics are computed in a single pass on first use, and kept until the values are reassigned
+    or invalidate_statistics is called after modifying them in place.
+    """
+
+    STATISTICS_BLOCK = 2**16
 
-    def __post_init__(self):
-        self.values = np.array(self.values, dtype=float)
+    __slots__ = (
+        "_values",
+        "_statistics",
+        "_index",
+        "identifier",
+        "detrend",
+        "deseasonalize",
+        "seasonal_period",
+    )
+
+    def __init__(
+        self,
+        values: ArrayLike,
+        index: ArrayLike | range | None = None,
+        identifier: str | None = None,
+        detrend: bool = False,
+        deseasonalize: bool = False,
+        seasonal_period: int | None = None,
+        dtype: DTypeLike = np.float64,
+    ):
+        """
+        :param values: The values of the serie, adopted without copy when already a contiguous array of dtype
+        :param index: The index of the serie, defaults to the positions of the values
+        :param identifier: The name of the serie
+        :param detrend: Whether to replace the values by their first differences
+        :param deseasonalize: Whether to replace the values by their seasonal differences
+        :param seasonal_period: The period used for deseasonalization
+        :param dtype: The float dtype of the values, float32 halves the memory used
+        """
+        self.values = np.ascontiguousarray(values, dtype=dtype)
+        self.identifier = identifier
+        self.detrend = detrend
+        self.deseasonalize = deseasonalize
+        self.seasonal_period = seasonal_period
 
         if self.deseasonalize and not self.seasonal_period:
             raise ValueError(
@@ -22,20 +76,59 @@ class Serie:
             )
 
         if self.detrend:
-            self.values = self.values - np.roll(a=self.values, shift=1)
-            self.values[0] = np.nan
+            self.values = self.__difference(values=self.values, period=1)
         if self.deseasonalize:
-            self.values = self.values - np.roll(
-                a=self.values, shift=self.seasonal_period
+            self.values = self.__difference(
+                values=self.values, period=self.seasonal_period
             )
-            self.values[: self.seasonal_period] = np.nan
 
-        if self.index is None:
-            self.index = np.arange(len(self.values))
+        if index is None or isinstance(index, range):
+            self._index = index
         else:
-            self.index = np.array(self.index)
-            if len(self.index) != len(self.values):
-                raise ValueError("Index and values must have the same length.")
+            self._index = np.asarray(index)
+        if self._index is not None and len(self._index) != len(self.values):
+            raise ValueError("Index and values must have the same length.")
+
+    @property
+    def values(self) -> np.ndarray:
+        return self._values
+
+    @values.setter
+    def values(self, values: ArrayLike) -> None:
+        """
+        Replace the values, adopted as a contiguous array of the current dtype, discarding their cached statistics.
+        """
+        current = getattr(self, "_values", None)
+        self._values = np.ascontiguousarray(
+            values, dtype=current.dtype if current is not None else None
+        )
+        self._statistics = None
+
+    @property
+    def statistics(self) -> SerieStatistics:
+        """The summary statistics of the values, computed on first access and cached."""
+        if self._statistics is None:
+            self._statistics = Serie.__compute_statistics(values=self._values)
+        return self._statistics
+
+    def invalidate_statistics(self) -> None:
+        """Discard the cached statistics, to be called after modifying the values in place."""
+        self._statistics = None
+
+    @property
+    def index(self) -> np.ndarray:
+        """The index of the serie, materialised on first access when it is the default one."""
+        if self._index is None:
+            self._index = np.arange(len(self.values))
+        elif isinstance(self._index, range):
+            self._index = np.arange(
+                self._index.start, self._index.stop, self._index.step
+            )
+        return self._index
+
+    @index.setter
+    def index(self, index: ArrayLike) -> None:
+        self._index = np.asarray(index)
 
     def __repr__(self):
         identifier_repr = f"{self.identifier}\n" if self.identifier else ""
@@ -45,20 +138,20 @@ class Serie:
         return len(self.values)
 
     def __min__(self):
-        return np.nanmin(self.values)
+        return self.statistics.minimum
 
     def __max__(self):
-        return np.nanmax(self.values)
+        return self.statistics.maximum
 
     def __avg__(self):
-        return np.nanmean(self.values)
+        return self.statistics.mean
 
     def __std__(self):
-        return np.nanstd(self.values)
+        return self.statistics.std
 
     @staticmethod
     def __from_pandas__(
-        dataframe: pd.DataFrame,
+        dataframe: "pd.DataFrame",
         col_name: str,
         detrend: bool = False,
         deseasonalize: bool = False,
@@ -73,15 +166,184 @@ class Serie:
             seasonal_period=seasonal_period,
         )
 
+    @staticmethod
+    def __from_npy__(
+        path: str,
+        identifier: str | None = None,
+        mmap_mode: str = "r",
+    ):
+        """
+        Wrap a .npy file holding a 1D float array with np.memmap, without loading it in memory.
+        Float32 and float64 files are kept mapped, other dtypes would be converted in memory.
+        """
+        values = np.load(path, mmap_mode=mmap_mode)
+        dtype = values.dtype if values.dtype in (np.float32, np.float64) else np.float64
+        return Serie(values=values, identifier=identifier, dtype=dtype)
+
+    @staticmethod
+    def __from_binary__(
+        path: str,
+        dtype: DTypeLike = np.float64,
+        offset: int = 0,
+        length: int | None = None,
+        identifier: str | None = None,
+    ):
+        """
+        Wrap a raw binary file of floats with np.memmap, without loading it in memory.
+
+        :param path: The path of the file.
+        :param dtype: The float dtype of the values stored in the file.
+        :param offset: The number of bytes to skip at the beginning of the file.
+        :param length: The number of values to map, defaults to the whole file.
+        :param identifier: The name of the serie.
+        """
+        values = np.memmap(
+            path,
+            dtype=dtype,
+            mode="r",
+            offset=offset,
+            shape=(length,) if length is not None else None,
+        )
+        return Serie(values=values, identifier=identifier, dtype=dtype)
+
+    @staticmethod
+    def __from_arrow__(
+        array: "pa.Array | pa.ChunkedArray",
+        index: ArrayLike | None = None,
+        identifier: str | None = None,
+    ):
+        """
+        Build a serie from an Arrow column. A float column held in a single chunk without nulls is adopted
+        without copy, as a read-only view of the Arrow buffer. Nulls become NaN, and several chunks
+        or other dtypes need a copy.
+        """
+        if hasattr(array, "num_chunks"):
+            array = array.chunk(0) if array.num_chunks == 1 else array.combine_chunks()
+        values = array.to_numpy(zero_copy_only=False)
+        dtype = values.dtype if values.dtype in (np.float32, np.float64) else np.float64
+        return Serie(values=values, index=index, identifier=identifier, dtype=dtype)
+
+    @staticmethod
+    def __from_parquet__(
+        path: str,
+        columns: Sequence[str] | None = None,
+        index_column: str | None = None,
+    ) -> dict:
+        """
+        Read the columns of a Parquet file as series, without building a DataFrame.
+        Only the requested columns are read from the file, which is memory-mapped.
+
+        :param path: The path of the file.
+        :param columns: The columns to read, defaults to all the numeric columns.
+        :param index_column: The column used as the index of the series.
+        :return: The series by column name.
+        """
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(path, memory_map=True)
+        columns = Serie.__parquet_columns(parquet_file, columns, index_column)
+        table = parquet_file.read(
+            columns=columns + ([index_column] if index_column else [])
+        )
+        return Serie.__from_table(table, columns, index_column)
+
+    @staticmethod
+    def __iter_parquet__(
+        path: str,
+        columns: Sequence[str] | None = None,
+        index_column: str | None = None,
+        batch_size: int | None = None,
+    ) -> Iterator[dict]:
+        """
+        Stream the columns of a Parquet file as series, one row group at a time, or by batches of batch_size rows,
+        so that only one of them is in memory at once. The chunks of a column can be fed to
+        KLDivergence.compute_from_chunks or analyzed by chunks.
+
+        :param path: The path of the file.
+        :param columns: The columns to read, defaults to all the numeric columns.
+        :param index_column: The column used as the index of the series.
+        :param batch_size: The number of rows of each chunk, defaults to the row groups of the file.
+        :return: An iterator over the series of each chunk, by column name.
+        """
+        import pyarrow.parquet as pq
+
+        parquet_file = pq.ParquetFile(path, memory_map=True)
+        columns = Serie.__parquet_columns(parquet_file, columns, index_column)
+        projection = columns + ([index_column] if index_column else [])
+        if batch_size is None:
+            tables = (
+                parquet_file.read_row_group(row_group, columns=projection)
+                for row_group in range(parquet_file.num_row_groups)
+            )
+        else:
+            tables = parquet_file.iter_batches(
+                batch_size=batch_size, columns=projection
+            )
+        for table in tables:
+            yield Serie.__from_table(table, columns, index_column)
+
+    @staticmethod
+    def __parquet_columns(parquet_file, columns, index_column) -> list[str]:
+        """The requested columns, or all the numeric columns but the index one."""
+        if columns is not None:
+            return list(columns)
+        import pyarrow.types as types
+
+        return [
+            field.name
+            for field in parquet_file.schema_arrow
+            if field.name != index_column
+            and (types.is_floating(field.type) or types.is_integer(field.type))
+        ]
+
+    @staticmethod
+    def __from_table(table, columns: list[str], index_column: str | None) -> dict:
+        """Build one serie per column of an Arrow table or record batch."""
+        index = (
+            table.column(index_column).to_numpy(zero_copy_only=False)
+            if index_column
+            else None
+        )
+        return {
+            column: Serie.__from_arrow__(
+                table.column(column), index=index, identifier=column
+            )
+            for column in columns
+        }
+
     def shift(self, shift: int):
         """
         Shift the series values by a given number of positions.
         Shifted values are filled with NaN at the beginning.
         """
-        shifted_values = np.roll(self.values, shift)
-        shifted_values[:shift] = np.nan
+        if shift < 0:
+            shifted_values = np.roll(self.values, shift)
+            shifted_values[:shift] = np.nan
+        else:
+            shifted_values = np.full_like(self.values, np.nan)
+            size = len(self.values)
+            shifted_values[shift:] = self.values[: max(size - shift, 0)]
         return Serie(
-            values=shifted_values, index=self.index, identifier=self.identifier
+            values=shifted_values, index=self._index, identifier=self.identifier
+        )
+
+    def lagged_view(self, shift: int):
+        """
+        Shift the series values by a given number of positions, without copy.
+        Instead of being filled with NaN, the first positions are dropped: the values are a view
+        of the first len - shift values, aligned on the last len - shift positions of the index.
+        """
+        size = len(self.values)
+        shift = min(max(shift, 0), size)
+        if self._index is None:
+            index = range(shift, size)
+        else:
+            index = self._index[shift:]
+        return Serie(
+            values=self.values[: size - shift],
+            index=index,
+            identifier=self.identifier,
+            dtype=self.values.dtype,
         )
 
     def __all_eq__(self, other_value: float) -> bool:
@@ -89,4 +351,73 @@ class Serie:
         Check if all values in the series are equal to a given value,
         ignoring NaNs.
         """
-        return np.all(np.nan_to_num(self.values) == other_value)
+        if other_value == 0 or not len(self.values):
+            return self.statistics.all_zero
+        statistics = self.statistics
+        return (
+            statistics.nan_count == 0
+            and statistics.minimum == statistics.maximum == other_value
+        )
+
+    @staticmethod
+    def __compute_statistics(values: np.ndarray) -> SerieStatistics:
+        """
+        Compute the statistics of the values by blocks of STATISTICS_BLOCK values, so that each block is read
+        from memory once for all the statistics. The means and the sums of squared deviations of the blocks
+        are merged as they come, in float64.
+        """
+        count = nan_count = 0
+        minimum, maximum, mean, m2 = np.inf, -np.inf, 0.0, 0.0
+        all_zero = True
+        for start in range(0, len(values), Serie.STATISTICS_BLOCK):
+            block = values[start : start + Serie.STATISTICS_BLOCK]
+            missing = np.isnan(block)
+            block_nan = int(np.count_nonzero(missing))
+            if block_nan:
+                nan_count += block_nan
+                block = block[~missing]
+            if not block.size:
+                continue
+            block = block.astype(np.float64, copy=False)
+            minimum = min(minimum, float(block.min()))
+            maximum = max(maximum, float(block.max()))
+            all_zero = all_zero and not block.any()
+
+            block_mean = float(block.mean())
+            deviations = block - block_mean
+            delta = block_mean - mean
+            total = count + block.size
+            m2 += float(np.dot(deviations, deviations)) + delta**2 * (
+                count * block.size / total
+            )
+            mean += delta * block.size / total
+            count = total
+
+        if not count:
+            return SerieStatistics(
+                minimum=np.nan,
+                maximum=np.nan,
+                mean=np.nan,
+                std=np.nan,
+                nan_count=nan_count,
+                all_zero=True,
+            )
+        return SerieStatistics(
+            minimum=minimum,
+            maximum=maximum,
+            mean=mean,
+            std=float(np.sqrt(m2 / count)),
+            nan_count=nan_count,
+            all_zero=all_zero,
+        )
+
+    @staticmethod
+    def __difference(values: np.ndarray, period: int) -> np.ndarray:
+        """
+        Difference the values with the values period positions before, in a single new array.
+        The first period values are NaN.
+        """
+        differences = np.empty_like(values)
+        differences[:period] = np.nan
+        np.subtract(values[period:], values[:-period], out=differences[period:])
+        return differences
@@ -0,0 +1,194 @@
+from typing import TYPE_CHECKING, Iterator, Sequence
+
+import numpy as np
+from numpy._typing import ArrayLike, DTypeLike
+
+from kl_evolution.core.data_objects.serie import Serie
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+class SerieFrame:
+    """
+    A panel of aligned time series sharing one index, holding their values as a single contiguous
+    (series x length) float array. Differencing and statistics run over all the series at once,
+    and each serie is available as a Serie whose values are a view of its row.
+    """
+
+    __slots__ = (
+        "values",
+        "_index",
+        "identifiers",
+        "detrend",
+        "deseasonalize",
+        "seasonal_period",
+    )
+
+    def __init__(
+        self,
+        values: ArrayLike,
+        index: ArrayLike | range | None = None,
+        identifiers: Sequence[str] | None = None,
+        detrend: bool = False,
+        deseasonalize: bool = False,
+        seasonal_period: int | None = None,
+        dtype: DTypeLike = np.float64,
+    ):
+        """
+        :param values: The values of the series, one row per serie, adopted without copy when already
+            a contiguous 2D array of dtype
+        :param index: The index shared by the series, defaults to the positions of the values
+        :param identifiers: The names of the series, defaults to their positions
+        :param detrend: Whether to replace the values by their first differences
+        :param deseasonalize: Whether to replace the values by their seasonal differences
+        :param seasonal_period: The period used for deseasonalization
+        :param dtype: The float dtype of the values, float32 halves the memory used
+        """
+        self.values = np.ascontiguousarray(values, dtype=dtype)
+        if self.values.ndim != 2:
+            raise ValueError("Values should be a (series x length) array.")
+        self.identifiers = (
+            list(identifiers)
+            if identifiers is not None
+            else list(range(len(self.values)))
+        )
+        if len(self.identifiers) != len(self.values):
+            raise ValueError("There should be one identifier per serie.")
+        self.detrend = detrend
+        self.deseasonalize = deseasonalize
+        self.seasonal_period = seasonal_period
+
+        if self.deseasonalize and not self.seasonal_period:
+            raise ValueError(
+                "Seasonal period should be provided for deseasonalization."
+            )
+
+        if self.detrend:
+            self.values = self.__difference(values=self.values, period=1)
+        if self.deseasonalize:
+            self.values = self.__difference(
+                values=self.values, period=self.seasonal_period
+            )
+
+        if index is None or isinstance(index, range):
+            self._index = index
+        else:
+            self._index = np.asarray(index)
+        if self._index is not None and len(self._index) != self.values.shape[1]:
+            raise ValueError("Index and values must have the same length.")
+
+    @property
+    def index(self) -> np.ndarray:
+        """The index shared by the series, materialised on first access when it is the default one."""
+        if self._index is None:
+            self._index = np.arange(self.values.shape[1])
+        elif isinstance(self._index, range):
+            self._index = np.arange(
+                self._index.start, self._index.stop, self._index.step
+            )
+        return self._index
+
+    @property
+    def length(self) -> int:
+        """The number of values of each serie."""
+        return self.values.shape[1]
+
+    def __repr__(self):
+        return (
+            f"SerieFrame of {len(self)} series of length {self.length}\n"
+            f"Identifiers: {self.identifiers}"
+        )
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, key: int | str) -> Serie:
+        """
+        The serie at a position, or of an identifier, whose values are a view of its row
+        and whose index is the shared one.
+        """
+        position = key if isinstance(key, (int, np.integer)) else None
+        if position is None:
+            position = self.identifiers.index(key)
+        serie = Serie(
+            values=self.values[position],
+            index=self.index,
+            identifier=self.identifiers[position],
+            dtype=self.values.dtype,
+        )
+        serie.detrend = self.detrend
+        serie.deseasonalize = self.deseasonalize
+        serie.seasonal_period = self.seasonal_period
+        return serie
+
+    def __iter__(self) -> Iterator[Serie]:
+        return (self[position] for position in range(len(self)))
+
+    def __min__(self) -> np.ndarray:
+        return np.nanmin(self.values, axis=1)
+
+    def __max__(self) -> np.ndarray:
+        return np.nanmax(self.values, axis=1)
+
+    def __avg__(self) -> np.ndarray:
+        return np.nanmean(self.values, axis=1)
+
+    def __std__(self) -> np.ndarray:
+        return np.nanstd(self.values, axis=1)
+
+    @staticmethod
+    def __from_series__(series: Sequence[Serie]):
+        """
+        Stack series of the same length in a frame, the index of the first one being shared.
+        The series should not be differenced already, as their flags are not carried over.
+        """
+        series = list(series)
+        if len({len(serie) for serie in series}) > 1:
+            raise ValueError("The series should have the same length.")
+        return SerieFrame(
+            values=np.stack([serie.values for serie in series]),
+            index=series[0]._index if series else None,
+            identifiers=[
+                serie.identifier if serie.identifier is not None else position
+                for position, serie in enumerate(series)
+            ],
+        )
+
+    @staticmethod
+    def __from_pandas__(
+        dataframe: "pd.DataFrame",
+        columns: Sequence[str] | None = None,
+        detrend: bool = False,
+        deseasonalize: bool = False,
+        seasonal_period: int | None = None,
+    ):
+        """
+        Build a frame from columns of a DataFrame, one serie per column, sharing the index of the DataFrame.
+
+        :param dataframe: The DataFrame.
+        :param columns: The columns to read, defaults to all the numeric columns.
+        """
+        if columns is None:
+            columns = list(dataframe.select_dtypes("number").columns)
+        return SerieFrame(
+            values=dataframe.loc[:, columns].to_numpy(dtype=float).T,
+            index=dataframe.index,
+            identifiers=[str(column) for column in columns],
+            detrend=detrend,
+            deseasonalize=deseasonalize,
+            seasonal_period=seasonal_period,
+        )
+
+    @staticmethod
+    def __difference(values: np.ndarray, period: int) -> np.ndarray:
+        """
+        Difference the values of every serie with their values period positions before, in a single new array.
+        The first period values of each serie are NaN.
+        """
+        differences = np.empty_like(values)
+        differences[:, :period] = np.nan
+        np.subtract(
+            values[:, period:], values[:, :-period], out=differences[:, period:]
+        )
+        return differences
@@ -0,0 +1,137 @@
+import asyncio
+from concurrent.futures import Executor
+from typing import Any, Callable, Hashable, Sequence
+
+import numpy as np
+
+from kl_evolution.core.data_objects.serie import Serie
+from kl_evolution.core.features.ts_analyzer import ShiftedSerieAnalyzer
+from kl_evolution.core.results_formatting.evaluation import ForecastEvaluation
+from kl_evolution.core.utils.hashing import content_hash
+
+
+class AsyncKLService:
+    """
+    Async counterparts of ShiftedSerieAnalyzer.compute and ForecastEvaluation.evaluate_forecast, for event loops.
+    The computations run in an executor, at most max_concurrency at a time, and concurrent requests for the same
+    values and parameters share a single computation, so that their callers get the same result object.
+    """
+
+    HASH_IN_THREAD_ELEMENTS = 2**20
+
+    def __init__(self, executor: Executor | None = None, max_concurrency: int = 4):
+        """
+        :param executor: The executor the computations run in, defaults to the default executor of the loop.
+            A process pool needs picklable analyzers and series.
+        :param max_concurrency: The maximum number of computations running at once, other requests wait
+        """
+        if max_concurrency < 1:
+            raise ValueError("At least one computation should be allowed to run")
+        self.executor = executor
+        self.max_concurrency = max_concurrency
+        self.__semaphore = None
+        self.__in_flight: dict[Hashable, asyncio.Task] = {}
+
+    @property
+    def in_flight(self) -> int:
+        """The number of distinct computations requested and not finished yet."""
+        return len(self.__in_flight)
+
+    async def analyze(self, serie: Serie, analyzer: ShiftedSerieAnalyzer) -> Serie:
+        """
+        Compute analyzer.compute(serie) without blocking the event loop.
+
+        :param serie: The series to analyze.
+        :param analyzer: The analyzer, its options being part of the coalescing key, array options by their content.
+        :return: The Kullback-Leibler divergences between the series and shifted versions of itself.
+        """
+        options = sorted(vars(analyzer).items())
+        arrays = [
+            (name, value) for name, value in options if isinstance(value, np.ndarray)
+        ]
+        key = await self.__key(
+            "analyze",
+            (serie.values,) + tuple(value for _, value in arrays),
+            (
+                type(analyzer).__qualname__,
+                tuple(name for name, _ in arrays),
+                tuple(
+                    (name, repr(value))
+                    for name, value in options
+                    if not isinstance(value, np.ndarray)
+                ),
+                serie.identifier,
+                serie.detrend,
+                serie.deseasonalize,
+                serie.seasonal_period,
+            ),
+        )
+        return await self.__coalesce(key, analyzer.compute, serie)
+
+    async def evaluate_forecast(
+        self,
+        train_set: Serie,
+        test_set: Serie,
+        forecasts: Sequence[Serie],
+        seasonal_period: int | None = None,
+        normalize: bool = False,
+    ) -> dict:
+        """
+        Compute ForecastEvaluation.evaluate_forecast without blocking the event loop.
+        Takes the same arguments and returns the same scores.
+        """
+        key = await self.__key(
+            "evaluate_forecast",
+            (train_set.values, test_set.values)
+            + tuple(forecast.values for forecast in forecasts),
+            (
+                tuple(forecast.identifier for forecast in forecasts),
+                seasonal_period,
+                normalize,
+            ),
+        )
+        return await self.__coalesce(
+            key,
+            ForecastEvaluation.evaluate_forecast,
+            train_set,
+            test_set,
+            list(forecasts),
+            seasonal_period,
+            normalize,
+        )
+
+    async def __key(self, kind: str, arrays: tuple, parameters: tuple) -> Hashable:
+        """
+        Build the coalescing key from the content of the arrays and the parameters.
+        Large arrays are hashed in a thread, the hash releasing the GIL, so that the loop is not blocked.
+        """
+        if (
+            sum(np.size(array) for array in arrays)
+            < AsyncKLService.HASH_IN_THREAD_ELEMENTS
+        ):
+            hashes = tuple(content_hash(array) for array in arrays)
+        else:
+            hashes = await asyncio.to_thread(
+                lambda: tuple(content_hash(array) for array in arrays)
+            )
+        return kind, hashes, parameters
+
+    async def __coalesce(self, key: Hashable, function: Callable, *arguments) -> Any:
+        """
+        Join the computation running for key, or start it.
+        The computation is shielded, so that a cancelled caller does not cancel it for the others.
+        """
+        task = self.__in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self.__run(function, *arguments))
+            self.__in_flight[key] = task
+            task.add_done_callback(lambda _: self.__in_flight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def __run(self, function: Callable, *arguments) -> Any:
+        if self.__semaphore is None:
+            self.__semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self.__semaphore:
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor, function, *arguments
+            )
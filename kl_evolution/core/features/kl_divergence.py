@@ -1,20 +1,499 @@
-from scipy.stats import entropy
+from dataclasses import dataclass
+from typing import Callable, Iterable
+
+import numpy as np
 from kl_evolution.core.data_objects.serie import Serie
+from kl_evolution.core.utils.hashing import content_hash
+from kl_evolution.core.utils.lru_cache import LRUCache
+
+
+@dataclass
+class KLSufficientStatistics:
+    """
+    Sums from which the Kullback-Leibler divergences of non-negative (p, q) pairs can be recovered, one entry per pair.
+    Sums run over the positions where both p and q are defined, and logarithms may be taken relative to any common scale.
+    """
+
+    SUMS = (
+        "count",
+        "p_sum",
+        "q_sum",
+        "p_log_p",
+        "p_log_q",
+        "p_positive",
+        "q_positive",
+        "p_positive_q_zero",
+    )
+
+    count: np.ndarray
+    p_sum: np.ndarray
+    q_sum: np.ndarray
+    p_log_p: np.ndarray
+    p_log_q: np.ndarray
+    p_positive: np.ndarray
+    q_positive: np.ndarray
+    p_positive_q_zero: np.ndarray
+    p_empty: np.ndarray
+    q_empty: np.ndarray
+
+    def divergence(self) -> np.ndarray:
+        """
+        Recover the divergences, with the same NaN-omit and empty-distribution rules as KLDivergence.compute.
+        """
+        with np.errstate(divide="ignore", invalid="ignore"):
+            kl = (self.p_log_p - self.p_log_q) / self.p_sum + np.log(
+                self.q_sum / self.p_sum
+            )
+        # the divergence is non-negative, negative values are rounding errors
+        kl = np.maximum(kl, 0.0)
+        kl = np.where(self.p_positive_q_zero > 0, np.inf, kl)
+        kl = np.where((self.p_positive == 0) | (self.q_positive == 0), np.nan, kl)
+        kl = np.where(self.count == 0, 0.0, kl)
+        kl = np.where(self.q_empty, np.inf, kl)
+        return np.where(self.p_empty, 0.0, kl)
+
+    def merge(self, tail: "KLSufficientStatistics") -> "KLSufficientStatistics":
+        """
+        Add the sums of the pairs of an extension of the serie, as computed by
+        LagKLDivergence.sufficient_statistics with start, whose emptiness flags cover the extended serie.
+        """
+        return KLSufficientStatistics(
+            *(
+                getattr(self, name) + getattr(tail, name)
+                for name in KLSufficientStatistics.SUMS
+            ),
+            p_empty=tail.p_empty,
+            q_empty=tail.q_empty,
+        )
+
+    def select(self, positions: np.ndarray) -> "KLSufficientStatistics":
+        """Keep the entries at the given positions."""
+        return KLSufficientStatistics(
+            **{name: value[positions] for name, value in vars(self).items()}
+        )
 
 
 class KLDivergence:
 
+    ESTIMATORS = ("values", "histogram")
+    HISTOGRAM_SMOOTHING = 0.5
+    CACHE: LRUCache | None = None
+
+    @staticmethod
+    def enable_cache(maxsize: int = 1024) -> None:
+        """
+        Memoize compute, keyed by a hash of the values of p and q and by the computation options.
+        The key is computed from the values on each call, so mutating a serie never returns a stale result.
+
+        :param maxsize: The maximum number of divergences kept, the least recently used ones being evicted.
+        """
+        KLDivergence.CACHE = LRUCache(maxsize=maxsize)
+
+    @staticmethod
+    def disable_cache() -> None:
+        """Stop memoizing compute and drop the cached divergences."""
+        KLDivergence.CACHE = None
+
+    @staticmethod
+    def cache_info() -> dict:
+        """Return the hits, misses, size and maxsize of the cache, all zero when it is disabled."""
+        cache = KLDivergence.CACHE
+        if cache is None:
+            return {"hits": 0, "misses": 0, "size": 0, "maxsize": 0}
+        return {
+            "hits": cache.hits,
+            "misses": cache.misses,
+            "size": len(cache),
+            "maxsize": cache.maxsize,
+        }
+
+    @staticmethod
+    def compute(
+        p: Serie,
+        q: Serie,
+        chunk_size: int | None = None,
+        estimator: str = "values",
+        bins: int = 64,
+    ) -> float:
+        """
+        Compute the Kullback-Leibler divergence of q from p, memoized when the cache is enabled.
+
+        :param p: The reference serie.
+        :param q: The compared serie.
+        :param chunk_size: If given, read the values by chunks of that size, which bounds the memory used
+            for series that do not fit in memory, such as memory-mapped ones.
+        :param estimator: "values" uses the values themselves as the distributions, "histogram" uses
+            the histograms of the values over shared bins, which does not depend on the scale of the values.
+        :param bins: The number of bins of the histogram estimator.
+        :return: The Kullback-Leibler divergence of q from p.
+        """
+        if estimator not in KLDivergence.ESTIMATORS:
+            raise ValueError(
+                f"Unknown estimator {estimator}, expected one of {KLDivergence.ESTIMATORS}"
+            )
+
+        cache = KLDivergence.CACHE
+        if cache is None or not p or not q:
+            return KLDivergence.__compute_with_options__(
+                p=p, q=q, chunk_size=chunk_size, estimator=estimator, bins=bins
+            )
+
+        key = (
+            content_hash(p.values),
+            content_hash(q.values),
+            chunk_size,
+            estimator,
+            bins if estimator == "histogram" else None,
+        )
+        divergence = cache.get(key)
+        if divergence is None:
+            divergence = KLDivergence.__compute_with_options__(
+                p=p, q=q, chunk_size=chunk_size, estimator=estimator, bins=bins
+            )
+            cache.put(key, divergence)
+        return divergence
+
     @staticmethod
-    def compute(p: Serie, q: Serie) -> float:
+    def __compute_with_options__(
+        p: Serie, q: Serie, chunk_size: int | None, estimator: str, bins: int
+    ) -> float:
+        if estimator == "histogram":
+            return KLDivergence.__compute_histogram__(p=p, q=q, bins=bins)
+        if chunk_size:
+            return KLDivergence.__compute_by_chunks__(p=p, q=q, chunk_size=chunk_size)
         return KLDivergence.__compute__(p=p, q=q)
 
+    @staticmethod
+    def compute_from_chunks(
+        chunks: Callable[[], Iterable[tuple[np.ndarray, np.ndarray]]],
+    ) -> float:
+        """
+        Compute the Kullback-Leibler divergence from aligned chunks of p and q, in two passes:
+        the first one sums both distributions, the second one sums the relative entropies.
+        Follows the same rules as compute: NaN pairs are omitted, an empty p gives 0 and an empty q gives inf.
+
+        :param chunks: A callable returning a new iterable of (p chunk, q chunk) pairs on each call.
+        :return: The Kullback-Leibler divergence of q from p.
+        """
+        from scipy.special import rel_entr
+
+        p_sum = q_sum = 0.0
+        is_p_empty = is_q_empty = True
+        for p_chunk, q_chunk in chunks():
+            p_chunk = np.asarray(p_chunk, dtype=float)
+            q_chunk = np.asarray(q_chunk, dtype=float)
+            is_p_empty = is_p_empty and np.all(np.nan_to_num(p_chunk) == 0)
+            is_q_empty = is_q_empty and np.all(np.nan_to_num(q_chunk) == 0)
+            kept = ~np.isnan(p_chunk) & ~np.isnan(q_chunk)
+            p_sum += p_chunk[kept].sum()
+            q_sum += q_chunk[kept].sum()
+
+        if is_p_empty:
+            return 0.0
+        elif is_q_empty:
+            return float("inf")
+
+        divergence = 0.0
+        for p_chunk, q_chunk in chunks():
+            p_chunk = np.asarray(p_chunk, dtype=float)
+            q_chunk = np.asarray(q_chunk, dtype=float)
+            kept = ~np.isnan(p_chunk) & ~np.isnan(q_chunk)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                divergence += rel_entr(
+                    p_chunk[kept] / p_sum, q_chunk[kept] / q_sum
+                ).sum()
+        return float(divergence)
+
+    @staticmethod
+    def compute_batch(p: np.ndarray, q: np.ndarray) -> np.ndarray:
+        """
+        Compute the Kullback-Leibler divergences row by row, along the last axis of two broadcastable arrays.
+        Follows the same rules as compute: NaN pairs are omitted, an empty p gives 0 and an empty q gives inf.
+
+        :param p: The reference distributions, one per row.
+        :param q: The compared distributions, one per row.
+        :return: An array holding one divergence per row.
+        """
+        from scipy.special import rel_entr
+
+        p = np.asarray(p, dtype=float)
+        q = np.asarray(q, dtype=float)
+
+        is_p_empty = np.all(np.nan_to_num(p) == 0, axis=-1)
+        is_q_empty = np.all(np.nan_to_num(q) == 0, axis=-1)
+
+        kept = ~np.isnan(p) & ~np.isnan(q)
+        pk = np.where(kept, p, 0.0)
+        qk = np.where(kept, q, 0.0)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pk /= pk.sum(axis=-1, keepdims=True)
+            qk /= qk.sum(axis=-1, keepdims=True)
+            rel_entr(pk, qk, out=pk)
+        pk[~kept] = 0.0
+
+        return np.where(is_p_empty, 0.0, np.where(is_q_empty, np.inf, pk.sum(axis=-1)))
+
+    @staticmethod
+    def compute_prefixes(p: np.ndarray, q: np.ndarray) -> np.ndarray:
+        """
+        Compute the Kullback-Leibler divergences of every prefix along the last axis of two broadcastable arrays,
+        entry h of the result being the divergence of p[..., :h + 1] from q[..., :h + 1].
+        Each row goes through cumulative sums of its sufficient statistics in a single pass, rows holding
+        negative values following the sign rules of compute_batch.
+
+        :param p: The reference distributions, one per row.
+        :param q: The compared distributions, one per row.
+        :return: An array of the broadcast shape of p and q holding the divergences of the prefixes.
+        """
+        p, q = np.broadcast_arrays(
+            np.asarray(p, dtype=float), np.asarray(q, dtype=float)
+        )
+        shape = p.shape
+        rows = (int(np.prod(shape[:-1])), shape[-1])
+        p, q = p.reshape(rows), q.reshape(rows)
+
+        negative = np.any(p < 0, axis=-1) | np.any(q < 0, axis=-1)
+        divergences = np.empty(rows)
+        if not negative.all():
+            divergences[~negative] = KLDivergence.__compute_prefixes_non_negative(
+                p=p[~negative], q=q[~negative]
+            )
+        if negative.any():
+            divergences[negative] = KLDivergence.__compute_prefixes_signed(
+                p=p[negative], q=q[negative]
+            )
+        return divergences.reshape(shape)
+
+    @staticmethod
+    def histogram_edges(values: np.ndarray, bins: int) -> np.ndarray:
+        """
+        Compute the edges of bins evenly spread over the range of the values, ignoring NaNs.
+
+        :param values: The values to bin.
+        :param bins: The number of bins.
+        :return: The bins + 1 edges.
+        """
+        values = np.asarray(values, dtype=float)
+        finite = values[~np.isnan(values)]
+        if not len(finite):
+            return np.linspace(0.0, 1.0, bins + 1)
+        return np.histogram_bin_edges(finite, bins=bins)
+
+    @staticmethod
+    def bin_indices(values: np.ndarray, edges: np.ndarray) -> np.ndarray:
+        """
+        Find the bin of each value, values out of the edges going to the closest bin and NaNs to -1.
+
+        :param values: The values to bin.
+        :param edges: The edges of the bins.
+        :return: The index of the bin of each value.
+        """
+        values = np.asarray(values, dtype=float)
+        indices = np.searchsorted(edges, values, side="right") - 1
+        np.clip(indices, 0, len(edges) - 2, out=indices)
+        indices[np.isnan(values)] = -1
+        return indices
+
+    @staticmethod
+    def histogram_divergence(
+        p_counts: np.ndarray,
+        q_counts: np.ndarray,
+        smoothing: float = HISTOGRAM_SMOOTHING,
+    ) -> np.ndarray:
+        """
+        Compute the Kullback-Leibler divergences between histograms, along the last axis.
+        A pseudo-count is added to every bin, so that a bin empty in q only does not give an infinite divergence.
+
+        :param p_counts: The counts of the reference histograms.
+        :param q_counts: The counts of the compared histograms.
+        :param smoothing: The pseudo-count added to every bin.
+        :return: The divergences, one per histogram.
+        """
+        from scipy.special import rel_entr
+
+        pk = np.asarray(p_counts, dtype=float) + smoothing
+        qk = np.asarray(q_counts, dtype=float) + smoothing
+        pk /= pk.sum(axis=-1, keepdims=True)
+        qk /= qk.sum(axis=-1, keepdims=True)
+        return rel_entr(pk, qk).sum(axis=-1)
+
+    @staticmethod
+    def __compute_prefixes_non_negative(p: np.ndarray, q: np.ndarray) -> np.ndarray:
+        """Compute the divergences of every prefix of non-negative rows from cumulative sufficient statistics."""
+        kept = ~np.isnan(p) & ~np.isnan(q)
+        pk = np.where(kept, p, 0.0)
+        qk = np.where(kept, q, 0.0)
+        scale = KLDivergence.__prefix_scale(pk=pk, qk=qk)
+        p_positive = pk > 0
+        q_positive = qk > 0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            p_log_p = np.where(p_positive, pk * np.log(pk / scale), 0.0)
+            p_log_q = np.where(p_positive & q_positive, pk * np.log(qk / scale), 0.0)
+
+        def cumulative(terms: np.ndarray) -> np.ndarray:
+            return np.cumsum(terms, axis=-1)
+
+        return KLSufficientStatistics(
+            count=cumulative(kept),
+            p_sum=cumulative(pk),
+            q_sum=cumulative(qk),
+            p_log_p=cumulative(p_log_p),
+            p_log_q=cumulative(p_log_q),
+            p_positive=cumulative(p_positive),
+            q_positive=cumulative(q_positive),
+            p_positive_q_zero=cumulative(p_positive & ~q_positive),
+            p_empty=cumulative(np.nan_to_num(p) != 0) == 0,
+            q_empty=cumulative(np.nan_to_num(q) != 0) == 0,
+        ).divergence()
+
+    @staticmethod
+    def __compute_prefixes_signed(p: np.ndarray, q: np.ndarray) -> np.ndarray:
+        """
+        Compute the divergences of every prefix of rows holding negative values, with cumulative sums.
+        compute_batch divides each prefix by its sums P and Q: a pair adds |p| / |P| * (log |p| - log |q|)
+        when p / P > 0 and q / Q > 0, nothing when p = 0 and q / Q >= 0, and makes the divergence infinite
+        otherwise. As the signs of P and Q change from one prefix to the next, the pairs making the divergence
+        infinite are counted for each of the four sign patterns. Prefixes whose P or Q is zero are handled by
+        __zero_sum_prefixes, with cumulative counts as well.
+        """
+        kept = ~np.isnan(p) & ~np.isnan(q)
+        pk = np.where(kept, p, 0.0)
+        qk = np.where(kept, q, 0.0)
+        p_sum = np.cumsum(pk, axis=-1)
+        q_sum = np.cumsum(qk, axis=-1)
+        p_sign = np.where(p_sum < 0, 1, 0)
+        q_sign = np.where(q_sum < 0, 1, 0)
+
+        infinite_pairs = np.empty((2, 2) + p.shape)
+        for p_position, p_direction in enumerate((1.0, -1.0)):
+            for q_position, q_direction in enumerate((1.0, -1.0)):
+                p_oriented, q_oriented = pk * p_direction, qk * q_direction
+                infinite_pairs[p_position, q_position] = np.cumsum(
+                    (p_oriented < 0)
+                    | ((p_oriented > 0) & (q_oriented <= 0))
+                    | ((pk == 0) & (q_oriented < 0)),
+                    axis=-1,
+                )
+        infinite = (
+            np.take_along_axis(
+                infinite_pairs.reshape((4,) + p.shape),
+                (2 * p_sign + q_sign)[np.newaxis],
+                axis=0,
+            )[0]
+            > 0
+        )
+
+        p_abs, q_abs = np.abs(pk), np.abs(qk)
+        scale = KLDivergence.__prefix_scale(pk=p_abs, qk=q_abs)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            p_log_p = np.cumsum(
+                np.where(p_abs > 0, p_abs * np.log(p_abs / scale), 0.0), axis=-1
+            )
+            p_log_q = np.cumsum(
+                np.where((p_abs > 0) & (q_abs > 0), p_abs * np.log(q_abs / scale), 0.0),
+                axis=-1,
+            )
+            divergences = (p_log_p - p_log_q) / np.abs(p_sum) + np.log(
+                np.abs(q_sum) / np.abs(p_sum)
+            )
+        # the divergence is non-negative, negative values are rounding errors
+        divergences = np.where(infinite, np.inf, np.maximum(divergences, 0.0))
+
+        p_empty = np.cumsum(np.nan_to_num(p) != 0, axis=-1) == 0
+        q_empty = np.cumsum(np.nan_to_num(q) != 0, axis=-1) == 0
+        count = np.cumsum(kept, axis=-1)
+        zero_sum = (count > 0) & ~p_empty & ~q_empty & ((p_sum == 0) | (q_sum == 0))
+        if zero_sum.any():
+            divergences = KLDivergence.__zero_sum_prefixes(
+                divergences=divergences,
+                zero_sum=zero_sum,
+                pk=pk,
+                qk=qk,
+                kept=kept,
+                p_state=np.sign(p_sum),
+                q_state=np.sign(q_sum),
+            )
+        divergences = np.where(count == 0, 0.0, divergences)
+        divergences = np.where(q_empty, np.inf, divergences)
+        return np.where(p_empty, 0.0, divergences)
+
+    @staticmethod
+    def __zero_sum_prefixes(
+        divergences: np.ndarray,
+        zero_sum: np.ndarray,
+        pk: np.ndarray,
+        qk: np.ndarray,
+        kept: np.ndarray,
+        p_state: np.ndarray,
+        q_state: np.ndarray,
+    ) -> np.ndarray:
+        """
+        Fill the divergences of the prefixes whose sum P or Q is zero, as compute_batch gives them.
+        Dividing by a zero sum turns the values into infinities or NaNs, so that each pair only depends on
+        the signs of P and Q, which the states hold as -1, 0 or 1. For each pattern of states with a zero sum,
+        the pairs are evaluated once with rel_entr on values divided by those states, and their NaN, +inf and
+        -inf terms are counted cumulatively: the divergence of a prefix is NaN if it holds a NaN term
+        or both infinities, else the infinity it holds, else the sum of its terms.
+        """
+        from scipy.special import rel_entr
+
+        divergences = divergences.copy()
+        for p_direction, q_direction in (
+            (0.0, 1.0),
+            (0.0, -1.0),
+            (0.0, 0.0),
+            (1.0, 0.0),
+            (-1.0, 0.0),
+        ):
+            selected = zero_sum & (p_state == p_direction) & (q_state == q_direction)
+            if not selected.any():
+                continue
+            with np.errstate(divide="ignore", invalid="ignore"):
+                terms = rel_entr(pk / p_direction, qk / q_direction)
+            terms = np.where(kept, terms, 0.0)
+            has_nan = np.cumsum(np.isnan(terms), axis=-1) > 0
+            has_positive = np.cumsum(terms == np.inf, axis=-1) > 0
+            has_negative = np.cumsum(terms == -np.inf, axis=-1) > 0
+            finite_sum = np.cumsum(np.where(np.isfinite(terms), terms, 0.0), axis=-1)
+            values = np.where(
+                has_nan | (has_positive & has_negative),
+                np.nan,
+                np.where(
+                    has_positive,
+                    np.inf,
+                    np.where(has_negative, -np.inf, finite_sum),
+                ),
+            )
+            divergences[selected] = values[selected]
+        return divergences
+
+    @staticmethod
+    def __prefix_scale(pk: np.ndarray, qk: np.ndarray) -> np.ndarray:
+        """The largest value of each row of p and q, which the logarithms are taken relative to."""
+        scale = np.maximum(
+            pk.max(axis=-1, keepdims=True), qk.max(axis=-1, keepdims=True)
+        )
+        scale[scale == 0] = 1.0
+        return scale
+
+    @staticmethod
+    def __is_empty(serie: Serie) -> bool:
+        """
+        Whether the serie only holds zeros and NaNs. The cached statistics are trusted for read-only values only,
+        writeable values being checked again, so that values modified in place never give a stale divergence.
+        """
+        if not serie.values.flags.writeable:
+            return serie.statistics.all_zero
+        return not np.any(np.nan_to_num(serie.values))
+
     @staticmethod
     def __compute__(p: Serie, q: Serie) -> float:
         if not p or not q:
             raise Exception("Both p and q must be specified")
 
-        is_p_empty = p.__all_eq__(other_value=0)
-        is_q_empty = q.__all_eq__(other_value=0)
+        is_p_empty = KLDivergence.__is_empty(serie=p)
+        is_q_empty = KLDivergence.__is_empty(serie=q)
 
         if is_p_empty and is_q_empty:
             return 0.0
@@ -23,4 +502,44 @@ class KLDivergence:
         elif is_q_empty:
             return float("inf")
 
+        from scipy.stats import entropy
+
         return entropy(pk=p.values, qk=q.values, nan_policy="omit")
+
+    @staticmethod
+    def __compute_histogram__(p: Serie, q: Serie, bins: int) -> float:
+        if not p or not q:
+            raise Exception("Both p and q must be specified")
+
+        kept = ~np.isnan(p.values) & ~np.isnan(q.values)
+        p_kept, q_kept = p.values[kept], q.values[kept]
+        edges = KLDivergence.histogram_edges(
+            values=np.concatenate([p_kept, q_kept]), bins=bins
+        )
+        return float(
+            KLDivergence.histogram_divergence(
+                p_counts=np.bincount(
+                    KLDivergence.bin_indices(values=p_kept, edges=edges), minlength=bins
+                ),
+                q_counts=np.bincount(
+                    KLDivergence.bin_indices(values=q_kept, edges=edges), minlength=bins
+                ),
+            )
+        )
+
+    @staticmethod
+    def __compute_by_chunks__(p: Serie, q: Serie, chunk_size: int) -> float:
+        if not p or not q:
+            raise Exception("Both p and q must be specified")
+        if len(p) != len(q):
+            raise ValueError("p and q must have the same length")
+
+        return KLDivergence.compute_from_chunks(
+            chunks=lambda: (
+                (
+                    p.values[start : start + chunk_size],
+                    q.values[start : start + chunk_size],
+                )
+                for start in range(0, len(p), chunk_size)
+            )
+        )
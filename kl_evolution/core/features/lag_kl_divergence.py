@@ -0,0 +1,573 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from kl_evolution.core.features.kl_divergence import (
+    KLDivergence,
+    KLSufficientStatistics,
+)
+
+
+class LagKLDivergence:
+    """
+    Class used to compute the Kullback-Leibler divergences between a serie and its lagged versions, for many lags at once.
+    """
+
+    BLOCK_ELEMENTS = 2**22
+
+    METHODS = ("direct", "fft")
+    # above this length, the dot products of a single serie are faster than the row-wise ones of a panel
+    PANEL_MAX_LENGTH = 4096
+
+    @staticmethod
+    def compute(
+        values: np.ndarray,
+        lags: np.ndarray,
+        method: str = "direct",
+        block_elements: int | None = None,
+        offset: float = 0.0,
+    ) -> np.ndarray:
+        """
+        Compute, for each lag h, the divergence between the values and the values shifted by h.
+        Gives the same numbers as KLDivergence.compute(serie, serie.shift(h)), without building any shifted serie.
+        Non-negative values go through per-lag sums, other values through the exact entropy computed on blocks of lags.
+
+        :param values: The values of the serie, or a (series x length) array of several series.
+        :param lags: The positive lags to compute.
+        :param method: "direct" computes the sums of each lag in O(n), "fft" computes the sums of all the lags
+            up to the largest one in O(n log n), which pays off for long horizons.
+        :param block_elements: Approximate number of elements processed at once by the exact computation.
+        :param offset: A constant added to the values within the computation, without copying them.
+        :return: An array holding one divergence per lag, or a (series x lags) array for several series,
+            whose direct sums are computed for all the series at once, up to PANEL_MAX_LENGTH values per serie.
+        """
+        if method not in LagKLDivergence.METHODS:
+            raise ValueError(
+                f"Unknown method {method}, expected one of {LagKLDivergence.METHODS}"
+            )
+        values = np.asarray(values, dtype=float)
+        lags = np.asarray(lags, dtype=int)
+        if np.any(lags < 1):
+            raise ValueError("Lags should be positive")
+
+        if values.ndim > 1:
+            if (
+                method == "direct"
+                and values.shape[-1] <= LagKLDivergence.PANEL_MAX_LENGTH
+                and not np.any(values < -offset)
+            ):
+                return (
+                    LagKLDivergence.sufficient_statistics(
+                        values=values, lags=lags, offset=offset
+                    )
+                    .divergence()
+                    .T
+                )
+            return np.stack(
+                [
+                    LagKLDivergence.compute(
+                        values=row,
+                        lags=lags,
+                        method=method,
+                        block_elements=block_elements,
+                        offset=offset,
+                    )
+                    for row in values
+                ]
+            ).reshape(len(values), len(lags))
+
+        if np.any(values < -offset):
+            return LagKLDivergence.compute_exact(
+                values=values, lags=lags, block_elements=block_elements, offset=offset
+            )
+        if method == "fft" and len(lags):
+            max_lag = lags.max()
+            statistics = LagKLDivergence.sufficient_statistics_fft(
+                values=values, max_lag=max_lag, offset=offset
+            )
+            return statistics.divergence()[lags - 1]
+        return LagKLDivergence.sufficient_statistics(
+            values=values, lags=lags, offset=offset
+        ).divergence()
+
+    @staticmethod
+    def sufficient_statistics(
+        values: np.ndarray,
+        lags: np.ndarray,
+        scale: float | None = None,
+        offset: float = 0.0,
+        start: int = 0,
+    ) -> KLSufficientStatistics:
+        """
+        Compute the per-lag sums of the divergences between non-negative values and their lagged versions.
+        Each lag costs a few dot products over views of the values, logarithms being computed once.
+
+        :param values: The non-negative values of the serie, NaN allowed, or a (series x length) array of
+            several series, whose sums are computed for all the series at once.
+        :param lags: The positive lags to compute.
+        :param scale: The scale the logarithms are taken relative to, defaults to the mean positive value.
+        :param offset: A constant added to the values within the computation.
+        :param start: Only sum the pairs whose later value is at or after start, the values before start minus
+            the largest lag being never read. The sums of a serie extended from start positions then merge with
+            the sums of its first start positions, computed with the same scale.
+        :return: The sufficient statistics, one entry per lag, or a (lags x series) array per sum for several
+            series, their emptiness flags covering all the values.
+        """
+        lags = np.asarray(lags, dtype=int)
+        size = np.shape(values)[-1]
+        low = max(0, start - lags.max()) if len(lags) and start else 0
+        terms = LagKLDivergence.__lag_terms(
+            values=values[..., low:] if low else values, scale=scale, offset=offset
+        )
+
+        statistics = np.zeros((8, len(lags)) + np.shape(values)[:-1])
+        for position, lag in enumerate(lags):
+            first = max(start, lag)
+            if first < size:
+                statistics[:, position] = LagKLDivergence.__lag_sums(
+                    terms=terms,
+                    a=slice(first - low, size - low),
+                    b=slice(first - lag - low, size - lag - low),
+                )
+
+        if low:
+            terms = {
+                "size": size,
+                "first_nonzero": LagKLDivergence.__first_nonzero(
+                    values=values, offset=offset
+                ),
+            }
+        return LagKLDivergence.__to_statistics(
+            statistics=statistics, lags=lags, terms=terms
+        )
+
+    @staticmethod
+    def sufficient_statistics_fft(
+        values: np.ndarray,
+        max_lag: int,
+        offset: float = 0.0,
+        scale: float | None = None,
+    ) -> KLSufficientStatistics:
+        """
+        Compute the sufficient statistics of every lag from 1 to max_lag in O(n log n).
+        The cross terms of all lags are cross-correlations of the values with the lagged logarithms,
+        computed with FFTs, while the per-lag normalisations come from cumulative sums.
+
+        :param values: The non-negative values of the serie, NaN allowed.
+        :param max_lag: The largest lag to compute.
+        :param offset: A constant added to the values within the computation.
+        :param scale: The scale the logarithms are taken relative to, defaults to the mean positive value.
+        :return: The sufficient statistics, one entry per lag from 1 to max_lag.
+        """
+        from scipy.fft import irfft, next_fast_len, rfft
+
+        terms = LagKLDivergence.__lag_terms(values=values, scale=scale, offset=offset)
+        lags = np.arange(1, max_lag + 1)
+        size = terms["size"]
+        in_range = lags[lags < size]
+
+        spectra = {}
+        length = next_fast_len(2 * size - 1, real=True)
+
+        def correlate(u: str, v: str) -> np.ndarray:
+            for name in (u, v):
+                if name not in spectra:
+                    spectra[name] = rfft(terms[name], length)
+            correlation = irfft(spectra[u] * np.conj(spectra[v]), length)
+            return correlation[in_range]
+
+        statistics = np.zeros((8, len(lags)))
+        if len(in_range):
+            if terms["has_nan"]:
+                count = np.rint(correlate("mask", "mask"))
+                p_sum = correlate("x", "mask")
+                q_sum = correlate("mask", "x")
+                p_log_p = correlate("x_log_x", "mask")
+            else:
+                x_cumsum = np.concatenate([[0.0], np.cumsum(terms["x"])])
+                x_log_x_cumsum = np.concatenate([[0.0], np.cumsum(terms["x_log_x"])])
+                count = size - in_range
+                p_sum = x_cumsum[-1] - x_cumsum[in_range]
+                q_sum = x_cumsum[size - in_range]
+                p_log_p = x_log_x_cumsum[-1] - x_log_x_cumsum[in_range]
+            if terms["has_zero"]:
+                p_positive = np.rint(correlate("positive", "mask"))
+                q_positive = np.rint(correlate("mask", "positive"))
+                p_positive_q_zero = np.rint(correlate("positive", "zero"))
+            else:
+                p_positive = q_positive = count
+                p_positive_q_zero = np.zeros(len(in_range))
+            statistics[:, : len(in_range)] = (
+                count,
+                p_sum,
+                q_sum,
+                p_log_p,
+                correlate("x", "log_x"),
+                p_positive,
+                q_positive,
+                p_positive_q_zero,
+            )
+
+        return LagKLDivergence.__to_statistics(
+            statistics=statistics, lags=lags, terms=terms
+        )
+
+    @staticmethod
+    def compute_histogram(
+        values: np.ndarray,
+        lags: np.ndarray,
+        bins: int = 64,
+        smoothing: float = KLDivergence.HISTOGRAM_SMOOTHING,
+    ) -> np.ndarray:
+        """
+        Compute the lagged divergences with the histogram estimator.
+        The bin edges are computed once for the serie. Without gaps, the histograms of lag h are the histogram
+        of the serie minus its first (or last) h values, so they follow from the previous lag by removing a
+        single value, which leaves O(bins) work per lag. Series with gaps are binned again for each lag.
+
+        :param values: The values of the serie.
+        :param lags: The positive lags to compute.
+        :param bins: The number of bins of the histograms.
+        :param smoothing: The pseudo-count added to every bin.
+        :return: An array holding one divergence per lag.
+        """
+        values = np.asarray(values, dtype=float)
+        lags = np.asarray(lags, dtype=int)
+        if np.any(lags < 1):
+            raise ValueError("Lags should be positive")
+
+        finite = ~np.isnan(values)
+        if not finite.any():
+            return np.zeros(len(lags))
+
+        edges = KLDivergence.histogram_edges(values=values, bins=bins)
+        indices = KLDivergence.bin_indices(values=values, edges=edges)
+        first_finite = np.argmax(finite)
+        has_gaps = not finite[first_finite:].all()
+        indices = indices if has_gaps else indices[first_finite:]
+        size = len(indices)
+
+        kl_divergences = np.full(len(lags), np.inf)
+        in_range = np.flatnonzero(lags < size)
+        if not len(in_range):
+            return kl_divergences
+
+        if has_gaps:
+            p_counts, q_counts = LagKLDivergence.__masked_lag_histograms(
+                indices=indices, lags=lags[in_range], bins=bins
+            )
+        else:
+            max_lag = lags[in_range].max()
+            total = np.bincount(indices, minlength=bins)
+            removed = np.zeros((2, max_lag + 1, bins), dtype=np.int64)
+            removed[0, np.arange(1, max_lag + 1), indices[:max_lag]] = 1
+            removed[1, np.arange(1, max_lag + 1), indices[::-1][:max_lag]] = 1
+            np.cumsum(removed, axis=1, out=removed)
+            p_counts = total - removed[0, lags[in_range]]
+            q_counts = total - removed[1, lags[in_range]]
+
+        kl_divergences[in_range] = KLDivergence.histogram_divergence(
+            p_counts=p_counts, q_counts=q_counts, smoothing=smoothing
+        )
+        return kl_divergences
+
+    @staticmethod
+    def __masked_lag_histograms(
+        indices: np.ndarray, lags: np.ndarray, bins: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Bin the pairs of each lag where both values are defined."""
+        size = len(indices)
+        p_counts = np.zeros((len(lags), bins), dtype=np.int64)
+        q_counts = np.zeros((len(lags), bins), dtype=np.int64)
+        for position, lag in enumerate(lags):
+            p, q = indices[lag:], indices[: size - lag]
+            kept = (p >= 0) & (q >= 0)
+            p_counts[position] = np.bincount(p[kept], minlength=bins)
+            q_counts[position] = np.bincount(q[kept], minlength=bins)
+        return p_counts, q_counts
+
+    @staticmethod
+    def compute_chunked(
+        values: np.ndarray, lags: np.ndarray, chunk_size: int, offset: float = 0.0
+    ) -> np.ndarray:
+        """
+        Compute the lagged divergences of values that do not fit in memory, such as a memory-mapped array.
+        The values are read by chunks of chunk_size positions, plus the largest lag before them,
+        and the per-lag partial sums are accumulated across the chunks.
+        Non-negative values need a single pass, other values two passes with the exact entropy.
+
+        :param values: The values of the serie, any array supporting slicing.
+        :param lags: The positive lags to compute.
+        :param chunk_size: The number of positions read at once.
+        :param offset: A constant added to the values of each chunk once read.
+        :return: An array holding one divergence per lag.
+        """
+        lags = np.asarray(lags, dtype=int)
+        if np.any(lags < 1):
+            raise ValueError("Lags should be positive")
+
+        statistics = LagKLDivergence.__sufficient_statistics_chunked(
+            values=values, lags=lags, chunk_size=chunk_size, offset=offset
+        )
+        if statistics is None:
+            return LagKLDivergence.__compute_exact_chunked(
+                values=values, lags=lags, chunk_size=chunk_size, offset=offset
+            )
+        return statistics.divergence()
+
+    @staticmethod
+    def __sufficient_statistics_chunked(
+        values: np.ndarray, lags: np.ndarray, chunk_size: int, offset: float
+    ) -> KLSufficientStatistics | None:
+        """
+        Accumulate the sufficient statistics chunk by chunk, or return None as soon as a negative value is met.
+        """
+        size = len(values)
+        statistics = np.zeros((8, len(lags)))
+        scale = None
+        first_nonzero = size
+
+        for start, low, block in LagKLDivergence.__lagged_chunks(
+            values=values, lags=lags, chunk_size=chunk_size, offset=offset
+        ):
+            stop = low + len(block)
+            positive = block[start - low :] > 0
+            if np.any(block[start - low :] < 0):
+                return None
+            if positive.any():
+                first_nonzero = min(first_nonzero, start + np.argmax(positive))
+                if scale is None:
+                    scale = block[start - low :][positive].mean()
+
+            terms = LagKLDivergence.__lag_terms(values=block, scale=scale or 1.0)
+            for position, lag in enumerate(lags):
+                first = max(start, lag)
+                if first < stop:
+                    statistics[:, position] += LagKLDivergence.__lag_sums(
+                        terms=terms,
+                        a=slice(first - low, stop - low),
+                        b=slice(first - lag - low, stop - lag - low),
+                    )
+
+        return LagKLDivergence.__to_statistics(
+            statistics=statistics,
+            lags=lags,
+            terms={"size": size, "first_nonzero": first_nonzero},
+        )
+
+    @staticmethod
+    def __compute_exact_chunked(
+        values: np.ndarray, lags: np.ndarray, chunk_size: int, offset: float
+    ) -> np.ndarray:
+        """
+        Compute the exact lagged divergences in two passes over the chunks:
+        the first one sums the distributions of each lag, the second one sums the relative entropies.
+        """
+        from scipy.special import rel_entr
+
+        size = len(values)
+        sums = np.zeros((2, len(lags)))
+        divergences = np.zeros(len(lags))
+        first_nonzero = size
+
+        for normalizing in (True, False):
+            for start, low, block in LagKLDivergence.__lagged_chunks(
+                values=values, lags=lags, chunk_size=chunk_size, offset=offset
+            ):
+                stop = low + len(block)
+                if normalizing:
+                    nonzero = np.nan_to_num(block[start - low :]) != 0
+                    if nonzero.any():
+                        first_nonzero = min(first_nonzero, start + np.argmax(nonzero))
+                for position, lag in enumerate(lags):
+                    first = max(start, lag)
+                    if first >= stop:
+                        continue
+                    p = block[first - low : stop - low]
+                    q = block[first - lag - low : stop - lag - low]
+                    kept = ~np.isnan(p) & ~np.isnan(q)
+                    if normalizing:
+                        sums[:, position] += p[kept].sum(), q[kept].sum()
+                        continue
+                    with np.errstate(divide="ignore", invalid="ignore"):
+                        divergences[position] += rel_entr(
+                            p[kept] / sums[0, position], q[kept] / sums[1, position]
+                        ).sum()
+
+        divergences = np.where(size - lags <= first_nonzero, np.inf, divergences)
+        return np.where(first_nonzero == size, 0.0, divergences)
+
+    @staticmethod
+    def __lagged_chunks(
+        values: np.ndarray, lags: np.ndarray, chunk_size: int, offset: float = 0.0
+    ):
+        """
+        Yield (start, low, block) for each chunk of positions starting at start,
+        block holding the values from low, the largest lag before start, to the end of the chunk, plus offset.
+        """
+        size = len(values)
+        max_lag = min(lags.max(), size - 1) if len(lags) else 0
+        for start in range(0, size, chunk_size):
+            low = max(0, start - max_lag)
+            block = np.asarray(values[low : start + chunk_size], dtype=float)
+            yield start, low, block + offset if offset else block
+
+    @staticmethod
+    def __first_nonzero(values: np.ndarray, offset: float = 0.0) -> int:
+        """Find the position of the first positive value plus offset, reading the values by blocks."""
+        size = len(values)
+        for start in range(0, size, LagKLDivergence.BLOCK_ELEMENTS):
+            block = np.asarray(
+                values[start : start + LagKLDivergence.BLOCK_ELEMENTS], dtype=float
+            )
+            positive = block + offset > 0
+            if positive.any():
+                return start + int(np.argmax(positive))
+        return size
+
+    @staticmethod
+    def __lag_sums(terms: dict, a: slice, b: slice) -> tuple:
+        """
+        Compute the sums of one lag, p being the values in a and q the values in b, along the last axis,
+        so that the sums of several series are computed at once.
+        """
+        dot = np.dot if terms["x"].ndim == 1 else np.vecdot
+        if terms["has_nan"]:
+            mask = terms["mask"]
+            count = dot(mask[..., a], mask[..., b])
+            p_sum = dot(terms["x"][..., a], mask[..., b])
+            q_sum = dot(mask[..., a], terms["x"][..., b])
+            p_log_p = dot(terms["x_log_x"][..., a], mask[..., b])
+        else:
+            count = a.stop - a.start
+            p_sum = terms["x"][..., a].sum(axis=-1)
+            q_sum = terms["x"][..., b].sum(axis=-1)
+            p_log_p = terms["x_log_x"][..., a].sum(axis=-1)
+        if terms["has_zero"]:
+            p_positive = dot(terms["positive"][..., a], terms["mask"][..., b])
+            q_positive = dot(terms["mask"][..., a], terms["positive"][..., b])
+            p_positive_q_zero = dot(terms["positive"][..., a], terms["zero"][..., b])
+        else:
+            p_positive = q_positive = count
+            p_positive_q_zero = 0.0
+        sums = (
+            count,
+            p_sum,
+            q_sum,
+            p_log_p,
+            dot(terms["x"][..., a], terms["log_x"][..., b]),
+            p_positive,
+            q_positive,
+            p_positive_q_zero,
+        )
+        return sums if terms["x"].ndim == 1 else np.broadcast_arrays(*sums)
+
+    @staticmethod
+    def __lag_terms(
+        values: np.ndarray, scale: float | None = None, offset: float = 0.0
+    ) -> dict:
+        """
+        Precompute the per-point terms shared by all lags, the values being shifted by offset.
+        Logarithms are taken relative to the mean positive value, which leaves the divergences unchanged
+        and limits cancellations in the sums.
+        """
+        values = np.asarray(values, dtype=float)
+        size = values.shape[-1]
+        finite = ~np.isnan(values)
+        x = np.zeros(values.shape)
+        np.add(values, offset, out=x, where=finite)
+        positive = x > 0
+        zero = finite & ~positive
+
+        if scale is None and values.ndim == 1:
+            scale = x[positive].mean() if positive.any() else 1.0
+        elif scale is None:
+            counts = positive.sum(axis=-1, keepdims=True)
+            scale = np.where(
+                counts > 0,
+                np.sum(x, axis=-1, keepdims=True, where=positive)
+                / np.maximum(counts, 1),
+                1.0,
+            )
+        log_x = np.log(x / scale, out=np.zeros(values.shape), where=positive)
+
+        return {
+            "size": size,
+            "has_nan": not finite.all(),
+            "has_zero": bool(zero.any()),
+            "first_nonzero": np.where(
+                positive.any(axis=-1), positive.argmax(axis=-1), size
+            ),
+            "x": x,
+            "log_x": log_x,
+            "x_log_x": x * log_x,
+            "mask": finite.astype(float),
+            "positive": positive.astype(float),
+            "zero": zero.astype(float),
+        }
+
+    @staticmethod
+    def __to_statistics(
+        statistics: np.ndarray, lags: np.ndarray, terms: dict
+    ) -> KLSufficientStatistics:
+        """Wrap the per-lag sums along with the emptiness of p and of the lagged q, per lag and serie."""
+        size, first_nonzero = terms["size"], np.asarray(terms["first_nonzero"])
+        lags = lags.reshape((-1,) + (1,) * first_nonzero.ndim)
+        return KLSufficientStatistics(
+            *statistics,
+            p_empty=np.full((len(lags),) + first_nonzero.shape, first_nonzero == size),
+            q_empty=size - lags <= first_nonzero,
+        )
+
+    @staticmethod
+    def compute_exact(
+        values: np.ndarray,
+        lags: np.ndarray,
+        block_elements: int | None = None,
+        offset: float = 0.0,
+    ) -> np.ndarray:
+        """
+        Compute the lagged divergences of any values with the exact entropy.
+        The shifted versions are rows of a strided view over a NaN padded copy of the values,
+        processed by blocks of lags to bound the memory used.
+
+        :param values: The values of the serie.
+        :param lags: The positive lags to compute.
+        :param block_elements: Approximate number of elements processed at once.
+        :param offset: A constant added to the values, in the padded copy.
+        :return: An array holding one divergence per lag.
+        """
+        values = np.asarray(values, dtype=float)
+        lags = np.asarray(lags, dtype=int)
+        size = len(values)
+        block_elements = block_elements or LagKLDivergence.BLOCK_ELEMENTS
+
+        in_range = np.flatnonzero(lags < size)
+        max_lag = lags[in_range].max() if len(in_range) else 0
+        padded = np.full(max_lag + size, np.nan)
+        np.add(values, offset, out=padded[max_lag:])
+        values = padded[max_lag:]
+
+        is_p_empty = np.all(np.nan_to_num(values) == 0)
+        kl_divergences = np.full(len(lags), 0.0 if is_p_empty else np.inf)
+        if not len(in_range) or is_p_empty:
+            return kl_divergences
+
+        shifted = sliding_window_view(padded, size)
+
+        block_size = max(1, block_elements // size)
+        for start in range(0, len(in_range), block_size):
+            positions = in_range[start : start + block_size]
+            kl_divergences[positions] = KLDivergence.compute_batch(
+                p=values,
+                q=LagKLDivergence.__shifted_rows(
+                    shifted=shifted, offsets=max_lag - lags[positions]
+                ),
+            )
+        return kl_divergences
+
+    @staticmethod
+    def __shifted_rows(shifted: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+        """Select the shifted rows, as a view when the lags are consecutive."""
+        if len(offsets) > 1 and np.all(np.diff(offsets) == -1):
+            return shifted[offsets[-1] : offsets[0] + 1][::-1]
+        return shifted[offsets]
@@ -0,0 +1,112 @@
+from dataclasses import dataclass
+from statistics import NormalDist
+from typing import Callable
+
+import numpy as np
+
+from kl_evolution.core.features.kl_divergence import KLDivergence
+
+
+@dataclass
+class MonteCarloEstimate:
+    """
+    The mean of the divergences of many random draws, along with a normal confidence interval of that mean.
+    Each field holds one entry per reference distribution, or a float for a single one.
+    """
+
+    mean: float | np.ndarray
+    low: float | np.ndarray
+    high: float | np.ndarray
+    n_draws: int
+
+
+class MonteCarloKL:
+    """
+    Estimate the expected Kullback-Leibler divergence of random references from fixed distributions.
+    The draws are generated and compared as (draws x length) blocks, in a single vectorized pass per block,
+    the blocks being sized to bound the memory used.
+    """
+
+    BLOCK_ELEMENTS = 2**22
+
+    @staticmethod
+    def estimate(
+        p: np.ndarray,
+        draw: Callable[[np.random.Generator, int], np.ndarray],
+        n_draws: int,
+        seed: int | None = None,
+        confidence: float = 0.95,
+    ) -> MonteCarloEstimate:
+        """
+        Compute the mean divergence of n_draws random references from p, and its confidence interval.
+
+        :param p: The reference distributions, a (length,) array or a (distributions x length) array.
+        :param draw: A function drawing n references from a generator, as a (n x length) array,
+            or a (distributions x n x length) array when p holds several distributions.
+        :param n_draws: The number of draws.
+        :param seed: The seed of the generator.
+        :param confidence: The confidence level of the interval.
+        :return: The mean divergence and its interval. Infinite divergences make the whole estimate infinite.
+        """
+        if n_draws < 1:
+            raise ValueError("At least one draw is needed")
+        p = np.asarray(p, dtype=float)
+        generator = np.random.default_rng(seed)
+        block_draws = max(1, MonteCarloKL.BLOCK_ELEMENTS // max(p.size, 1))
+
+        count = 0
+        mean = m2 = np.zeros(p.shape[:-1])
+        infinite = np.zeros(p.shape[:-1], dtype=bool)
+        for start in range(0, n_draws, block_draws):
+            size = min(block_draws, n_draws - start)
+            divergences = MonteCarloKL.__divergences(p=p, q=draw(generator, size))
+            infinite |= np.isinf(divergences).any(axis=-1)
+            divergences = np.where(np.isinf(divergences), 0.0, divergences)
+
+            # merge the mean and the sum of squared deviations of the block with the previous ones
+            block_mean = divergences.mean(axis=-1)
+            delta = block_mean - mean
+            total = count + size
+            m2 = (
+                m2
+                + ((divergences - block_mean[..., np.newaxis]) ** 2).sum(axis=-1)
+                + delta**2 * count * size / total
+            )
+            mean = mean + delta * size / total
+            count = total
+
+        half_width = NormalDist().inv_cdf((1 + confidence) / 2) * np.sqrt(
+            m2 / max(n_draws - 1, 1) / n_draws
+        )
+        mean = np.where(infinite, np.inf, mean)
+        half_width = np.where(infinite, 0.0, half_width)
+        low, high = mean - half_width, mean + half_width
+        if p.ndim == 1:
+            mean, low, high = float(mean), float(low), float(high)
+        return MonteCarloEstimate(mean=mean, low=low, high=high, n_draws=n_draws)
+
+    @staticmethod
+    def __divergences(p: np.ndarray, q: np.ndarray) -> np.ndarray:
+        """
+        Compute the divergences of a block of draws q from p.
+        For non-negative p and positive draws, the divergence of each draw is
+        sum(p log p) / sum(p) - log sum(p) - sum(p log q) / sum(p) + log sum(q), the sums over q being
+        a single matrix product of log q with p, instead of an element-wise entropy over the whole block.
+        Other values go through KLDivergence.compute_batch.
+        """
+        kept = ~np.isnan(p)
+        if np.any(p[kept] < 0) or not np.all(q > 0):
+            return KLDivergence.compute_batch(p=p[..., np.newaxis, :], q=q)
+
+        p = np.where(kept, p, 0.0)
+        p_sum = p.sum(axis=-1)
+        p_log_p = np.sum(p * np.log(p, out=np.zeros(p.shape), where=p > 0), axis=-1)
+        p_log_q = np.matmul(np.log(q), p[..., np.newaxis])[..., 0]
+        q_sum = np.matmul(q, kept[..., np.newaxis].astype(float))[..., 0]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            divergences = (
+                (p_log_p - np.log(p_sum) * p_sum)[..., np.newaxis] - p_log_q
+            ) / p_sum[..., np.newaxis] + np.log(q_sum)
+        # the divergence is non-negative, negative values are rounding errors
+        divergences = np.maximum(divergences, 0.0)
+        return np.where((p_sum == 0)[..., np.newaxis], 0.0, divergences)
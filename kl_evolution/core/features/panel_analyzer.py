@@ -0,0 +1,132 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import Iterable
+
+import numpy as np
+
+from kl_evolution.core.data_objects.serie import Serie
+from kl_evolution.core.features.ts_analyzer import ShiftedSerieAnalyzer
+
+
+class PanelAnalyzer:
+    """
+    Class used to run a ShiftedSerieAnalyzer over many series, spread across a pool of processes.
+    The values of all the series are written once in a shared memory block, which the workers read without pickling.
+    """
+
+    def __init__(
+        self,
+        analyzer: ShiftedSerieAnalyzer,
+        n_workers: int | None = None,
+        chunk_size: int = 16,
+        min_parallel_points: int = 200_000,
+    ):
+        """
+        :param analyzer: The analyzer to run on each serie
+        :param n_workers: The number of worker processes, defaults to the number of CPUs
+        :param chunk_size: The number of series sent to a worker at once
+        :param min_parallel_points: Below this total number of values, the series are analyzed serially,
+            as starting the pool would cost more than it saves
+        """
+        if chunk_size < 1:
+            raise ValueError("The chunk size should be at least 1")
+        self.analyzer = analyzer
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.min_parallel_points = min_parallel_points
+
+    def compute_many(self, series: Iterable[Serie]) -> list[Serie]:
+        """
+        Compute the KL divergences over shifts of each serie.
+
+        :param series: The series to analyze.
+        :return: The KL divergences over shifts of each serie, in the input order.
+        """
+        series = list(series)
+        total_points = sum(len(serie) for serie in series)
+
+        if (
+            self.n_workers == 1
+            or len(series) <= self.chunk_size
+            or total_points < self.min_parallel_points
+        ):
+            return [self.analyzer.compute(serie=serie) for serie in series]
+
+        return self.__compute_in_pool(series=series, total_points=total_points)
+
+    def __compute_in_pool(self, series: list[Serie], total_points: int) -> list[Serie]:
+        """
+        Copy the values in a shared memory block, then analyze the series by chunks in the pool.
+        """
+        shared_memory = SharedMemory(create=True, size=max(total_points, 1) * 8)
+        try:
+            buffer = np.ndarray(total_points, dtype=float, buffer=shared_memory.buf)
+            descriptions = []
+            start = 0
+            for serie in series:
+                stop = start + len(serie)
+                buffer[start:stop] = serie.values
+                descriptions.append(
+                    (start, stop, serie.identifier, serie.detrend, serie.deseasonalize)
+                )
+                start = stop
+            del buffer
+
+            chunks = [
+                descriptions[position : position + self.chunk_size]
+                for position in range(0, len(descriptions), self.chunk_size)
+            ]
+            with ProcessPoolExecutor(max_workers=self.n_workers) as executor:
+                results = executor.map(
+                    PanelAnalyzer._compute_shared_chunk,
+                    [shared_memory.name] * len(chunks),
+                    [total_points] * len(chunks),
+                    [self.analyzer] * len(chunks),
+                    chunks,
+                )
+                kl_results = [result for chunk in results for result in chunk]
+        finally:
+            shared_memory.close()
+            shared_memory.unlink()
+
+        return [
+            Serie(values=values, index=lags, identifier="KL divergences over shifts")
+            for lags, values in kl_results
+        ]
+
+    @staticmethod
+    def _compute_shared_chunk(
+        shared_memory_name: str,
+        total_points: int,
+        analyzer: ShiftedSerieAnalyzer,
+        descriptions: list[tuple],
+    ) -> list[tuple[np.ndarray, np.ndarray]]:
+        """
+        Worker side: rebuild the series of a chunk from the shared memory block and analyze them.
+        The series are rebuilt from their already transformed values, only their flags are restored.
+        Each result is returned as its lags along with its values, the lags depending on the serie
+        when they are refined or stopped early.
+        """
+        shared_memory = SharedMemory(name=shared_memory_name)
+        try:
+            return PanelAnalyzer.__analyze_descriptions(
+                buffer=np.ndarray(total_points, dtype=float, buffer=shared_memory.buf),
+                analyzer=analyzer,
+                descriptions=descriptions,
+            )
+        finally:
+            shared_memory.close()
+
+    @staticmethod
+    def __analyze_descriptions(
+        buffer: np.ndarray, analyzer: ShiftedSerieAnalyzer, descriptions: list[tuple]
+    ) -> list[tuple[np.ndarray, np.ndarray]]:
+        results = []
+        for start, stop, identifier, detrend, deseasonalize in descriptions:
+            serie = Serie(values=buffer[start:stop], identifier=identifier)
+            serie.detrend = detrend
+            serie.deseasonalize = deseasonalize
+            kl_results = analyzer.compute(serie=serie)
+            results.append((np.asarray(kl_results.index), kl_results.values))
+        return results
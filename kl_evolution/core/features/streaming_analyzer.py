@@ -0,0 +1,186 @@
+from collections import deque
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from kl_evolution.core.data_objects.serie import Serie
+from kl_evolution.core.features.kl_divergence import KLSufficientStatistics
+from kl_evolution.core.features.lag_kl_divergence import LagKLDivergence
+
+
+class StreamingShiftedSerieAnalyzer:
+    """
+    Class used to follow the Kullback-Leibler divergences between a stream and shifted versions of itself,
+    over a sliding window.
+    Each new observation adds its pairs with the previous ones and removes the pairs of the expired observation,
+    which costs O(1) per lag instead of recomputing every lag over the window.
+    """
+
+    def __init__(
+        self,
+        window_size: int,
+        max_horizon: int,
+        resync_every: int | None = None,
+    ):
+        """
+        :param window_size: The number of observations in the sliding window
+        :param max_horizon: The maximum horizon of the shift
+        :param resync_every: Number of updates after which the running sums are recomputed from the window,
+            to stop rounding errors from piling up, defaults to the window size
+        """
+        if window_size < 2:
+            raise ValueError("The window should hold at least two observations")
+        self.window_size = window_size
+        self.max_horizon = max_horizon
+        self.resync_every = resync_every or window_size
+
+        self.__lags = np.arange(1, max_horizon + 1)
+        self.__buffer = np.full(window_size, np.nan)
+        self.__sums = np.zeros((8, max_horizon))
+        self.__scale = None
+        self.__n_seen = 0
+        self.__n_negatives = 0
+        self.__nonzero_positions = deque()
+
+    def update(self, value: float) -> None:
+        """
+        Push a new observation into the window.
+
+        :param value: The new observation, NaN for a missing one.
+        """
+        value = float(value)
+        if self.__scale is None and value > 0:
+            self.__scale = value
+
+        position = self.__n_seen
+        if position >= self.window_size:
+            self.__expire(position=position - self.window_size)
+
+        max_lag = min(self.window_size - 1, position)
+        lagged = np.full(self.max_horizon, np.nan)
+        if max_lag:
+            lagged_positions = position - self.__lags[: min(max_lag, self.max_horizon)]
+            lagged[: len(lagged_positions)] = self.__buffer[
+                lagged_positions % self.window_size
+            ]
+        self.__accumulate(p=value, q=lagged, sign=1.0)
+
+        self.__buffer[position % self.window_size] = value
+        self.__n_negatives += value < 0
+        if value != 0 and not np.isnan(value):
+            self.__nonzero_positions.append(position)
+        self.__n_seen += 1
+
+        if self.__n_seen % self.resync_every == 0:
+            self.__resync()
+
+    def current(self) -> Serie:
+        """
+        Compute the KL divergences over shifts of the current window.
+        Equal to ShiftedSerieAnalyzer(max_horizon, normalized=False).compute(self.window()).
+
+        :return: The KL divergences between the window and shifted versions of itself, indexed by the lags.
+        """
+        size = min(self.__n_seen, self.window_size)
+        if self.__n_negatives:
+            kl_divergences = LagKLDivergence.compute_exact(
+                values=self.window().values, lags=self.__lags
+            )
+        else:
+            start = self.__n_seen - size
+            first_nonzero = (
+                self.__nonzero_positions[0] - start
+                if self.__nonzero_positions
+                else size
+            )
+            kl_divergences = KLSufficientStatistics(
+                *self.__sums,
+                p_empty=np.full(self.max_horizon, first_nonzero == size),
+                q_empty=size - self.__lags <= first_nonzero,
+            ).divergence()
+        return Serie(
+            values=kl_divergences,
+            index=self.__lags,
+            identifier="KL divergences over shifts",
+        )
+
+    def window(self) -> Serie:
+        """The observations of the current window, oldest first."""
+        start = max(0, self.__n_seen - self.window_size)
+        positions = np.arange(start, self.__n_seen) % self.window_size
+        return Serie(values=self.__buffer[positions])
+
+    def stream(self, observations: Iterable[float]) -> Iterator[Serie]:
+        """
+        Push observations one by one and yield the KL divergences over shifts once the window is full.
+
+        :param observations: The incoming observations.
+        :return: A generator of KL divergences over shifts, one per observation.
+        """
+        for value in observations:
+            self.update(value=value)
+            if self.__n_seen >= self.window_size:
+                yield self.current()
+
+    def __expire(self, position: int) -> None:
+        """Remove the pairs whose lagged value is the observation leaving the window."""
+        expired = self.__buffer[position % self.window_size]
+        max_lag = min(self.window_size - 1, self.max_horizon)
+        current = np.full(self.max_horizon, np.nan)
+        current[:max_lag] = self.__buffer[
+            (position + self.__lags[:max_lag]) % self.window_size
+        ]
+        self.__accumulate(p=current, q=expired, sign=-1.0)
+
+        self.__n_negatives -= expired < 0
+        if self.__nonzero_positions and self.__nonzero_positions[0] == position:
+            self.__nonzero_positions.popleft()
+
+    def __accumulate(
+        self, p: float | np.ndarray, q: float | np.ndarray, sign: float
+    ) -> None:
+        """
+        Add (or remove) the contributions of one (p, q) pair per lag to the running sums.
+        Non-positive values count as zeros, as in LagKLDivergence.sufficient_statistics, so that the pairs added
+        here and those recomputed by a resync are removed alike.
+        """
+        p, q = np.broadcast_arrays(
+            np.asarray(p, dtype=float), np.asarray(q, dtype=float)
+        )
+        kept = ~np.isnan(p) & ~np.isnan(q)
+        p = np.where(kept, p, 0.0)
+        q = np.where(kept, q, 0.0)
+        scale = self.__scale or 1.0
+        log_p = np.log(p / scale, out=np.zeros(len(p)), where=p > 0)
+        log_q = np.log(q / scale, out=np.zeros(len(q)), where=q > 0)
+
+        self.__sums += sign * np.array(
+            [
+                kept,
+                p,
+                q,
+                p * log_p,
+                p * log_q,
+                kept & (p > 0),
+                kept & (q > 0),
+                kept & (p > 0) & (q <= 0),
+            ]
+        )
+
+    def __resync(self) -> None:
+        """Recompute the running sums from the observations of the window."""
+        statistics = LagKLDivergence.sufficient_statistics(
+            values=self.window().values, lags=self.__lags, scale=self.__scale or 1.0
+        )
+        self.__sums = np.array(
+            [
+                statistics.count,
+                statistics.p_sum,
+                statistics.q_sum,
+                statistics.p_log_p,
+                statistics.p_log_q,
+                statistics.p_positive,
+                statistics.q_positive,
+                statistics.p_positive_q_zero,
+            ]
+        )
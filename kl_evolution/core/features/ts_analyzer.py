@@ -1,8 +1,20 @@
-import copy
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Sequence
 
 import numpy as np
 from kl_evolution.core.data_objects.serie import Serie
-from kl_evolution.core.features.kl_divergence import KLDivergence
+from kl_evolution.core.data_objects.serie_frame import SerieFrame
+from kl_evolution.core.features.kl_divergence import (
+    KLDivergence,
+    KLSufficientStatistics,
+)
+from kl_evolution.core.features.lag_kl_divergence import LagKLDivergence
+from kl_evolution.core.features.monte_carlo import MonteCarloEstimate, MonteCarloKL
+from kl_evolution.core.utils.hashing import content_hash
+from kl_evolution.core.utils.instrumentation import Instrumentation
+from kl_evolution.core.utils.lru_cache import LRUCache
+from kl_evolution.core.utils.result_store import ResultStore
 
 
 class ShiftedSerieAnalyzer:
@@ -10,52 +22,350 @@ class ShiftedSerieAnalyzer:
     Class used to compute the Kullback-Leibler divergence between a serie and a shifted version of itself.
     """
 
+    REFERENCES = ("random", "seeded", "analytic", "monte_carlo")
+    REFERENCE_CACHE = LRUCache(maxsize=8)
+    OFFSET = 1000.0
+    COARSE_LAGS = 16
+    PLATEAU_BLOCK = 16
+    STORE_KEY_VALUES = 256
+
     def __init__(
         self,
-        max_horizon: int,
+        max_horizon: int | None,
         normalized: bool = True,
+        method: str = "direct",
+        chunk_size: int | None = None,
+        estimator: str = "values",
+        bins: int = 64,
+        reference: str = "random",
+        seed: int = 0,
+        lags: Sequence[int] | None = None,
+        refine_tolerance: float | None = None,
+        plateau_tolerance: float | None = None,
+        plateau_patience: int = 3,
+        store: ResultStore | None = None,
+        n_draws: int = 100,
     ):
         """
-        :param max_horizon: The maximum horizon of the shift
+        :param max_horizon: The maximum horizon of the shift, None to go up to the length of the serie minus one
         :param normalized: Whether to normalize the Kullback-Leibler divergence by the KL on a uniform distribution
+        :param method: "direct" computes each shift in O(n), "fft" computes all the shifts at once in O(n log n),
+            which is faster for long horizons
+        :param chunk_size: If given, read the values by chunks of that size, which bounds the memory used
+            for series that do not fit in memory, such as memory-mapped ones
+        :param estimator: "values" uses the values themselves as the distributions, "histogram" uses the histograms
+            of the values over bins shared by all the shifts, which does not depend on the scale of the values
+            and does not need any offset for detrended or deseasonalized series
+        :param bins: The number of bins of the histogram estimator
+        :param reference: The uniform reference used for normalization. "random" draws a new uniform sample on
+            each call, "seeded" draws it from seed and caches it by (min, max, length, seed) so that results are
+            reproducible, "analytic" uses the expected divergence from a uniform sample, without drawing it,
+            "monte_carlo" uses the mean divergence of n_draws uniform samples drawn from seed, see reference_estimate
+        :param seed: The seed of the "seeded" and "monte_carlo" references
+        :param lags: The shifts to compute, such as log_lags(max_horizon, n_lags), instead of every shift up to
+            max_horizon. Lags above max_horizon are dropped
+        :param refine_tolerance: If given, start from the lags, or from COARSE_LAGS log-spaced lags, and bisect
+            the intervals over which the curve changes by more than that fraction of its range, until no
+            such interval is left
+        :param plateau_tolerance: If given, compute the lags in increasing order and stop once plateau_patience
+            consecutive steps change the curve by less than that fraction of its value
+        :param plateau_patience: The number of flat steps that make a plateau
+        :param store: If given, keep the per-shift sums of each serie, by identifier, in that persistent store.
+            Unnamed series are keyed by the hash of their first STORE_KEY_VALUES values instead.
+            When the serie extends the values they were computed from, only the pairs of the new values are
+            computed and merged. Applies to the values estimator without chunks, refinement or early stopping,
+            and to non-negative values once offset
+        :param n_draws: The number of uniform samples of the "monte_carlo" reference
         """
+        if method not in LagKLDivergence.METHODS:
+            raise ValueError(
+                f"Unknown method {method}, expected one of {LagKLDivergence.METHODS}"
+            )
+        if estimator not in KLDivergence.ESTIMATORS:
+            raise ValueError(
+                f"Unknown estimator {estimator}, expected one of {KLDivergence.ESTIMATORS}"
+            )
+        if reference not in ShiftedSerieAnalyzer.REFERENCES:
+            raise ValueError(
+                f"Unknown reference {reference}, expected one of {ShiftedSerieAnalyzer.REFERENCES}"
+            )
+        if reference == "monte_carlo" and (chunk_size or estimator == "histogram"):
+            raise ValueError(
+                "The monte_carlo reference cannot be combined with chunks or the histogram estimator"
+            )
+        if chunk_size and method == "fft":
+            raise ValueError("The fft method cannot be computed by chunks")
+        if estimator == "histogram" and (chunk_size or method == "fft"):
+            raise ValueError(
+                "The histogram estimator cannot be combined with chunks or the fft method"
+            )
+        if lags is not None:
+            lags = np.unique(np.asarray(lags, dtype=int))
+            if len(lags) == 0 or lags[0] < 1:
+                raise ValueError("Lags should be positive and non-empty")
+        if plateau_patience < 1:
+            raise ValueError("The plateau patience should be at least one step")
         self.max_horizon = max_horizon
         self.normalized = normalized
+        self.method = method
+        self.chunk_size = chunk_size
+        self.estimator = estimator
+        self.bins = bins
+        self.reference = reference
+        self.seed = seed
+        self.lags = lags
+        self.refine_tolerance = refine_tolerance
+        self.plateau_tolerance = plateau_tolerance
+        self.plateau_patience = plateau_patience
+        self.store = store
+        self.n_draws = n_draws
+
+    @staticmethod
+    def log_lags(max_horizon: int, n_lags: int) -> np.ndarray:
+        """
+        Build about n_lags lags spaced logarithmically from 1 to max_horizon, the duplicates of the short lags
+        being dropped.
+
+        :param max_horizon: The largest lag.
+        :param n_lags: The number of lags wanted.
+        :return: The sorted, unique lags.
+        """
+        return np.unique(np.geomspace(1, max_horizon, num=n_lags).round().astype(int))
 
     @staticmethod
     def check_if_serie_is_not_empty(serie: Serie) -> bool:
         return serie.__len__() > 1
 
-    def compute(self, serie: Serie) -> Serie:
+    def compute(self, serie: Serie | SerieFrame) -> Serie | SerieFrame:
         """
         Compute the Kullback-Leibler divergences between a serie and shifted versions of itself.
-        If the serie has been detrended or deseasonalized, add a constant to the values before the computation to avoid NaN results.
-        We therefore recommand you to normalize the results for the scale not to be wrong.
+        If the serie has been detrended or deseasonalized, add a constant to the values within the computation to avoid NaN results.
+        We therefore recommand you to normalize the results for the scale not to be wrong, or to use the histogram estimator,
+        which needs no constant.
+        The serie is left untouched, so that it can be analyzed from several threads at once.
+        The series of a SerieFrame are analyzed together, each lag and each normalization being a single
+        operation over the whole panel.
+
+        :param serie: The series to analyze, or a frame of series.
+        :return: The Kullback-Leibler divergences between the series and shifted versions of itself,
+            indexed by the lags, as a frame with one row per serie for a frame.
+        """
+        if isinstance(serie, SerieFrame):
+            return self.__compute_frame(frame=serie)
+        return self.__compute_lags(serie=serie)
+
+    def compute_parallel(self, serie: Serie, n_threads: int | None = None) -> Serie:
+        """
+        Compute the same divergences as compute, the shifts being split in ranges computed by a pool of threads.
+        The per-shift sums run in NumPy kernels that release the GIL, so the ranges are computed at the same time.
+        The fft method computes all the shifts at once and is not split.
 
         :param serie: The series to analyze.
+        :param n_threads: The number of threads, defaults to the number of CPUs.
         :return: The Kullback-Leibler divergences between the series and shifted versions of itself.
         """
-        if not self.__is_valid_serie(serie=serie):
-            raise ValueError("The values should be non-empty")
+        n_threads = n_threads or os.cpu_count() or 1
+        if self.method == "fft" or n_threads == 1:
+            return self.compute(serie=serie)
+        return self.__compute_lags(serie=serie, n_threads=n_threads)
+
+    def reference_estimate(
+        self, serie: Serie, confidence: float = 0.95
+    ) -> MonteCarloEstimate:
+        """
+        Estimate the divergence of uniform samples over the range of the serie, which normalizes the results,
+        from n_draws samples drawn from seed, with the confidence interval of that estimate.
+
+        :param serie: The series to analyze.
+        :param confidence: The confidence level of the interval.
+        :return: The mean divergence of the samples and its interval.
+        """
+        offset = self.__offset(serie=serie)
+        statistics = serie.statistics
+        low, high = statistics.minimum + offset, statistics.maximum + offset
+        size = serie.__len__()
+        return MonteCarloKL.estimate(
+            p=np.asarray(serie.values, dtype=float) + offset,
+            draw=lambda generator, n: generator.uniform(
+                low=low, high=high, size=(n, size)
+            ),
+            n_draws=self.n_draws,
+            seed=self.seed,
+            confidence=confidence,
+        )
+
+    @staticmethod
+    def compute_configurations(
+        serie: Serie,
+        analyzers: Sequence["ShiftedSerieAnalyzer"],
+        n_threads: int | None = None,
+    ) -> list[Serie]:
+        """
+        Run several analyzers over one shared serie at the same time, in a pool of threads.
+
+        :param serie: The series to analyze.
+        :param analyzers: The analyzers, with their horizons and options.
+        :param n_threads: The number of threads, defaults to the number of CPUs.
+        :return: The divergences computed by each analyzer, in the same order.
+        """
+        with ThreadPoolExecutor(max_workers=n_threads) as executor:
+            return list(
+                executor.map(lambda analyzer: analyzer.compute(serie=serie), analyzers)
+            )
 
-        modified_serie = self.__is_modified(serie=serie)
-        original_values = None
+    def __compute_lags(self, serie: Serie, n_threads: int = 1) -> Serie:
+        """
+        Compute the divergences of the lags, split in ranges computed by n_threads threads,
+        stopping on a plateau and refining the steep intervals if asked, then normalize them.
+        """
+        with Instrumentation.stage("shifted_serie_analyzer.validation"):
+            if not self.__is_valid_serie(serie=serie):
+                raise ValueError("The values should be non-empty")
 
-        if modified_serie:
-            original_values = self.__modify_serie_values(serie=serie)
+        offset = self.__offset(serie=serie)
+        lags = self.__grid(serie=serie)
 
-        kl_divergences = self.__compute_kl_for_shifts(serie=serie)
+        with Instrumentation.stage(
+            "shifted_serie_analyzer.shifts", shifts=len(lags), values=len(serie)
+        ):
+            kl_divergences = None
+            if self.__is_storable():
+                kl_divergences = self.__compute_stored(
+                    serie=serie, lags=lags, offset=offset
+                )
+            if self.plateau_tolerance is not None:
+                lags, kl_divergences = self.__compute_until_plateau(
+                    serie=serie, lags=lags, offset=offset, n_threads=n_threads
+                )
+            elif kl_divergences is None:
+                kl_divergences = self.__compute_kl_in_threads(
+                    serie=serie, lags=lags, offset=offset, n_threads=n_threads
+                )
+            if self.refine_tolerance is not None:
+                lags, kl_divergences = self.__refine(
+                    serie=serie,
+                    lags=lags,
+                    kl_divergences=kl_divergences,
+                    offset=offset,
+                    n_threads=n_threads,
+                )
 
         if self.normalized:
-            kl_divergences = self.__normalize_kl(
-                serie=serie, kl_divergences=kl_divergences
+            with Instrumentation.stage("shifted_serie_analyzer.normalization"):
+                kl_divergences = self.__normalize_kl(
+                    serie=serie, kl_divergences=kl_divergences, offset=offset
+                )
+
+        return Serie(
+            values=kl_divergences,
+            index=lags,
+            identifier="KL divergences over shifts",
+        )
+
+    def __compute_frame(self, frame: SerieFrame) -> SerieFrame:
+        """
+        Compute the divergences of all the series of a frame at once, or one serie at a time for the options
+        that go through other estimators, chunks or the store.
+        """
+        if self.refine_tolerance is not None or self.plateau_tolerance is not None:
+            raise ValueError(
+                "Refinement and early stopping pick different lags for each serie, analyze them one by one"
+            )
+        with Instrumentation.stage("shifted_serie_analyzer.validation"):
+            if frame.length <= 1:
+                raise ValueError("The values should be non-empty")
+
+        lags = self.__grid(serie=frame)
+        if self.estimator != "values" or self.chunk_size or self.store is not None:
+            return SerieFrame(
+                values=np.stack([self.compute(serie=serie).values for serie in frame]),
+                index=lags,
+                identifiers=frame.identifiers,
             )
 
-        if modified_serie:
-            serie.values = original_values
-            del original_values
+        offset = self.__offset(serie=frame)
+        with Instrumentation.stage(
+            "shifted_serie_analyzer.shifts",
+            shifts=len(lags) * len(frame),
+            values=frame.values.size,
+        ):
+            kl_divergences = LagKLDivergence.compute(
+                values=frame.values, lags=lags, method=self.method, offset=offset
+            )
+
+        if self.normalized:
+            with Instrumentation.stage("shifted_serie_analyzer.normalization"):
+                kl_divergences = kl_divergences / self.__frame_reference_kl(
+                    frame=frame, offset=offset
+                ).reshape(-1, 1)
+
+        return SerieFrame(
+            values=kl_divergences, index=lags, identifiers=frame.identifiers
+        )
+
+    def __frame_reference_kl(self, frame: SerieFrame, offset: float) -> np.ndarray:
+        """
+        Compute the reference KL divergence of each serie of a frame, in vectorized passes over the panel.
+        The seeded samples of all the series are scaled from the same uniform draw, which gives each serie
+        the same sample as when it is analyzed alone.
+        """
+        values = frame.values + offset
+        low = frame.__min__().reshape(-1, 1) + offset
+        high = frame.__max__().reshape(-1, 1) + offset
 
-        return Serie(values=kl_divergences, identifier="KL divergences over shifts")
+        if self.reference == "analytic":
+            return self.__frame_analytic_uniform_kl(frame=frame, offset=offset)
+        if self.reference == "monte_carlo":
+            return MonteCarloKL.estimate(
+                p=values,
+                draw=lambda generator, n: low[:, np.newaxis]
+                + (high - low)[:, np.newaxis]
+                * generator.random((n, frame.length))[np.newaxis],
+                n_draws=self.n_draws,
+                seed=self.seed,
+            ).mean
+        if self.reference == "seeded":
+            uniform = np.random.default_rng(self.seed).random(frame.length)
+        else:
+            uniform = np.random.uniform(size=values.shape)
+        return KLDivergence.compute_batch(p=values, q=low + (high - low) * uniform)
+
+    def __frame_analytic_uniform_kl(
+        self, frame: SerieFrame, offset: float
+    ) -> np.ndarray:
+        """
+        The expected divergences of __analytic_uniform_kl for all the series of a frame at once.
+        Series with negative values fall back to their seeded sample.
+        """
+        values = frame.values + offset
+        low, high = frame.__min__() + offset, frame.__max__() + offset
+        finite = ~np.isnan(values)
+        size = finite.sum(axis=1)
+        p_sum = np.sum(values, axis=1, where=finite)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            p_log_p = np.sum(
+                values * np.log(values, out=np.zeros(values.shape), where=values > 0),
+                axis=1,
+                where=finite,
+            )
+            low_log_low = np.where(low > 0, low * np.log(low), 0.0)
+            expected_log_u = np.where(
+                high == low,
+                np.log(high),
+                (high * np.log(high) - low_log_low) / (high - low) - 1,
+            )
+            divergences = (
+                p_log_p / p_sum
+                - np.log(p_sum)
+                + np.log(size * (low + high) / 2)
+                - expected_log_u
+            )
+        divergences = np.where(high == 0, 0.0, divergences)
+        for position in np.flatnonzero(low < 0):
+            divergences[position] = self.__reference_kl(
+                serie=frame[int(position)], reference="seeded", offset=offset
+            )
+        return divergences
 
     def __is_valid_serie(self, serie: Serie) -> bool:
         """Check if the series is valid (not empty)."""
@@ -65,41 +375,339 @@ class ShiftedSerieAnalyzer:
         """Check if the series is either deseasonalized or detrended."""
         return serie.deseasonalize or serie.detrend
 
-    def __modify_serie_values(self, serie: Serie) -> np.ndarray:
+    def __offset(self, serie: Serie) -> float:
+        """
+        The constant added to the values within the computation to avoid NaN results, if deseasonalized/detrended.
+        The histogram estimator does not depend on the location of the values and needs none.
+        """
+        if self.__is_modified(serie=serie) and self.estimator == "values":
+            return ShiftedSerieAnalyzer.OFFSET
+        return 0.0
+
+    def __max_horizon(self, serie: Serie | SerieFrame) -> int:
+        if self.max_horizon is not None:
+            return self.max_horizon
+        return serie.values.shape[-1] - 1
+
+    def __grid(self, serie: Serie) -> np.ndarray:
+        """The lags to compute first: the given ones, a coarse log-spaced grid to refine, or every shift."""
+        max_horizon = self.__max_horizon(serie=serie)
+        if self.lags is not None:
+            if self.max_horizon is None:
+                return self.lags
+            return self.lags[self.lags <= max_horizon]
+        if self.refine_tolerance is not None:
+            return self.log_lags(
+                max_horizon=max_horizon, n_lags=ShiftedSerieAnalyzer.COARSE_LAGS
+            )
+        return np.arange(1, max_horizon + 1)
+
+    def __is_storable(self) -> bool:
+        """Whether the divergences go through sums that can be stored and extended."""
+        return (
+            self.store is not None
+            and self.estimator == "values"
+            and not self.chunk_size
+            and self.refine_tolerance is None
+            and self.plateau_tolerance is None
+        )
+
+    def __compute_stored(
+        self, serie: Serie, lags: np.ndarray, offset: float
+    ) -> np.ndarray | None:
+        """
+        Compute the divergences from the per-shift sums stored for the serie, extended with the pairs of the
+        values appended since, or from scratch, and store the new sums.
+        The logarithms are taken relative to the first positive value, which does not change on append.
+        :return: The divergences, or None when the values have negative values once offset.
+        """
+        values = serie.values
+        parameters = f"lags={content_hash(lags)} offset={offset!r}"
+        identifier = serie.identifier or (
+            f"unnamed:{content_hash(values[: ShiftedSerieAnalyzer.STORE_KEY_VALUES])}"
+        )
+        entry = self.store.get(identifier=identifier, parameters=parameters)
+
+        if (
+            entry is not None
+            and entry["length"] <= len(values)
+            and content_hash(values[: entry["length"]]) == entry["fingerprint"]
+        ):
+            length, scale = entry["length"], float(entry["scale"])
+            statistics = KLSufficientStatistics(
+                **{name: entry[name] for name in KLSufficientStatistics.SUMS},
+                p_empty=entry["p_empty"],
+                q_empty=entry["q_empty"],
+            )
+            if length == len(values):
+                return statistics.divergence()
+            if np.any(values[length:] < -offset):
+                return None
+            statistics = statistics.merge(
+                LagKLDivergence.sufficient_statistics(
+                    values=values, lags=lags, scale=scale, offset=offset, start=length
+                )
+            )
+        else:
+            if np.any(values < -offset):
+                return None
+            positive = np.flatnonzero(values + offset > 0)
+            scale = float(values[positive[0]] + offset) if len(positive) else 1.0
+            if self.method == "fft" and len(lags):
+                statistics = LagKLDivergence.sufficient_statistics_fft(
+                    values=values, max_lag=lags.max(), offset=offset, scale=scale
+                ).select(lags - 1)
+            else:
+                statistics = LagKLDivergence.sufficient_statistics(
+                    values=values, lags=lags, scale=scale, offset=offset
+                )
+
+        self.store.put(
+            identifier=identifier,
+            parameters=parameters,
+            fingerprint=content_hash(values),
+            length=len(values),
+            arrays={**vars(statistics), "scale": np.array(scale)},
+        )
+        return statistics.divergence()
+
+    def __compute_kl_in_threads(
+        self, serie: Serie, lags: np.ndarray, offset: float, n_threads: int
+    ) -> np.ndarray:
+        """Compute the KL divergences of the lags, split in ranges computed by n_threads threads."""
+        if n_threads == 1 or len(lags) < 2:
+            return self.__compute_kl_for_shifts(serie=serie, lags=lags, offset=offset)
+        with ThreadPoolExecutor(max_workers=n_threads) as executor:
+            blocks = executor.map(
+                lambda block: self.__compute_kl_for_shifts(
+                    serie=serie, lags=block, offset=offset
+                ),
+                np.array_split(lags, min(n_threads, len(lags))),
+            )
+            return np.concatenate(list(blocks))
+
+    def __compute_until_plateau(
+        self, serie: Serie, lags: np.ndarray, offset: float, n_threads: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Compute the lags by blocks of doubling size and stop at the end of the first plateau,
+        where plateau_patience consecutive steps change the curve by less than plateau_tolerance of its value.
+        :return: The lags computed up to the plateau and their divergences.
+        """
+        blocks = []
+        start, block_size = 0, ShiftedSerieAnalyzer.PLATEAU_BLOCK
+        while start < len(lags):
+            stop = start + block_size
+            blocks.append(
+                self.__compute_kl_in_threads(
+                    serie=serie,
+                    lags=lags[start:stop],
+                    offset=offset,
+                    n_threads=n_threads,
+                )
+            )
+            kl_divergences = np.concatenate(blocks)
+            flat = np.abs(np.diff(kl_divergences)) <= self.plateau_tolerance * np.abs(
+                kl_divergences[:-1]
+            )
+            if len(flat) >= self.plateau_patience:
+                runs = np.convolve(flat, np.ones(self.plateau_patience), mode="valid")
+                plateaus = np.flatnonzero(runs == self.plateau_patience)
+                if len(plateaus):
+                    end = plateaus[0] + self.plateau_patience + 1
+                    return lags[:end], kl_divergences[:end]
+            start, block_size = stop, 2 * block_size
+        return lags, np.concatenate(blocks) if blocks else np.array([])
+
+    def __refine(
+        self,
+        serie: Serie,
+        lags: np.ndarray,
+        kl_divergences: np.ndarray,
+        offset: float,
+        n_threads: int,
+    ) -> tuple[np.ndarray, np.ndarray]:
         """
-        Modify the series values by adding a constant to avoid NaN results, if deseasonalized/detrended.
-        :param serie: The series object to modify.
-        :return: The original values before modification.
+        Bisect the intervals between consecutive lags over which the curve changes by more than
+        refine_tolerance of its range, all the middles of a round being computed at once.
+        :return: The refined lags and their divergences.
         """
-        original_values = copy.deepcopy(serie.values)
-        serie.values = serie.values + 1000
-        return original_values
+        while True:
+            finite = kl_divergences[np.isfinite(kl_divergences)]
+            span = np.ptp(finite) if len(finite) else 0.0
+            steep = (np.diff(lags) > 1) & (
+                np.abs(np.diff(kl_divergences)) > self.refine_tolerance * span
+            )
+            if not steep.any():
+                return lags, kl_divergences
+            middles = (lags[:-1][steep] + lags[1:][steep]) // 2
+            lags = np.concatenate([lags, middles])
+            kl_divergences = np.concatenate(
+                [
+                    kl_divergences,
+                    self.__compute_kl_in_threads(
+                        serie=serie, lags=middles, offset=offset, n_threads=n_threads
+                    ),
+                ]
+            )
+            order = np.argsort(lags)
+            lags, kl_divergences = lags[order], kl_divergences[order]
 
-    def __compute_kl_for_shifts(self, serie: Serie) -> list:
+    def __compute_kl_for_shifts(
+        self, serie: Serie, lags: np.ndarray, offset: float
+    ) -> np.ndarray:
         """
-        Compute KL divergences for each shift up to the maximum horizon.
+        Compute KL divergences for the given shifts, all shifts at once.
         :param serie: The original series.
-        :return: A list of KL divergence values.
+        :param lags: The shifts.
+        :param offset: The constant added to the values within the computation.
+        :return: An array of KL divergence values.
         """
-        kl_divergences = []
-        for shift in range(1, self.max_horizon + 1):
-            shifted_serie = Serie(values=serie.values).shift(shift=shift)
-            kl_divergences.append(KLDivergence.compute(serie, shifted_serie))
-        return kl_divergences
+        if self.estimator == "histogram":
+            return LagKLDivergence.compute_histogram(
+                values=serie.values, lags=lags, bins=self.bins
+            )
+        if self.chunk_size:
+            return LagKLDivergence.compute_chunked(
+                values=serie.values,
+                lags=lags,
+                chunk_size=self.chunk_size,
+                offset=offset,
+            )
+        return LagKLDivergence.compute(
+            values=serie.values, lags=lags, method=self.method, offset=offset
+        )
 
-    def __normalize_kl(self, serie: Serie, kl_divergences: list) -> list:
+    def __normalize_kl(
+        self, serie: Serie, kl_divergences: np.ndarray, offset: float
+    ) -> np.ndarray:
         """
         Normalize KL divergences by dividing by a reference KL divergence.
         :param serie: The original series.
-        :param kl_divergences: List of computed KL divergences.
-        :return: List of normalized KL divergences.
+        :param kl_divergences: Array of computed KL divergences.
+        :param offset: The constant added to the values within the computation.
+        :return: Array of normalized KL divergences.
         """
-        ref_kl = KLDivergence.compute(
+        ref_kl = self.__reference_kl(
+            serie=serie, reference=self.reference, offset=offset
+        )
+        return kl_divergences / ref_kl
+
+    def __reference_kl(self, serie: Serie, reference: str, offset: float) -> float:
+        """
+        Compute the KL divergence between the serie and a uniform distribution over its range.
+        An offset serie is read by blocks, so that the offset values are never held in full.
+        :param serie: The original series.
+        :param reference: How the uniform distribution is obtained, one of REFERENCES.
+        :param offset: The constant added to the values within the computation.
+        :return: The reference KL divergence.
+        """
+        if reference == "analytic":
+            return self.__analytic_uniform_kl(serie=serie, offset=offset)
+        if reference == "monte_carlo":
+            return self.reference_estimate(serie=serie).mean
+        if self.chunk_size or offset:
+            return self.__chunked_uniform_kl(
+                serie=serie, reference=reference, offset=offset
+            )
+        return KLDivergence.compute(
             p=serie,
-            q=Serie(
-                values=np.random.uniform(
-                    low=serie.__min__(), high=serie.__max__(), size=serie.__len__()
-                ),
-            ),
+            q=Serie(values=self.__uniform_sample(serie=serie, reference=reference)),
+            estimator=self.estimator,
+            bins=self.bins,
+        )
+
+    def __uniform_sample(self, serie: Serie, reference: str) -> np.ndarray:
+        """
+        Draw a uniform sample over the range of the serie, or reuse the cached one for a seeded reference.
+        """
+        statistics = serie.statistics
+        low, high, size = statistics.minimum, statistics.maximum, serie.__len__()
+        if reference == "random":
+            return np.random.uniform(low=low, high=high, size=size)
+
+        key = (float(low), float(high), size, self.seed)
+        sample = ShiftedSerieAnalyzer.REFERENCE_CACHE.get(key)
+        if sample is None:
+            sample = np.random.default_rng(self.seed).uniform(
+                low=low, high=high, size=size
+            )
+            sample.flags.writeable = False
+            ShiftedSerieAnalyzer.REFERENCE_CACHE.put(key, sample)
+        return sample
+
+    def __chunked_uniform_kl(
+        self, serie: Serie, reference: str, offset: float
+    ) -> float:
+        """
+        Compute the reference KL divergence by chunks, without drawing the whole uniform sample at once.
+        The sample is drawn again from the same seed for each pass over the chunks, which gives the same
+        sample as a single draw.
+        """
+        statistics = serie.statistics
+        low, high = statistics.minimum + offset, statistics.maximum + offset
+        seed = self.seed if reference == "seeded" else np.random.randint(2**31)
+        chunk_size = self.chunk_size or LagKLDivergence.BLOCK_ELEMENTS
+
+        def chunks():
+            generator = np.random.default_rng(seed)
+            for start in range(0, len(serie), chunk_size):
+                p_chunk = serie.values[start : start + chunk_size] + offset
+                yield p_chunk, generator.uniform(low=low, high=high, size=len(p_chunk))
+
+        return KLDivergence.compute_from_chunks(chunks=chunks)
+
+    def __analytic_uniform_kl(self, serie: Serie, offset: float) -> float:
+        """
+        Compute the expected KL divergence between the serie and a uniform sample over its range.
+        For the values estimator, a uniform sample u normalized by its sum is close to u / (n * mean),
+        which gives sum(p log p) + log(n * (low + high) / 2) - E[log u].
+        For the histogram estimator, the uniform histogram holds n / bins values in each bin.
+        Series with negative values fall back to the seeded sample.
+        """
+        statistics = serie.statistics
+        low, high = statistics.minimum + offset, statistics.maximum + offset
+        has_nan = statistics.nan_count > 0
+        if self.estimator == "histogram":
+            finite = serie.values[~np.isnan(serie.values)] if has_nan else serie.values
+            edges = KLDivergence.histogram_edges(values=finite, bins=self.bins)
+            p_counts = np.bincount(
+                KLDivergence.bin_indices(values=finite, edges=edges),
+                minlength=self.bins,
+            )
+            return float(
+                KLDivergence.histogram_divergence(
+                    p_counts=p_counts,
+                    q_counts=np.full(self.bins, len(finite) / self.bins),
+                )
+            )
+
+        if low < 0:
+            return self.__reference_kl(serie=serie, reference="seeded", offset=offset)
+        if high == 0:
+            return 0.0
+
+        size = p_sum = p_log_p = 0.0
+        block_size = self.chunk_size or LagKLDivergence.BLOCK_ELEMENTS
+        for start in range(0, len(serie), block_size):
+            block = np.asarray(serie.values[start : start + block_size], dtype=float)
+            if has_nan:
+                block = block[~np.isnan(block)]
+            block = block + offset
+            size += len(block)
+            p_sum += block.sum()
+            p_log_p += np.sum(
+                block * np.log(block, out=np.zeros(len(block)), where=block > 0)
+            )
+
+        if high == low:
+            expected_log_u = np.log(high)
+        else:
+            low_log_low = low * np.log(low) if low > 0 else 0.0
+            expected_log_u = (high * np.log(high) - low_log_low) / (high - low) - 1
+        return float(
+            p_log_p / p_sum
+            - np.log(p_sum)
+            + np.log(size * (low + high) / 2)
+            - expected_log_u
         )
-        return [kl / ref_kl for kl in kl_divergences]
@@ -0,0 +1,178 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Callable, Sequence
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from kl_evolution.core.data_objects.serie import Serie
+from kl_evolution.core.results_formatting.evaluation import ForecastEvaluation
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+class RollingOriginBacktest:
+    """
+    Class used to evaluate forecasts of a single serie over many rolling origins, based on the DKL.
+    For an origin o, the train set is the values before o and the test set the horizon values from o.
+    The statistics of all the test windows come from cumulative sums over the serie, and the baselines
+    and DKL of all the origins are computed with array operations, instead of one evaluation per origin.
+    """
+
+    def __init__(
+        self,
+        horizon: int,
+        seasonal_period: int | None = None,
+        normalize: bool = False,
+        n_workers: int = 1,
+        seed: int | None = None,
+    ):
+        """
+        :param horizon: The number of values of each test set
+        :param seasonal_period: If given, add the seasonal naive baseline
+        :param normalize: Whether to divide the results by the DKL of the uniform baseline
+        :param n_workers: The number of processes the origins are spread across, 1 to run in the current process
+        :param seed: The seed of the random baselines
+        """
+        if horizon < 1:
+            raise ValueError("The horizon should be at least 1")
+        self.horizon = horizon
+        self.seasonal_period = seasonal_period
+        self.normalize = normalize
+        self.n_workers = n_workers
+        self.seed = seed
+
+    def run(
+        self,
+        serie: Serie,
+        origins: Sequence[int],
+        models: dict[str, Callable[[np.ndarray, int], np.ndarray]] | None = None,
+        forecasts: np.ndarray | None = None,
+        model_names: Sequence[str] | None = None,
+    ) -> "pd.DataFrame":
+        """
+        Evaluate the models at each origin.
+
+        :param serie: The serie to backtest on.
+        :param origins: The positions where the test sets start.
+        :param models: Forecasting functions called as model(train_values, horizon), by name.
+            They must be picklable to run in several processes.
+        :param forecasts: Precomputed forecasts, as an (origins x models x horizon) array, instead of models.
+        :param model_names: The names of the precomputed forecasts.
+        :return: A DataFrame with one row per origin and one column per baseline and model.
+        """
+        values = np.asarray(serie.values, dtype=float)
+        origins = np.asarray(origins, dtype=int)
+        if np.any(origins < 1) or np.any(origins + self.horizon > len(values)):
+            raise ValueError(
+                "Origins should leave at least one train value and a full horizon of test values"
+            )
+        if forecasts is not None:
+            forecasts = np.asarray(forecasts, dtype=float)
+            model_names = list(
+                model_names or [f"model_{i}" for i in range(forecasts.shape[1])]
+            )
+        else:
+            models = models or {}
+            model_names = list(models)
+
+        test_values = sliding_window_view(values, self.horizon)[origins]
+        mean, std = self.__window_moments(values=values, origins=origins)
+        baseline_names, baselines = ForecastEvaluation.build_baselines(
+            size=self.horizon,
+            low=np.nanmin(test_values, axis=1),
+            high=np.nanmax(test_values, axis=1),
+            mean=mean,
+            std=std,
+            last_values=values[origins - 1],
+            first_seasons=np.tile(
+                values[: self.seasonal_period or 0], (len(origins), 1)
+            ),
+            seasonal_period=self.seasonal_period,
+            seed=self.seed,
+        )
+
+        chunks = np.array_split(
+            np.arange(len(origins)), max(1, min(self.n_workers, len(origins)))
+        )
+        arguments = [
+            (
+                values,
+                origins[rows],
+                test_values[rows],
+                baselines[rows],
+                forecasts[rows] if forecasts is not None else None,
+                models,
+            )
+            for rows in chunks
+        ]
+        if len(arguments) > 1:
+            with ProcessPoolExecutor(max_workers=self.n_workers) as executor:
+                results = list(
+                    executor.map(
+                        RollingOriginBacktest._evaluate_chunk, *zip(*arguments)
+                    )
+                )
+        else:
+            results = [RollingOriginBacktest._evaluate_chunk(*arguments[0])]
+        divergences = np.concatenate(results)
+
+        if self.normalize:
+            divergences = divergences / divergences[:, :1]
+
+        import pandas as pd
+
+        return pd.DataFrame(
+            divergences,
+            index=pd.Index(origins, name="origin"),
+            columns=baseline_names + model_names,
+        )
+
+    def __window_moments(
+        self, values: np.ndarray, origins: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Compute the NaN-aware mean and standard deviation of every test window from cumulative sums.
+        Values are centered first, which keeps the sums of squares accurate.
+        """
+        finite = ~np.isnan(values)
+        centered = np.where(finite, values - np.nanmean(values), 0.0)
+        sums = [
+            np.concatenate([[0.0], np.cumsum(terms)])
+            for terms in (finite, centered, centered**2)
+        ]
+        count, total, squares = (
+            cumulative[origins + self.horizon] - cumulative[origins]
+            for cumulative in sums
+        )
+        with np.errstate(divide="ignore", invalid="ignore"):
+            centered_mean = total / count
+            variance = np.maximum(squares / count - centered_mean**2, 0.0)
+        return centered_mean + np.nanmean(values), np.sqrt(variance)
+
+    @staticmethod
+    def _evaluate_chunk(
+        values: np.ndarray,
+        origins: np.ndarray,
+        test_values: np.ndarray,
+        baselines: np.ndarray,
+        forecasts: np.ndarray | None,
+        models: dict | None,
+    ) -> np.ndarray:
+        """
+        Forecast the test sets of a chunk of origins, if needed, and compute their DKL.
+        """
+        if forecasts is None:
+            horizon = test_values.shape[1]
+            forecasts = np.array(
+                [
+                    [
+                        np.asarray(model(values[:origin], horizon), dtype=float)
+                        for model in models.values()
+                    ]
+                    for origin in origins
+                ]
+            ).reshape(len(origins), len(models), horizon)
+        return ForecastEvaluation.divergence_matrix(
+            test_values=test_values, baselines=baselines, forecast_values=forecasts
+        )
@@ -0,0 +1,91 @@
+import numpy as np
+
+
+class Decimation:
+    """
+    Selection of the points of a curve worth drawing, when it holds many more points than the pixels of the plot.
+    Both methods return the sorted positions of the kept points, so that they apply to any index.
+    """
+
+    METHODS = ("min_max", "lttb")
+
+    @staticmethod
+    def positions(values: np.ndarray, width: int, method: str) -> np.ndarray:
+        """
+        :param values: The values of the curve, evenly spaced.
+        :param width: The number of pixels the curve is drawn over.
+        :param method: "min_max" keeps the extremes of each pixel, which preserves the envelope drawn,
+            "lttb" keeps one point per pixel, chosen to preserve the visual shape of the curve.
+        :return: The positions of the kept points.
+        """
+        if method == "min_max":
+            return Decimation.min_max(values=values, buckets=width)
+        if method == "lttb":
+            return Decimation.lttb(values=values, threshold=width)
+        raise ValueError(
+            f"Unknown method {method}, expected one of {Decimation.METHODS}"
+        )
+
+    @staticmethod
+    def min_max(values: np.ndarray, buckets: int) -> np.ndarray:
+        """
+        Keep the minimum and the maximum of each of buckets consecutive slices of the values, in their order.
+        NaNs are ignored, a slice holding only NaNs keeps one of them so that the gap is still drawn.
+
+        :param values: The values to decimate.
+        :param buckets: The number of slices.
+        :return: The positions of at most 2 * buckets points.
+        """
+        values = np.asarray(values, dtype=float)
+        size = len(values)
+        if size <= 2 * buckets:
+            return np.arange(size)
+
+        bucket_size = -(-size // buckets)
+        padded = np.full(bucket_size * buckets, np.nan)
+        padded[:size] = values
+        padded = padded.reshape(buckets, bucket_size)
+        is_nan = np.isnan(padded)
+        lowest = np.where(is_nan, np.inf, padded).argmin(axis=1)
+        highest = np.where(is_nan, -np.inf, padded).argmax(axis=1)
+
+        offsets = np.arange(buckets)[:, np.newaxis] * bucket_size
+        positions = np.sort(np.stack([lowest, highest], axis=1), axis=1) + offsets
+        positions = positions.ravel()
+        return np.unique(positions[positions < size])
+
+    @staticmethod
+    def lttb(values: np.ndarray, threshold: int) -> np.ndarray:
+        """
+        Largest-Triangle-Three-Buckets: keep the first and last points, and in each of threshold - 2 buckets the point
+        forming the largest triangle with the point kept in the previous bucket and the average of the next bucket.
+
+        :param values: The values to decimate.
+        :param threshold: The number of points kept.
+        :return: The positions of the kept points.
+        """
+        values = np.asarray(values, dtype=float)
+        size = len(values)
+        if threshold >= size or threshold < 3:
+            return np.arange(size)
+
+        edges = np.linspace(1, size - 1, threshold - 1).astype(int)
+        edges = np.append(edges, size)
+        positions = np.empty(threshold, dtype=int)
+        positions[0], positions[-1] = 0, size - 1
+        kept = 0
+        for bucket in range(threshold - 2):
+            start, end = edges[bucket], edges[bucket + 1]
+            next_values = values[end : edges[bucket + 2]]
+            finite = next_values[~np.isnan(next_values)]
+            next_x = (end + edges[bucket + 2] - 1) / 2
+            next_y = finite.mean() if len(finite) else values[kept]
+
+            x = np.arange(start, end)
+            areas = np.abs(
+                (kept - next_x) * (values[start:end] - values[kept])
+                - (kept - x) * (next_y - values[kept])
+            )
+            kept = start + np.nan_to_num(areas, nan=-1.0).argmax()
+            positions[bucket + 1] = kept
+        return positions
@@ -1,10 +1,24 @@
+from typing import TYPE_CHECKING, Sequence
+
 import numpy as np
 
 from kl_evolution.core.data_objects.serie import Serie
+from kl_evolution.core.data_objects.serie_frame import SerieFrame
 from kl_evolution.core.features.kl_divergence import KLDivergence
+from kl_evolution.core.features.monte_carlo import MonteCarloEstimate, MonteCarloKL
+from kl_evolution.core.utils.hashing import content_hash
+from kl_evolution.core.utils.instrumentation import Instrumentation
+from kl_evolution.core.utils.lru_cache import LRUCache
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 class ForecastEvaluation:
+    BASELINE_CACHE = LRUCache(maxsize=32)
+    BLOCK_ELEMENTS = 2**22
+    RANDOM_BASELINES = ("uniform", "white_noise", "random_walk")
+
     @staticmethod
     def evaluate_forecast(
         train_set: Serie,
@@ -12,46 +26,73 @@ class ForecastEvaluation:
         forecasts: list[Serie],
         seasonal_period: int | None = None,
         normalize: bool = False,
+        n_draws: int | None = None,
+        seed: int | None = None,
     ) -> dict:
         """
         Evaluate a forecast against a test set based on the DKL.
         Can normalize results by the DKL of a uniform distribution to help interpretability.
+        With n_draws, the uniform, white noise and random walk baselines are the mean DKL of n_draws samples
+        drawn from seed, along with the bounds of their 95% confidence intervals as "<baseline>_low" and
+        "<baseline>_high".
         """
-        min = test_set.__min__()
-        max = test_set.__max__()
-        mean = test_set.__avg__()
-        std = test_set.__std__()
-        size = test_set.__len__()
+        with Instrumentation.stage("forecast_evaluation.baselines"):
+            statistics = test_set.statistics
+            min = statistics.minimum
+            max = statistics.maximum
+            mean = statistics.mean
+            std = statistics.std
+            size = test_set.__len__()
 
-        white_noise_ref = np.random.normal(loc=mean, scale=std, size=size)
-        random_walk = np.cumsum(white_noise_ref)
-        uniform_ref = np.random.uniform(low=min, high=max, size=size)
+            white_noise_ref = np.random.normal(loc=mean, scale=std, size=size)
+            random_walk = np.cumsum(white_noise_ref)
+            uniform_ref = np.random.uniform(low=min, high=max, size=size)
 
-        naive = [train_set.values[-1]] * size
-        if seasonal_period:
-            seasonal_naive = [
-                train_set.values[index % seasonal_period] for index in range(size)
-            ]
+            naive = [train_set.values[-1]] * size
+            if seasonal_period:
+                seasonal_naive = [
+                    train_set.values[index % seasonal_period] for index in range(size)
+                ]
 
-        returned_dict = {
-            "uniform": KLDivergence.compute(p=test_set, q=Serie(values=uniform_ref)),
-            "white_noise": KLDivergence.compute(
-                p=test_set, q=Serie(values=white_noise_ref)
-            ),
-            "random_walk": KLDivergence.compute(
-                p=test_set, q=Serie(values=random_walk)
-            ),
-            "naive": KLDivergence.compute(p=test_set, q=Serie(values=naive)),
-        }
+        with Instrumentation.stage(
+            "forecast_evaluation.kl",
+            divergences=(5 if seasonal_period else 4) + len(forecasts),
+        ):
+            returned_dict = {
+                "uniform": KLDivergence.compute(
+                    p=test_set, q=Serie(values=uniform_ref)
+                ),
+                "white_noise": KLDivergence.compute(
+                    p=test_set, q=Serie(values=white_noise_ref)
+                ),
+                "random_walk": KLDivergence.compute(
+                    p=test_set, q=Serie(values=random_walk)
+                ),
+                "naive": KLDivergence.compute(p=test_set, q=Serie(values=naive)),
+            }
 
-        if seasonal_period:
-            returned_dict["seasonal_naive"] = KLDivergence.compute(
-                p=test_set, q=Serie(values=seasonal_naive)
-            )
+            if seasonal_period:
+                returned_dict["seasonal_naive"] = KLDivergence.compute(
+                    p=test_set, q=Serie(values=seasonal_naive)
+                )
+
+            for forecast in forecasts:
+                returned_dict[forecast.identifier] = KLDivergence.compute(
+                    p=test_set, q=forecast
+                )
 
-        for forecast in forecasts:
-            returned_dict[forecast.identifier] = KLDivergence.compute(
-                p=test_set, q=forecast
+        if n_draws:
+            returned_dict.update(
+                {
+                    key: float(value[0])
+                    for key, value in ForecastEvaluation.__monte_carlo_baselines(
+                        test_values=np.atleast_2d(
+                            np.asarray(test_set.values, dtype=float)
+                        ),
+                        n_draws=n_draws,
+                        seed=seed,
+                    ).items()
+                }
             )
 
         if normalize:
@@ -61,3 +102,349 @@ class ForecastEvaluation:
             }
 
         return returned_dict
+
+    @staticmethod
+    def evaluate_forecasts(
+        train_sets: Serie | SerieFrame | Sequence[Serie] | np.ndarray,
+        test_sets: Serie | SerieFrame | Sequence[Serie] | np.ndarray,
+        forecasts: SerieFrame | Sequence[Serie] | np.ndarray,
+        model_names: Sequence[str] | None = None,
+        seasonal_period: int | None = None,
+        normalize: bool = False,
+        seed: int | None = None,
+        n_draws: int | None = None,
+    ) -> "pd.DataFrame":
+        """
+        Evaluate many forecasts against many test sets at once, based on the DKL.
+        Baselines are built with array operations for all the test sets and reused by later calls on the same
+        train and test sets, and the DKL are computed in vectorized passes over blocks of test sets.
+
+        :param train_sets: One train set, or one per test set as a sequence of series, a frame or a 2D array.
+        :param test_sets: One test set, or several of the same length as a sequence of series, a frame
+            or a 2D array, whose rows are used without copy.
+        :param forecasts: The forecasts as a (models x horizon) array, a frame or a sequence of series, shared
+            by all the test sets, or a (test sets x models x horizon) array.
+        :param model_names: The names of the models, defaults to the identifiers of the forecast series.
+        :param seasonal_period: If given, add the seasonal naive baseline.
+        :param normalize: Whether to divide the results by the DKL of the uniform baseline.
+        :param seed: The seed of the random baselines.
+        :param n_draws: If given, the uniform, white noise and random walk baselines are the mean DKL of n_draws
+            samples, computed in vectorized blocks, and the bounds of their 95% confidence intervals are added
+            as "<baseline>_low" and "<baseline>_high" columns.
+        :return: A DataFrame with one row per test set and one column per baseline and model.
+        """
+        test_values, test_names = ForecastEvaluation.__as_matrix(sets=test_sets)
+        train_values = ForecastEvaluation.__as_list(sets=train_sets)
+        if len(train_values) == 1 and len(test_values) > 1:
+            train_values = train_values * len(test_values)
+        if len(train_values) != len(test_values):
+            raise ValueError("There should be one train set per test set")
+
+        if isinstance(forecasts, np.ndarray):
+            forecast_values = forecasts.astype(float, copy=False)
+        else:
+            forecast_values, identifiers = ForecastEvaluation.__as_matrix(
+                sets=forecasts
+            )
+            model_names = model_names or identifiers
+        if forecast_values.ndim == 2:
+            forecast_values = forecast_values[np.newaxis]
+        model_names = list(
+            model_names or [f"model_{i}" for i in range(forecast_values.shape[-2])]
+        )
+        if len(model_names) != forecast_values.shape[-2]:
+            raise ValueError("There should be one name per model")
+
+        with Instrumentation.stage(
+            "forecast_evaluation.baselines", test_sets=len(test_values)
+        ):
+            baseline_names, baselines = ForecastEvaluation.__baselines(
+                train_values=train_values,
+                test_values=test_values,
+                seasonal_period=seasonal_period,
+                seed=seed,
+            )
+        with Instrumentation.stage(
+            "forecast_evaluation.kl",
+            divergences=len(test_values) * (len(baseline_names) + len(model_names)),
+        ):
+            divergences = ForecastEvaluation.divergence_matrix(
+                test_values=test_values,
+                baselines=baselines,
+                forecast_values=forecast_values,
+            )
+
+        columns = baseline_names + model_names
+        if n_draws:
+            with Instrumentation.stage(
+                "forecast_evaluation.monte_carlo", draws=n_draws * len(test_values)
+            ):
+                estimates = ForecastEvaluation.__monte_carlo_baselines(
+                    test_values=test_values, n_draws=n_draws, seed=seed
+                )
+            for name in ForecastEvaluation.RANDOM_BASELINES:
+                divergences[:, columns.index(name)] = estimates.pop(name)
+            columns += list(estimates)
+            divergences = np.column_stack([divergences, *estimates.values()])
+
+        if normalize:
+            divergences = divergences / divergences[:, :1]
+
+        import pandas as pd
+
+        return pd.DataFrame(divergences, index=test_names, columns=columns)
+
+    @staticmethod
+    def evaluate_forecast_by_horizon(
+        train_set: Serie,
+        test_set: Serie,
+        forecasts: Sequence[Serie] | np.ndarray,
+        model_names: Sequence[str] | None = None,
+        seasonal_period: int | None = None,
+        normalize: bool = False,
+        seed: int | None = None,
+    ) -> "pd.DataFrame":
+        """
+        Evaluate forecasts against a test set for every forecast step, based on the DKL.
+        The value at step h is the DKL over the first h values of the test set, all the steps coming from
+        cumulative sums in a single pass per model instead of one computation per prefix.
+
+        :param train_set: The train set.
+        :param test_set: The test set.
+        :param forecasts: The forecasts as a sequence of series or a (models x horizon) array.
+        :param model_names: The names of the models, defaults to the identifiers of the forecast series.
+        :param seasonal_period: If given, add the seasonal naive baseline.
+        :param normalize: Whether to divide the results by the DKL of the uniform baseline at the same step.
+        :param seed: The seed of the random baselines.
+        :return: A DataFrame with one row per step, from 1 to the horizon, and one column per baseline and model.
+        """
+        if isinstance(forecasts, np.ndarray):
+            forecast_values = np.atleast_2d(forecasts).astype(float, copy=False)
+        else:
+            forecast_values, identifiers = ForecastEvaluation.__as_matrix(
+                sets=forecasts
+            )
+            model_names = model_names or identifiers
+        model_names = list(
+            model_names or [f"model_{i}" for i in range(len(forecast_values))]
+        )
+        if len(model_names) != len(forecast_values):
+            raise ValueError("There should be one name per model")
+
+        test_values, _ = ForecastEvaluation.__as_matrix(sets=test_set)
+        baseline_names, baselines = ForecastEvaluation.__baselines(
+            train_values=ForecastEvaluation.__as_list(sets=train_set),
+            test_values=test_values,
+            seasonal_period=seasonal_period,
+            seed=seed,
+        )
+        curves = KLDivergence.compute_prefixes(
+            p=test_values, q=np.concatenate([baselines[0], forecast_values])
+        )
+
+        if normalize:
+            curves = curves / curves[:1]
+
+        import pandas as pd
+
+        return pd.DataFrame(
+            curves.T,
+            index=pd.RangeIndex(1, test_values.shape[1] + 1, name="horizon"),
+            columns=baseline_names + model_names,
+        )
+
+    @staticmethod
+    def build_baselines(
+        size: int,
+        low: np.ndarray,
+        high: np.ndarray,
+        mean: np.ndarray,
+        std: np.ndarray,
+        last_values: np.ndarray,
+        first_seasons: np.ndarray,
+        seasonal_period: int | None,
+        seed: int | None,
+    ) -> tuple[list[str], np.ndarray]:
+        """
+        Build the baselines of many test sets from their statistics, each argument holding one entry per test set.
+        Shared with RollingOriginBacktest, which computes the statistics of its test windows itself.
+        :return: The names of the baselines and a (test sets x baselines x size) read-only array.
+        """
+        generator = np.random.default_rng(seed)
+        n_sets = len(last_values)
+        low, high, mean, std = (
+            np.reshape(statistic, (n_sets, 1)) for statistic in (low, high, mean, std)
+        )
+
+        white_noise = generator.normal(loc=mean, scale=std, size=(n_sets, size))
+        names = ["uniform", "white_noise", "random_walk", "naive"]
+        baselines = [
+            generator.uniform(low=low, high=high, size=(n_sets, size)),
+            white_noise,
+            np.cumsum(white_noise, axis=1),
+            np.repeat(np.reshape(last_values, (n_sets, 1)), size, axis=1),
+        ]
+        if seasonal_period:
+            names.append("seasonal_naive")
+            baselines.append(first_seasons[:, np.arange(size) % seasonal_period])
+
+        baselines = np.stack(baselines, axis=1)
+        baselines.flags.writeable = False
+        return names, baselines
+
+    @staticmethod
+    def divergence_matrix(
+        test_values: np.ndarray, baselines: np.ndarray, forecast_values: np.ndarray
+    ) -> np.ndarray:
+        """
+        Compute the DKL of the baselines and forecasts of each test set, in vectorized passes over blocks of test sets.
+        :param test_values: A (test sets x size) array.
+        :param baselines: A (test sets x baselines x size) array.
+        :param forecast_values: A (test sets x models x size) array, or (1 x models x size) when shared.
+        :return: A (test sets x (baselines + models)) array.
+        """
+        divergences = np.empty(
+            (len(test_values), baselines.shape[1] + forecast_values.shape[1])
+        )
+        n_columns = divergences.shape[1] * test_values.shape[1]
+        block_size = max(1, ForecastEvaluation.BLOCK_ELEMENTS // max(n_columns, 1))
+        for start in range(0, len(test_values), block_size):
+            rows = slice(start, start + block_size)
+            forecast_rows = (
+                forecast_values[rows] if len(forecast_values) > 1 else forecast_values
+            )
+            references = np.concatenate(
+                [
+                    baselines[rows],
+                    np.broadcast_to(
+                        forecast_rows,
+                        (len(baselines[rows]),) + forecast_values.shape[-2:],
+                    ),
+                ],
+                axis=1,
+            )
+            divergences[rows] = KLDivergence.compute_batch(
+                p=test_values[rows, np.newaxis, :], q=references
+            )
+        return divergences
+
+    @staticmethod
+    def __baselines(
+        train_values: list[np.ndarray],
+        test_values: np.ndarray,
+        seasonal_period: int | None,
+        seed: int | None,
+    ) -> tuple[list[str], np.ndarray]:
+        """
+        Build the uniform, white noise, random walk, naive and seasonal naive baselines of each test set,
+        as a (test sets x baselines x horizon) array, or return the cached ones.
+        """
+        last_values = np.array([train[-1] for train in train_values], dtype=float)
+        first_seasons = (
+            np.array([train[:seasonal_period] for train in train_values], dtype=float)
+            if seasonal_period
+            else np.empty((len(train_values), 0))
+        )
+        key = (
+            content_hash(test_values),
+            content_hash(last_values),
+            content_hash(first_seasons),
+            seasonal_period,
+            seed,
+        )
+        cached = ForecastEvaluation.BASELINE_CACHE.get(key)
+        if cached is not None:
+            return cached
+
+        names, baselines = ForecastEvaluation.build_baselines(
+            size=test_values.shape[1],
+            low=np.nanmin(test_values, axis=1),
+            high=np.nanmax(test_values, axis=1),
+            mean=np.nanmean(test_values, axis=1),
+            std=np.nanstd(test_values, axis=1),
+            last_values=last_values,
+            first_seasons=first_seasons,
+            seasonal_period=seasonal_period,
+            seed=seed,
+        )
+        ForecastEvaluation.BASELINE_CACHE.put(key, (names, baselines))
+        return names, baselines
+
+    @staticmethod
+    def __monte_carlo_baselines(
+        test_values: np.ndarray, n_draws: int, seed: int | None
+    ) -> dict[str, np.ndarray]:
+        """
+        Estimate the DKL of the random baselines of each test set from n_draws samples of each.
+        :return: The mean DKL of each random baseline, then the bounds of their confidence intervals,
+            each holding one entry per test set.
+        """
+        n_sets, size = test_values.shape
+        low, high, mean, std = (
+            statistic(test_values, axis=1).reshape(n_sets, 1, 1)
+            for statistic in (np.nanmin, np.nanmax, np.nanmean, np.nanstd)
+        )
+        draws = {
+            "uniform": lambda generator, n: generator.uniform(
+                low=low, high=high, size=(n_sets, n, size)
+            ),
+            "white_noise": lambda generator, n: generator.normal(
+                loc=mean, scale=std, size=(n_sets, n, size)
+            ),
+            "random_walk": lambda generator, n: np.cumsum(
+                generator.normal(loc=mean, scale=std, size=(n_sets, n, size)), axis=-1
+            ),
+        }
+        estimates: dict[str, MonteCarloEstimate] = {
+            name: MonteCarloKL.estimate(
+                p=test_values, draw=draw, n_draws=n_draws, seed=seed
+            )
+            for name, draw in draws.items()
+        }
+        return {
+            **{name: estimate.mean for name, estimate in estimates.items()},
+            **{f"{name}_low": estimate.low for name, estimate in estimates.items()},
+            **{f"{name}_high": estimate.high for name, estimate in estimates.items()},
+        }
+
+    @staticmethod
+    def __as_list(
+        sets: Serie | SerieFrame | Sequence[Serie] | np.ndarray,
+    ) -> list[np.ndarray]:
+        """Turn one or several sets, possibly of different lengths, into a list of arrays."""
+        if isinstance(sets, Serie):
+            return [sets.values]
+        if isinstance(sets, SerieFrame):
+            return list(sets.values)
+        if isinstance(sets, np.ndarray):
+            return list(np.atleast_2d(sets))
+        return [
+            serie.values if isinstance(serie, Serie) else np.asarray(serie)
+            for serie in sets
+        ]
+
+    @staticmethod
+    def __as_matrix(
+        sets: Serie | SerieFrame | Sequence[Serie] | np.ndarray,
+    ) -> tuple[np.ndarray, list]:
+        """Turn one or several sets of the same length into a 2D array, along with their names."""
+        if isinstance(sets, SerieFrame):
+            return sets.values.astype(float, copy=False), list(sets.identifiers)
+        if isinstance(sets, Serie):
+            return np.atleast_2d(sets.values).astype(float, copy=False), [
+                sets.identifier or 0
+            ]
+        if isinstance(sets, np.ndarray):
+            values = np.atleast_2d(sets).astype(float, copy=False)
+            return values, list(range(len(values)))
+        values = np.stack(
+            [
+                serie.values if isinstance(serie, Serie) else np.asarray(serie)
+                for serie in sets
+            ]
+        ).astype(float, copy=False)
+        names = [
+            (serie.identifier if isinstance(serie, Serie) else None) or position
+            for position, serie in enumerate(sets)
+        ]
+        return values, names
@@ -1,13 +1,21 @@
-from typing import Tuple
+import os
+import re
+from typing import Iterable, Sequence, Tuple
 
-from kl_evolution.core.data_objects.serie import Serie
-import matplotlib.pyplot as plt
-import mplcyberpunk as mpl
+import numpy as np
 
-plt.style.use("cyberpunk")
+from kl_evolution.core.data_objects.serie import Serie
+from kl_evolution.core.results_formatting.decimation import Decimation
 
 
 class KLResultsPlotter:
+    """
+    Plots of the results. Matplotlib and mplcyberpunk are only imported, and the cyberpunk style only applied,
+    when a plot is made, so importing the package stays fast for callers that do not plot.
+    """
+
+    STYLE = "cyberpunk"
+    DPI = 100
 
     @staticmethod
     def plot_kl_results(
@@ -16,17 +24,168 @@ class KLResultsPlotter:
         save_path: str | None = None,
         title: str | None = None,
         figsize: Tuple[int, int] = (15, 10),
+        decimation: str | None = None,
+    ) -> None:
+        """
+        Plot a serie and its KL divergences over lags, and save or show the figure.
+        :param decimation: If given, one of Decimation.METHODS used to reduce the curves to the width of the figure
+        """
+        import matplotlib.pyplot as plt
+
+        with KLResultsPlotter.__style():
+            fig, axes = plt.subplots(nrows=2, figsize=figsize)
+            KLResultsPlotter.__draw(
+                axes=axes,
+                serie=serie,
+                kl_results=kl_results,
+                title=title,
+                width=int(figsize[0] * fig.dpi),
+                decimation=decimation,
+            )
+            if save_path:
+                plt.savefig(save_path, bbox_inches="tight")
+            else:
+                plt.show()
+
+    @staticmethod
+    def render(
+        serie: Serie,
+        kl_results: Serie,
+        save_path: str,
+        title: str | None = None,
+        figsize: Tuple[int, int] = (15, 10),
+        dpi: int = DPI,
+        decimation: str | None = "min_max",
+    ) -> str:
+        """
+        Save the plot of plot_kl_results to a file, without the pyplot global state.
+        The figure is drawn by the Agg canvas and freed once saved, so that rendering many plots does not
+        accumulate figures, and the curves are decimated to the width of the figure in pixels by default.
+
+        :param save_path: The path of the image, its extension giving the format.
+        :param dpi: The resolution of the image, which gives the width in pixels with figsize.
+        :param decimation: One of Decimation.METHODS, or None to draw every point.
+        :return: The path of the image.
+        """
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        with KLResultsPlotter.__style():
+            figure = Figure(figsize=figsize, dpi=dpi)
+            FigureCanvasAgg(figure)
+            try:
+                KLResultsPlotter.__draw(
+                    axes=figure.subplots(nrows=2),
+                    serie=serie,
+                    kl_results=kl_results,
+                    title=title,
+                    width=int(figsize[0] * dpi),
+                    decimation=decimation,
+                )
+                figure.savefig(save_path, bbox_inches="tight")
+            finally:
+                figure.clear()
+        return save_path
+
+    @staticmethod
+    def plot_many(
+        results: Iterable[tuple[Serie, Serie]],
+        output_dir: str,
+        file_names: Sequence[str] | None = None,
+        file_format: str = "png",
+        n_workers: int | None = None,
+        chunk_size: int = 4,
+        figsize: Tuple[int, int] = (15, 10),
+        dpi: int = DPI,
+        decimation: str | None = "min_max",
+    ) -> list[str]:
+        """
+        Render the plots of many series and their KL divergences to a directory, spread across processes.
+
+        :param results: The (serie, KL divergences) pairs to plot.
+        :param output_dir: The directory the images are saved to, created if needed.
+        :param file_names: The names of the images, without extension, defaults to the identifiers of the series
+            or to their positions.
+        :param file_format: The extension of the images.
+        :param n_workers: The number of processes, defaults to the number of CPUs, 1 to render in the current process.
+        :param chunk_size: The number of plots sent to a process at once.
+        :return: The paths of the images, in the order of the results.
+        """
+        results = list(results)
+        if file_names is None:
+            file_names = [
+                re.sub(r"[^\w.-]", "_", str(serie.identifier or position))
+                for position, (serie, _) in enumerate(results)
+            ]
+        if len(set(file_names)) != len(results):
+            raise ValueError("There should be one unique file name per plot")
+
+        os.makedirs(output_dir, exist_ok=True)
+        jobs = [
+            (
+                serie,
+                kl_results,
+                os.path.join(output_dir, f"{name}.{file_format}"),
+                figsize,
+                dpi,
+                decimation,
+            )
+            for (serie, kl_results), name in zip(results, file_names)
+        ]
+        n_workers = n_workers or os.cpu_count() or 1
+        if n_workers == 1 or len(jobs) <= 1:
+            return [KLResultsPlotter._render_job(job) for job in jobs]
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=min(n_workers, len(jobs))) as executor:
+            return list(
+                executor.map(KLResultsPlotter._render_job, jobs, chunksize=chunk_size)
+            )
+
+    @staticmethod
+    def _render_job(job: tuple) -> str:
+        """Worker side of plot_many, rendering one plot."""
+        serie, kl_results, save_path, figsize, dpi, decimation = job
+        return KLResultsPlotter.render(
+            serie=serie,
+            kl_results=kl_results,
+            save_path=save_path,
+            figsize=figsize,
+            dpi=dpi,
+            decimation=decimation,
+        )
+
+    @staticmethod
+    def __style():
+        """The context applying the cyberpunk style, registered by the import of mplcyberpunk."""
+        import mplcyberpunk  # noqa: F401
+        from matplotlib import style
+
+        return style.context(KLResultsPlotter.STYLE)
+
+    @staticmethod
+    def __draw(
+        axes,
+        serie: Serie,
+        kl_results: Serie,
+        title: str | None,
+        width: int,
+        decimation: str | None,
     ) -> None:
+        """Draw the serie on the first axes and its KL divergences over lags on the second one."""
+        import mplcyberpunk as mpl
 
         serie_label = serie.identifier if serie.identifier else "y"
         title = title if title else f"{serie_label}'s time evolution"
-
         mean_kl = kl_results.__avg__()
-        fig, axes = plt.subplots(nrows=2, figsize=figsize)
 
+        positions = KLResultsPlotter.__positions(
+            values=serie.values, width=width, decimation=decimation
+        )
         axes[0].plot(
-            serie.index,
-            serie.values,
+            serie.index if positions is None else np.asarray(serie.index)[positions],
+            serie.values if positions is None else serie.values[positions],
             label=serie_label,
             color="C0",
         )
@@ -35,10 +194,22 @@ class KLResultsPlotter:
         axes[0].set_title(title)
         axes[0].legend()
 
-        axes[1].plot(kl_results, color="C0", label="KL evolution over lags")
+        kl_positions = KLResultsPlotter.__positions(
+            values=kl_results.values, width=width, decimation=decimation
+        )
+        if kl_positions is None:
+            kl_positions = np.arange(kl_results.__len__())
+        lags = np.asarray(kl_results.index)
+        axes[1].plot(
+            lags[kl_positions],
+            kl_results.values[kl_positions],
+            color="C0",
+            label="KL evolution over lags",
+        )
         mpl.add_gradient_fill(ax=axes[1], alpha_gradientglow=0.6)
         axes[1].plot(
-            [mean_kl] * kl_results.__len__(),
+            [lags[0], lags[-1]],
+            [mean_kl] * 2,
             color="C1",
             label="Mean KL divergence over lags",
         )
@@ -49,7 +220,12 @@ class KLResultsPlotter:
             f"Kullback-Lieber evolution over lags - Avg over ref: {mean_kl:.2f}",
         )
         axes[1].legend()
-        if save_path:
-            plt.savefig(save_path, bbox_inches="tight")
-        else:
-            plt.show()
+
+    @staticmethod
+    def __positions(
+        values: np.ndarray, width: int, decimation: str | None
+    ) -> np.ndarray | None:
+        """The positions of the points to draw, or None to draw them all."""
+        if decimation is None:
+            return None
+        return Decimation.positions(values=values, width=width, method=decimation)
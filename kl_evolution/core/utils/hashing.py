@@ -0,0 +1,18 @@
+import hashlib
+
+import numpy as np
+
+
+def content_hash(values: np.ndarray) -> str:
+    """
+    Compute a fast hash of the content of an array, its dtype and its shape.
+    Contiguous arrays, including memory-mapped ones, are hashed without copy.
+
+    :param values: The array to hash.
+    :return: The hexadecimal digest.
+    """
+    values = np.ascontiguousarray(values)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{values.dtype.str}{values.shape}".encode())
+    digest.update(values.reshape(-1).view(np.uint8))
+    return digest.hexdigest()
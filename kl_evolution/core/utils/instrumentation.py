@@ -0,0 +1,185 @@
+import contextlib
+import json
+import threading
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Callable, Iterator
+
+
+@dataclass
+class StageRecord:
+    """
+    The measures of one run of a stage.
+    allocated is the peak of the memory allocated during the stage, in bytes, or None when tracemalloc is not tracing.
+    """
+
+    name: str
+    duration: float
+    allocated: int | None = None
+    counts: dict = field(default_factory=dict)
+
+
+class Instrumentation:
+    """
+    Hooks called with a StageRecord at the end of each instrumented stage of the pipeline.
+    Without hooks, stages return a shared empty context and nothing is measured.
+    """
+
+    HOOKS: list[Callable[[StageRecord], None]] = []
+    __DISABLED = contextlib.nullcontext()
+    __frames = threading.local()
+
+    @staticmethod
+    def add_hook(hook: Callable[[StageRecord], None]) -> None:
+        """Call hook with the record of every stage run from now on, in any thread."""
+        Instrumentation.HOOKS = Instrumentation.HOOKS + [hook]
+
+    @staticmethod
+    def remove_hook(hook: Callable[[StageRecord], None]) -> None:
+        Instrumentation.HOOKS = [
+            added for added in Instrumentation.HOOKS if added != hook
+        ]
+
+    @staticmethod
+    def stage(name: str, **counts: int) -> contextlib.AbstractContextManager:
+        """
+        Measure the code run in the context as a stage, when hooks are set.
+
+        :param name: The name of the stage, prefixed by the component running it.
+        :param counts: Sizes of the work done in the stage, such as the number of shifts computed.
+        """
+        if not Instrumentation.HOOKS:
+            return Instrumentation.__DISABLED
+        return Instrumentation.__measure(name=name, counts=counts)
+
+    @staticmethod
+    @contextlib.contextmanager
+    def __measure(name: str, counts: dict) -> Iterator[None]:
+        """
+        Time the stage and, when tracemalloc is tracing, track the peak memory allocated during it.
+        The peak of tracemalloc is reset at the start of each stage, so nested stages carry their own peak
+        up to the enclosing ones.
+        """
+        if not hasattr(Instrumentation.__frames, "stack"):
+            Instrumentation.__frames.stack = []
+        frames = Instrumentation.__frames.stack
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            if frames:
+                frames[-1]["peak"] = max(frames[-1]["peak"], peak)
+            tracemalloc.reset_peak()
+            frames.append({"start": current, "peak": current})
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            allocated = None
+            if tracing:
+                frame = frames.pop()
+                peak = max(frame["peak"], tracemalloc.get_traced_memory()[1])
+                allocated = peak - frame["start"]
+                if frames:
+                    frames[-1]["peak"] = max(frames[-1]["peak"], peak)
+            record = StageRecord(
+                name=name, duration=duration, allocated=allocated, counts=counts
+            )
+            for hook in Instrumentation.HOOKS:
+                hook(record)
+
+
+class StageCollector:
+    """
+    A hook aggregating the records of each stage, used as a context manager around the run to profile:
+
+        with StageCollector(trace_memory=True) as collector:
+            analyzer.compute(serie=serie)
+        print(collector.report())
+    """
+
+    def __init__(self, trace_memory: bool = False):
+        """
+        :param trace_memory: Whether to start tracemalloc during the run to measure the memory allocated,
+            which slows the code down
+        """
+        self.trace_memory = trace_memory
+        self.records: list[StageRecord] = []
+        self.__lock = threading.Lock()
+        self.__started_tracing = False
+
+    def __call__(self, record: StageRecord) -> None:
+        with self.__lock:
+            self.records.append(record)
+
+    def __enter__(self) -> "StageCollector":
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.__started_tracing = True
+        Instrumentation.add_hook(self)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        Instrumentation.remove_hook(self)
+        if self.__started_tracing:
+            tracemalloc.stop()
+            self.__started_tracing = False
+
+    def summary(self) -> dict:
+        """
+        Aggregate the records by stage, in the order the stages first ended.
+        :return: For each stage, its number of calls, total, min and max durations in seconds,
+            the largest peak of memory allocated, and the sums of its counts.
+        """
+        summary = {}
+        with self.__lock:
+            records = list(self.records)
+        for record in records:
+            stage = summary.setdefault(
+                record.name,
+                {
+                    "calls": 0,
+                    "total": 0.0,
+                    "min": float("inf"),
+                    "max": 0.0,
+                    "allocated": None,
+                    "counts": {},
+                },
+            )
+            stage["calls"] += 1
+            stage["total"] += record.duration
+            stage["min"] = min(stage["min"], record.duration)
+            stage["max"] = max(stage["max"], record.duration)
+            if record.allocated is not None:
+                stage["allocated"] = max(stage["allocated"] or 0, record.allocated)
+            for count, value in record.counts.items():
+                stage["counts"][count] = stage["counts"].get(count, 0) + value
+        return summary
+
+    def report(self) -> str:
+        """Format the summary as a table, one line per stage."""
+        lines = [f"{'stage':<45} {'calls':>7} {'total (s)':>11} {'peak (MiB)':>11}"]
+        for name, stage in self.summary().items():
+            allocated = (
+                f"{stage['allocated'] / 2**20:.1f}"
+                if stage["allocated"] is not None
+                else "-"
+            )
+            counts = " ".join(
+                f"{count}={value}" for count, value in stage["counts"].items()
+            )
+            lines.append(
+                f"{name:<45} {stage['calls']:>7} {stage['total']:>11.4f} {allocated:>11} {counts}"
+            )
+        return "\n".join(lines)
+
+    def dump(self, path: str) -> None:
+        """Write the summary to a JSON file."""
+        with open(path, "w") as file:
+            json.dump(self.summary(), file, indent=2)
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.records.clear()
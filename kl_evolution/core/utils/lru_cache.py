@@ -0,0 +1,53 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+class LRUCache:
+    """
+    A mapping bounded to maxsize entries, evicting the least recently used ones, and counting hits and misses.
+    Safe to share between threads.
+    """
+
+    def __init__(self, maxsize: int = 128):
+        """
+        :param maxsize: The maximum number of entries kept
+        """
+        if maxsize < 1:
+            raise ValueError("The cache should hold at least one entry")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the value cached for key, marking it as recently used, or default."""
+        with self.__lock:
+            if key in self.__entries:
+                self.hits += 1
+                self.__entries.move_to_end(key)
+                return self.__entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Cache value for key, evicting the least recently used entries beyond maxsize."""
+        with self.__lock:
+            self.__entries[key] = value
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.maxsize:
+                self.__entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove all the entries and reset the counters."""
+        with self.__lock:
+            self.__entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.__entries
+
+    def __len__(self) -> int:
+        return len(self.__entries)
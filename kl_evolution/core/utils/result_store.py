@@ -0,0 +1,184 @@
+import hashlib
+import os
+import sqlite3
+import tempfile
+import time
+from contextlib import closing, contextmanager
+
+import numpy as np
+
+
+class ResultStore:
+    """
+    A persistent store of arrays in a local directory, one .npz file per entry, indexed by a SQLite database.
+    Entries are keyed by a series identifier and a description of the parameters, and carry the fingerprint
+    and the length of the values they were computed from, so that a caller can tell whether new values
+    extend them. The least recently used entries are evicted beyond max_bytes.
+    Safe to share between threads and processes, each operation using its own connection.
+    """
+
+    DEFAULT_DIRECTORY = os.path.join(os.path.expanduser("~"), ".cache", "kl_evolution")
+    INDEX = "index.sqlite"
+
+    def __init__(self, directory: str | None = None, max_bytes: int = 2**28):
+        """
+        :param directory: The directory of the store, defaults to the KL_EVOLUTION_CACHE environment variable,
+            then to ~/.cache/kl_evolution
+        :param max_bytes: The maximum size of the stored arrays
+        """
+        if max_bytes < 1:
+            raise ValueError("The store should hold at least one byte")
+        self.directory = (
+            directory
+            or os.environ.get("KL_EVOLUTION_CACHE")
+            or ResultStore.DEFAULT_DIRECTORY
+        )
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+        with self.__connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "identifier TEXT, parameters TEXT, fingerprint TEXT, length INTEGER, "
+                "file TEXT, bytes INTEGER, accessed REAL, "
+                "PRIMARY KEY (identifier, parameters))"
+            )
+
+    def get(self, identifier: str, parameters: str) -> dict | None:
+        """
+        Load the entry stored for identifier and parameters, marking it as recently used.
+
+        :param identifier: The identifier of the series.
+        :param parameters: The description of the parameters of the computation.
+        :return: The arrays of the entry, with its "fingerprint" and "length", or None if there is none.
+        """
+        with self.__connect() as connection:
+            row = connection.execute(
+                "SELECT fingerprint, length, file FROM entries "
+                "WHERE identifier = ? AND parameters = ?",
+                (identifier, parameters),
+            ).fetchone()
+            if row is None:
+                return None
+            fingerprint, length, file = row
+            try:
+                with np.load(os.path.join(self.directory, file)) as arrays:
+                    entry = dict(arrays)
+            except (OSError, ValueError):
+                self.__delete(
+                    connection=connection, identifier=identifier, parameters=parameters
+                )
+                return None
+            connection.execute(
+                "UPDATE entries SET accessed = ? WHERE identifier = ? AND parameters = ?",
+                (time.time(), identifier, parameters),
+            )
+        entry.update(fingerprint=fingerprint, length=length)
+        return entry
+
+    def put(
+        self,
+        identifier: str,
+        parameters: str,
+        fingerprint: str,
+        length: int,
+        arrays: dict[str, np.ndarray],
+    ) -> None:
+        """
+        Store the arrays computed from values of the given fingerprint and length, replacing the previous entry,
+        then evict the least recently used entries beyond max_bytes.
+        The file is written aside and moved into place, so that readers never see a partial entry.
+
+        :param identifier: The identifier of the series.
+        :param parameters: The description of the parameters of the computation.
+        :param fingerprint: The content hash of the values.
+        :param length: The number of values.
+        :param arrays: The arrays to store.
+        """
+        file = (
+            hashlib.blake2b(
+                f"{identifier}\0{parameters}".encode(), digest_size=16
+            ).hexdigest()
+            + ".npz"
+        )
+        descriptor, temporary = tempfile.mkstemp(dir=self.directory, suffix=".npz")
+        with os.fdopen(descriptor, "wb") as handle:
+            np.savez(handle, **arrays)
+        os.replace(temporary, os.path.join(self.directory, file))
+
+        with self.__connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    identifier,
+                    parameters,
+                    fingerprint,
+                    length,
+                    file,
+                    os.path.getsize(os.path.join(self.directory, file)),
+                    time.time(),
+                ),
+            )
+            self.__evict(connection=connection)
+
+    def clear(self) -> None:
+        """Remove all the entries."""
+        with self.__connect() as connection:
+            for identifier, parameters in connection.execute(
+                "SELECT identifier, parameters FROM entries"
+            ).fetchall():
+                self.__delete(
+                    connection=connection, identifier=identifier, parameters=parameters
+                )
+
+    @property
+    def size(self) -> int:
+        """The number of bytes of the stored arrays."""
+        with self.__connect() as connection:
+            return connection.execute(
+                "SELECT COALESCE(SUM(bytes), 0) FROM entries"
+            ).fetchone()[0]
+
+    def __len__(self) -> int:
+        with self.__connect() as connection:
+            return connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    @contextmanager
+    def __connect(self):
+        """Open a connection whose transaction is committed, and which is closed, once the block ends."""
+        with closing(
+            sqlite3.connect(os.path.join(self.directory, ResultStore.INDEX), timeout=30)
+        ) as connection, connection:
+            yield connection
+
+    def __evict(self, connection: sqlite3.Connection) -> None:
+        """Delete the least recently used entries until the stored arrays fit in max_bytes."""
+        total = connection.execute(
+            "SELECT COALESCE(SUM(bytes), 0) FROM entries"
+        ).fetchone()[0]
+        for identifier, parameters, size in connection.execute(
+            "SELECT identifier, parameters, bytes FROM entries ORDER BY accessed"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self.__delete(
+                connection=connection, identifier=identifier, parameters=parameters
+            )
+            total -= size
+
+    def __delete(
+        self, connection: sqlite3.Connection, identifier: str, parameters: str
+    ) -> None:
+        """Delete an entry and its file."""
+        row = connection.execute(
+            "SELECT file FROM entries WHERE identifier = ? AND parameters = ?",
+            (identifier, parameters),
+        ).fetchone()
+        connection.execute(
+            "DELETE FROM entries WHERE identifier = ? AND parameters = ?",
+            (identifier, parameters),
+        )
+        if row is not None:
+            try:
+                os.remove(os.path.join(self.directory, row[0]))
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,37 @@
+import json
+
+from benchmarks.run import compare, main
+
+SMALL_CASE = "shifted_serie_analyzer?direct-n=1000-h=10?"
+
+
+def test_quick_run_should_write_results_then_compare_to_the_saved_baseline(tmp_path):
+    options = [
+        "--quick",
+        "--filter",
+        SMALL_CASE,
+        "--repeats",
+        "1",
+        "--output",
+        str(tmp_path / "results.json"),
+        "--baseline",
+        str(tmp_path / "baseline.json"),
+    ]
+
+    assert main(options) == 0, "A missing baseline should not fail the run"
+    results = json.loads((tmp_path / "results.json").read_text())["results"]
+    assert list(results) == ["shifted_serie_analyzer[direct-n=1000-h=10]"]
+
+    assert main(options + ["--save-baseline"]) == 0
+    assert main(options + ["--threshold", "1000"]) == 0
+
+
+def test_compare_should_flag_growth_beyond_the_threshold():
+    baseline = {"case": {"time": 1.0, "peak_memory": 100}}
+    results = {
+        "case": {"time": 1.5, "peak_memory": 110},
+        "new_case": {"time": 9.0, "peak_memory": 900},
+    }
+
+    (regression,) = compare(results=results, baseline=baseline, threshold=0.25)
+    assert regression.startswith("case: time")
@@ -0,0 +1,141 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from kl_evolution.cli import main
+from kl_evolution.core.features.lag_kl_divergence import LagKLDivergence
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    rng = np.random.default_rng(0)
+    for position in range(3):
+        pd.DataFrame(
+            {
+                "demand": rng.uniform(1, 10, 200),
+                "temperature": rng.uniform(1, 10, 200),
+                "model_a": rng.uniform(1, 10, 200),
+                "label": ["x"] * 200,
+            }
+        ).to_csv(tmp_path / f"file_{position}.csv")
+    return tmp_path
+
+
+def read_records(path) -> list[dict]:
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_analyze_should_write_one_line_per_numeric_column(data_dir, workers):
+    output = data_dir / "kl.jsonl"
+    status = main(
+        [
+            "analyze",
+            str(data_dir),
+            "--max-horizon",
+            "5",
+            "--columns",
+            "demand,temp*,label",
+            "--raw",
+            "--workers",
+            str(workers),
+            "--output",
+            str(output),
+        ]
+    )
+
+    records = read_records(output)
+    assert status == 0
+    assert len(records) == 6, "label is not numeric and model_a is not selected"
+    record = next(r for r in records if r["id"].endswith("file_1.csv::demand"))
+    values = pd.read_csv(data_dir / "file_1.csv", index_col=0)["demand"].values
+    np.testing.assert_allclose(
+        record["kl"], LagKLDivergence.compute(values=values, lags=np.arange(1, 6))
+    )
+    assert record["lags"] == [1, 2, 3, 4, 5]
+
+
+def test_resume_should_skip_done_items_and_drop_a_cut_line(data_dir):
+    output = data_dir / "kl.jsonl"
+    arguments = [
+        "analyze",
+        str(data_dir),
+        "--max-horizon",
+        "3",
+        "--reference",
+        "analytic",
+    ]
+    main(arguments + ["--workers", "1", "--output", str(output)])
+    complete = output.read_text()
+    lines = complete.splitlines(keepends=True)
+    output.write_text("".join(lines[:2]) + lines[2][:20])
+
+    main(arguments + ["--workers", "1", "--output", str(output), "--resume"])
+
+    records = read_records(output)
+    assert len(records) == len(lines) == 9
+    assert len({record["id"] for record in records}) == 9
+    assert records[:2] == [json.loads(line) for line in lines[:2]]
+
+
+def test_resume_should_retry_failed_items(data_dir):
+    output = data_dir / "kl.jsonl"
+    broken = data_dir / "file_3.csv"
+    broken.write_text("")
+    arguments = ["analyze", str(data_dir), "--max-horizon", "3", "--workers", "1"]
+
+    assert main(arguments + ["--output", str(output)]) == 1
+    (failure,) = [record for record in read_records(output) if "error" in record]
+    assert failure["id"] == str(broken)
+
+    pd.DataFrame({"demand": np.arange(1.0, 21.0)}).to_csv(broken)
+    assert main(arguments + ["--output", str(output), "--resume"]) == 0
+
+    records = read_records(output)
+    assert [record["id"] for record in records[-1:]] == [f"{broken}::demand"]
+    assert len(records) == 11, "Only the failed file should be computed again"
+
+
+def test_resume_should_not_depend_on_how_paths_are_written(data_dir, monkeypatch):
+    monkeypatch.chdir(data_dir)
+    arguments = ["analyze", "--max-horizon", "3", "--output", "kl.jsonl"]
+    main(arguments + ["file_0.csv"])
+    main(arguments + ["./file_0.csv", "--resume"])
+
+    records = read_records(data_dir / "kl.jsonl")
+    assert len(records) == 3
+    assert records[0]["id"].startswith(str(data_dir / "file_0.csv"))
+
+
+def test_evaluate_should_score_forecast_columns(data_dir):
+    output = data_dir / "scores.jsonl"
+    main(
+        [
+            "evaluate",
+            str(data_dir / "file_0.csv"),
+            "--target",
+            "demand",
+            "--forecasts",
+            "model_*",
+            "--test-size",
+            "24",
+            "--output",
+            str(output),
+        ]
+    )
+
+    (record,) = read_records(output)
+    assert list(record["scores"]) == [
+        "uniform",
+        "white_noise",
+        "random_walk",
+        "naive",
+        "model_a",
+    ]
+
+
+def test_missing_inputs_should_raise(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        main(["analyze", str(tmp_path / "*.csv"), "--output", str(tmp_path / "out")])
@@ -74,3 +74,176 @@ def test_index_and_values_with_same_length_works_well():
 def test_deseasonalize_without_seasonal_period_raise_error():
     with pytest.raises(ValueError):
         Serie(values=[1, 2, 3], deseasonalize=True)
+
+
+def test_contiguous_float_array_is_adopted_without_copy():
+    values = np.array([1.0, 2.0, 3.0])
+    input = Serie(values=values)
+    assert input.values is values, "Float64 arrays should not be copied"
+
+
+def test_non_float_values_are_converted():
+    values = np.array([1, 2, 3])
+    input = Serie(values=values)
+    assert input.values.dtype == np.float64, "Int values should be converted"
+
+
+def test_float32_dtype_is_kept():
+    input = Serie(values=[1, 2, 3], dtype=np.float32, detrend=True)
+    assert input.values.dtype == np.float32, "Values should be stored as float32"
+
+
+def test_default_index_is_materialised_on_access():
+    input = Serie(values=[1.0, 2.0, 3.0])
+    assert input._index is None, "Default index should not be allocated upfront"
+    np.testing.assert_array_equal(input.index, [0, 1, 2])
+
+
+def test_detrend_and_deseasonalize_difference_the_values():
+    input = Serie(
+        values=[1.0, 2.0, 4.0, 7.0, 11.0],
+        detrend=True,
+        deseasonalize=True,
+        seasonal_period=2,
+    )
+    np.testing.assert_array_equal(input.values, [np.nan] * 3 + [2.0, 2.0])
+
+
+def test_shift_beyond_length_returns_only_nan():
+    input = Serie(values=[1.0, 2.0, 3.1])
+    assert np.all(np.isnan(input.shift(shift=5).values)), "All values should be NaN"
+
+
+def test_lagged_view_does_not_copy_the_values():
+    input = Serie(values=[1.0, 2.0, 3.1], index=[10, 11, 12])
+    lagged = input.lagged_view(shift=1)
+
+    assert np.shares_memory(lagged.values, input.values), "Values should be a view"
+    np.testing.assert_array_equal(lagged.values, [1.0, 2.0])
+    np.testing.assert_array_equal(lagged.index, [11, 12])
+
+
+def test_lagged_view_keeps_default_index_lazy():
+    lagged = Serie(values=[1.0, 2.0, 3.1]).lagged_view(shift=2)
+    np.testing.assert_array_equal(lagged.index, [2])
+
+
+def test_statistics_match_numpy_across_blocks(monkeypatch):
+    monkeypatch.setattr(Serie, "STATISTICS_BLOCK", 7)
+    values = np.random.default_rng(0).normal(5, 2, 100)
+    values[[3, 40, 41, 99]] = np.nan
+
+    statistics = Serie(values=values).statistics
+
+    np.testing.assert_allclose(
+        [statistics.minimum, statistics.maximum, statistics.mean, statistics.std],
+        [np.nanmin(values), np.nanmax(values), np.nanmean(values), np.nanstd(values)],
+        rtol=1e-12,
+    )
+    assert statistics.nan_count == 4
+    assert not statistics.all_zero
+
+
+def test_statistics_are_cached_until_values_are_reassigned():
+    serie = Serie(values=[0.0, np.nan, 0.0])
+    assert serie.statistics is serie.statistics, "Statistics should be cached"
+    assert serie.__all_eq__(other_value=0), "NaN values should be ignored"
+
+    serie.values = [1, 3]
+    assert serie.values.dtype == np.float64, "Values should be converted"
+    assert (serie.__min__(), serie.__max__(), serie.__avg__()) == (1.0, 3.0, 2.0)
+    assert not serie.__all_eq__(other_value=0)
+
+
+def test_reassigned_values_keep_the_dtype():
+    serie = Serie(values=[1.0, 2.0], dtype=np.float32)
+    serie.values = [0, 0]
+    assert serie.values.dtype == np.float32
+    assert serie.__all_eq__(other_value=0)
+
+
+def test_statistics_follow_in_place_changes_once_invalidated():
+    serie = Serie(values=np.zeros(5))
+    assert serie.__all_eq__(other_value=0)
+
+    serie.values[:] = [5, 1, 1, 1, 1]
+    serie.invalidate_statistics()
+    assert not serie.__all_eq__(other_value=0)
+    assert serie.__max__() == 5
+
+
+def test_statistics_of_a_serie_without_values_are_nan():
+    statistics = Serie(values=[np.nan, np.nan]).statistics
+    assert np.isnan(statistics.mean) and np.isnan(statistics.std)
+    assert statistics.nan_count == 2 and statistics.all_zero
+
+
+def test_all_eq_to_a_non_zero_value_fails_with_nan():
+    assert not Serie(values=[2.0, np.nan]).__all_eq__(other_value=2)
+
+
+def test_serie_has_no_instance_dict():
+    assert not hasattr(Serie(values=[1.0]), "__dict__"), "Serie should use slots"
+
+
+def test_from_npy_maps_the_file(tmp_path):
+    path = tmp_path / "values.npy"
+    np.save(path, np.array([1.0, 2.0, 3.0], dtype=np.float32))
+    input = Serie.__from_npy__(path=path, identifier="npy")
+
+    assert input.values.dtype == np.float32, "Dtype of the file should be kept"
+    assert not input.values.flags.writeable, "Values should be read-only mapped"
+    np.testing.assert_array_equal(input.values, [1.0, 2.0, 3.0])
+
+
+def test_from_npy_converts_integer_files_to_float(tmp_path):
+    path = tmp_path / "values.npy"
+    np.save(path, np.array([1, 2, 3], dtype=np.int64))
+    input = Serie.__from_npy__(path=path)
+
+    assert input.values.dtype == np.float64, "Integer values should be converted"
+    np.testing.assert_array_equal(input.shift(shift=1).values, [np.nan, 1.0, 2.0])
+
+
+def test_from_binary_maps_the_file(tmp_path):
+    path = tmp_path / "values.bin"
+    np.array([0.0, 1.0, 2.0, 3.0]).tofile(path)
+    input = Serie.__from_binary__(path=path, offset=8, length=2)
+
+    np.testing.assert_array_equal(input.values, [1.0, 2.0])
+
+
+def test_from_arrow_should_not_copy_float_columns():
+    pa = pytest.importorskip("pyarrow")
+    array = pa.array(np.arange(5, dtype=np.float32))
+    serie = Serie.__from_arrow__(array, identifier="arrow")
+
+    assert serie.values.dtype == np.float32
+    assert np.shares_memory(serie.values, array.to_numpy()), "Values should be a view"
+    nulls = Serie.__from_arrow__(pa.chunked_array([[1, None], [3]]))
+    np.testing.assert_array_equal(nulls.values, [1, np.nan, 3])
+
+
+def test_from_parquet_should_read_selected_columns(tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = str(tmp_path / "data.parquet")
+    table = pa.table(
+        {
+            "time": np.arange(10),
+            "a": np.arange(10, dtype=float),
+            "b": np.arange(10, 20),
+            "label": ["x"] * 10,
+        }
+    )
+    pq.write_table(table, path, row_group_size=4)
+
+    series = Serie.__from_parquet__(path=path, index_column="time")
+    assert list(series) == ["a", "b"], "Only numeric columns are read by default"
+    np.testing.assert_array_equal(series["b"].values, np.arange(10, 20))
+    np.testing.assert_array_equal(series["b"].index, np.arange(10))
+
+    chunks = list(Serie.__iter_parquet__(path=path, columns=["a"]))
+    assert [len(chunk["a"]) for chunk in chunks] == [4, 4, 2]
+    batches = list(Serie.__iter_parquet__(path=path, columns=["a"], batch_size=5))
+    np.testing.assert_array_equal(batches[1]["a"].values, np.arange(5.0, 10.0))
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from kl_evolution.core.data_objects.serie import Serie
+from kl_evolution.core.data_objects.serie_frame import SerieFrame
+
+
+def test_contiguous_2d_array_is_adopted_without_copy():
+    values = np.arange(12.0).reshape(3, 4)
+    frame = SerieFrame(values=values)
+    assert frame.values is values, "Values should not be copied"
+    assert (len(frame), frame.length) == (3, 4)
+
+
+def test_views_share_the_values_and_the_index():
+    frame = SerieFrame(
+        values=np.arange(12.0).reshape(3, 4),
+        index=[10, 11, 12, 13],
+        identifiers=["a", "b", "c"],
+    )
+
+    serie = frame["b"]
+    assert isinstance(serie, Serie)
+    assert np.shares_memory(serie.values, frame.values), "Rows should be views"
+    assert serie.index is frame.index, "The index should be shared"
+    assert serie.identifier == "b"
+    np.testing.assert_array_equal(frame[2].values, [8.0, 9.0, 10.0, 11.0])
+    assert [serie.identifier for serie in frame] == ["a", "b", "c"]
+
+
+def test_differencing_matches_serie_row_by_row():
+    values = np.random.default_rng(0).uniform(1, 10, (4, 30))
+    frame = SerieFrame(
+        values=values, detrend=True, deseasonalize=True, seasonal_period=7
+    )
+
+    for row, serie in zip(values, frame):
+        expected = Serie(
+            values=row, detrend=True, deseasonalize=True, seasonal_period=7
+        )
+        np.testing.assert_array_equal(serie.values, expected.values)
+        assert serie.detrend and serie.deseasonalize
+
+
+def test_statistics_are_computed_per_serie():
+    frame = SerieFrame(values=[[1.0, np.nan, 3.0], [4.0, 5.0, 6.0]])
+    np.testing.assert_array_equal(frame.__min__(), [1.0, 4.0])
+    np.testing.assert_array_equal(frame.__max__(), [3.0, 6.0])
+    np.testing.assert_array_equal(frame.__avg__(), [2.0, 5.0])
+    np.testing.assert_array_equal(frame.__std__(), [1.0, np.std([4.0, 5.0, 6.0])])
+
+
+def test_from_pandas_reads_the_numeric_columns():
+    dataframe = pd.DataFrame(
+        {"a": [1.0, 2.0], "b": [3, 4], "label": ["x", "y"]}, index=[5, 6]
+    )
+    frame = SerieFrame.__from_pandas__(dataframe)
+    assert frame.identifiers == ["a", "b"]
+    np.testing.assert_array_equal(frame.values, [[1.0, 2.0], [3.0, 4.0]])
+    np.testing.assert_array_equal(frame.index, [5, 6])
+
+
+def test_from_series_stacks_series_of_the_same_length():
+    frame = SerieFrame.__from_series__(
+        [Serie(values=[1, 2], identifier="a"), Serie(values=[3, 4])]
+    )
+    assert frame.identifiers == ["a", 1]
+    with pytest.raises(ValueError):
+        SerieFrame.__from_series__([Serie(values=[1, 2]), Serie(values=[3])])
+
+
+def test_values_should_be_2d():
+    with pytest.raises(ValueError):
+        SerieFrame(values=[1.0, 2.0])
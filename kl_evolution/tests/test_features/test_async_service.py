@@ -0,0 +1,132 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from kl_evolution.core.data_objects.serie import Serie
+from kl_evolution.core.features.async_service import AsyncKLService
+from kl_evolution.core.features.ts_analyzer import ShiftedSerieAnalyzer
+
+
+class SlowAnalyzer(ShiftedSerieAnalyzer):
+    """Counts its computations and how many run at once."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.calls = 0
+        self.running = 0
+        self.max_running = 0
+        self.lock = threading.Lock()
+
+    def compute(self, serie: Serie) -> Serie:
+        with self.lock:
+            self.calls += 1
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(0.05)
+        with self.lock:
+            self.running -= 1
+        return super().compute(serie=serie)
+
+
+class TestAsyncKLService:
+    def setup_method(self):
+        rng = np.random.default_rng(0)
+        self.series = [Serie(values=rng.uniform(1, 10, 200)) for _ in range(4)]
+        self.executor = ThreadPoolExecutor(max_workers=4)
+
+    def teardown_method(self):
+        self.executor.shutdown()
+
+    def test_analyze_should_match_compute(self):
+        analyzer = ShiftedSerieAnalyzer(max_horizon=10, normalized=False)
+        service = AsyncKLService()
+
+        result = asyncio.run(service.analyze(serie=self.series[0], analyzer=analyzer))
+
+        np.testing.assert_array_equal(
+            result.values, analyzer.compute(self.series[0]).values
+        )
+
+    def test_duplicate_requests_should_share_one_computation(self):
+        analyzer = SlowAnalyzer(max_horizon=10, normalized=False)
+        service = AsyncKLService(executor=self.executor)
+        same_values = Serie(values=self.series[0].values.copy())
+
+        async def requests():
+            return await asyncio.gather(
+                service.analyze(serie=self.series[0], analyzer=analyzer),
+                service.analyze(serie=same_values, analyzer=analyzer),
+                service.analyze(serie=self.series[1], analyzer=analyzer),
+            )
+
+        first, duplicate, other = asyncio.run(requests())
+
+        assert analyzer.calls == 2
+        assert first is duplicate
+        assert other is not first
+        assert service.in_flight == 0
+
+    def test_requests_differing_by_long_lags_or_serie_should_not_be_shared(self):
+        serie = Serie(values=np.random.default_rng(1).uniform(1, 10, 3000))
+        lags = np.arange(2, 3000, 2)
+        other_lags = lags.copy()
+        other_lags[700] += 1
+        analyzers = [
+            ShiftedSerieAnalyzer(max_horizon=None, lags=lags, normalized=False),
+            ShiftedSerieAnalyzer(max_horizon=None, lags=other_lags, normalized=False),
+        ]
+        renamed = Serie(values=serie.values, identifier="renamed")
+        service = AsyncKLService(executor=self.executor)
+
+        async def requests():
+            return await asyncio.gather(
+                service.analyze(serie=serie, analyzer=analyzers[0]),
+                service.analyze(serie=serie, analyzer=analyzers[1]),
+                service.analyze(serie=renamed, analyzer=analyzers[0]),
+            )
+
+        first, other_lags_result, renamed_result = asyncio.run(requests())
+
+        assert other_lags_result is not first
+        assert renamed_result is not first
+        np.testing.assert_array_equal(other_lags_result.index, other_lags)
+
+    def test_concurrency_should_be_capped(self):
+        analyzer = SlowAnalyzer(max_horizon=10, normalized=False)
+        service = AsyncKLService(executor=self.executor, max_concurrency=2)
+
+        async def requests():
+            return await asyncio.gather(
+                *(
+                    service.analyze(serie=serie, analyzer=analyzer)
+                    for serie in self.series
+                )
+            )
+
+        asyncio.run(requests())
+        assert analyzer.calls == 4
+        assert analyzer.max_running == 2
+
+    def test_evaluate_forecast_should_return_scores(self):
+        service = AsyncKLService()
+        forecast = Serie(values=self.series[2].values[:50], identifier="model")
+
+        scores = asyncio.run(
+            service.evaluate_forecast(
+                train_set=self.series[0],
+                test_set=Serie(values=self.series[1].values[:50]),
+                forecasts=[forecast],
+                seasonal_period=12,
+            )
+        )
+
+        assert list(scores) == [
+            "uniform",
+            "white_noise",
+            "random_walk",
+            "naive",
+            "seasonal_naive",
+            "model",
+        ]
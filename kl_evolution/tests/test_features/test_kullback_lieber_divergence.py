@@ -50,3 +50,156 @@ class TestDKL:
         q = Serie(values=[1, np.nan, 3, 4])
         dkl = KLDivergence.compute(p=p, q=q)
         assert dkl > 0, "DKL should be positive and omit nan values"
+
+    def test_compute_batch_should_match_compute_row_by_row(self):
+        p = np.array([[1, 2, 3], [0, 0, 0], [1, 2, 3], [np.nan, 1, 2]])
+        q = np.array([[3, 2, 1], [1, 2, 3], [0, 0, 0], [1, np.nan, 3]])
+        dkl = KLDivergence.compute_batch(p=p, q=q)
+        expected = [
+            KLDivergence.compute(p=Serie(values=p_row), q=Serie(values=q_row))
+            for p_row, q_row in zip(p, q)
+        ]
+        np.testing.assert_allclose(dkl, expected, rtol=1e-12)
+
+    def test_compute_batch_should_broadcast_p(self):
+        p = np.array([1.0, 2.0, 3.0])
+        q = np.array([[3.0, 2.0, 1.0], [1.0, 2.0, 3.0]])
+        dkl = KLDivergence.compute_batch(p=p, q=q)
+        assert dkl.shape == (2,), "One divergence per row of q"
+        assert dkl[1] == 0.0, "DKL should be 0 when p is equal to q"
+
+    def test_compute_prefixes_should_match_compute_on_each_prefix(self):
+        p = np.array([[0, 1, 2, np.nan, 3, 5], [1, 2, 3, 4, 5, 6], [1, 1, -2, 3, 1, 2]])
+        q = np.array([[1, 2, 0, 4, np.nan, 1], [6, 5, 4, 3, 2, 1], [2, 1, 1, 3, 4, 1]])
+        for p_row, q_row in zip(p, q):
+            dkl = KLDivergence.compute_prefixes(p=p_row, q=q_row)
+            expected = [
+                KLDivergence.compute(
+                    p=Serie(values=p_row[:size]), q=Serie(values=q_row[:size])
+                )
+                for size in range(1, len(p_row) + 1)
+            ]
+            np.testing.assert_allclose(dkl, expected, rtol=1e-9, atol=1e-12)
+
+    def test_compute_prefixes_should_handle_each_row_on_its_own(self):
+        rng = np.random.default_rng(0)
+        p = rng.choice([-2.0, -1.0, 0.0, 1.0, 2.0, 3.0, np.nan], size=(200, 8))
+        q = rng.choice([-2.0, -1.0, 0.0, 1.0, 2.0, 3.0, np.nan], size=(200, 8))
+        p[::2], q[::2] = np.abs(p[::2]), np.abs(q[::2])
+
+        dkl = KLDivergence.compute_prefixes(p=p, q=q)
+
+        with np.errstate(invalid="ignore"):
+            expected = np.stack(
+                [
+                    KLDivergence.compute_batch(p=p[:, :size], q=q[:, :size])
+                    for size in range(1, 9)
+                ],
+                axis=-1,
+            )
+        np.testing.assert_allclose(dkl, expected, rtol=1e-9, atol=1e-12)
+
+    def test_compute_prefixes_should_handle_prefixes_summing_to_zero(self):
+        rng = np.random.default_rng(1)
+        p = rng.choice([-1.0, 0.0, 1.0], size=(300, 10))
+        q = rng.choice([-1.0, 0.0, 1.0], size=(300, 10))
+        q[0] = np.tile([1.0, -1.0], 5)
+
+        dkl = KLDivergence.compute_prefixes(p=p, q=q)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            expected = np.stack(
+                [
+                    KLDivergence.compute_batch(p=p[:, :size], q=q[:, :size])
+                    for size in range(1, 11)
+                ],
+                axis=-1,
+            )
+        np.testing.assert_allclose(dkl, expected, rtol=1e-9, atol=1e-12)
+
+    def test_compute_by_chunks_should_match_compute(self):
+        for p_values, q_values in [
+            ([np.nan, 1, 2, 3, 0], [1, np.nan, 3, 4, 2]),
+            ([1, 2, 3], [0, 0, 0]),
+            ([0, 0, 0], [1, 2, 3]),
+            ([-1, 2, 3], [1, 2, -3]),
+        ]:
+            p, q = Serie(values=p_values), Serie(values=q_values)
+            np.testing.assert_allclose(
+                KLDivergence.compute(p=p, q=q, chunk_size=2),
+                KLDivergence.compute(p=p, q=q),
+                rtol=1e-12,
+            )
+
+    def test_histogram_estimator_should_return_zero_when_p_is_q(self):
+        p = Serie(values=np.random.randn(100))
+        dkl = KLDivergence.compute(p=p, q=p, estimator="histogram", bins=10)
+        assert dkl == 0.0, "DKL should be 0 when p is equal to q"
+
+    def test_histogram_estimator_should_be_finite_for_negative_values(self):
+        p = Serie(values=np.random.randn(100))
+        q = Serie(values=np.random.randn(100) + 1)
+        dkl = KLDivergence.compute(p=p, q=q, estimator="histogram", bins=10)
+        assert 0 < dkl < float("inf"), "DKL should be positive and finite"
+
+    def test_serie_zeroed_then_filled_in_place_should_not_return_stale_result(self):
+        p = Serie(values=np.zeros(5))
+        q = Serie(values=[1, 2, 3, 4, 5])
+        assert KLDivergence.compute(p=p, q=q) == 0.0
+
+        p.values[:] = [5, 1, 1, 1, 1]
+        assert KLDivergence.compute(p=p, q=q) > 0, "DKL should follow the new values"
+
+
+class TestDKLCache:
+    def setup_method(self):
+        KLDivergence.enable_cache(maxsize=2)
+
+    def teardown_method(self):
+        KLDivergence.disable_cache()
+
+    def test_repeated_computation_should_hit_the_cache(self):
+        p = Serie(values=[1, 2, 3])
+        q = Serie(values=[3, 2, 1])
+        first_dkl = KLDivergence.compute(p=p, q=q)
+        second_dkl = KLDivergence.compute(p=Serie(values=[1, 2, 3]), q=q)
+
+        assert first_dkl == second_dkl, "Cached DKL should be returned"
+        assert KLDivergence.cache_info()["hits"] == 1
+        assert KLDivergence.cache_info()["misses"] == 1
+
+    def test_mutated_values_should_not_return_stale_result(self):
+        p = Serie(values=[1, 2, 3])
+        q = Serie(values=[1, 2, 3])
+        assert KLDivergence.compute(p=p, q=q) == 0.0
+
+        q.values[0] = 5.0
+        dkl = KLDivergence.compute(p=p, q=q)
+        assert dkl > 0, "DKL should be recomputed after mutation"
+        assert KLDivergence.cache_info()["hits"] == 0
+
+    def test_serie_zeroed_then_filled_in_place_should_not_return_stale_result(self):
+        p = Serie(values=np.zeros(5))
+        q = Serie(values=[1, 2, 3, 4, 5])
+        assert KLDivergence.compute(p=p, q=q) == 0.0
+
+        p.values[:] = [5, 1, 1, 1, 1]
+        expected = KLDivergence.compute(p=Serie(values=[5, 1, 1, 1, 1]), q=q)
+        assert KLDivergence.compute(p=p, q=q) == expected > 0
+
+    def test_options_should_be_part_of_the_key(self):
+        p = Serie(values=[1, 2, 3])
+        q = Serie(values=[3, 2, 1])
+        KLDivergence.compute(p=p, q=q)
+        KLDivergence.compute(p=p, q=q, estimator="histogram", bins=2)
+        assert KLDivergence.cache_info()["misses"] == 2
+
+    def test_cache_should_be_bounded(self):
+        p = Serie(values=[1, 2, 3])
+        for last_value in range(4, 8):
+            KLDivergence.compute(p=p, q=Serie(values=[1, 2, last_value]))
+        assert KLDivergence.cache_info()["size"] == 2
+
+    def test_disabled_cache_should_report_zeros(self):
+        KLDivergence.disable_cache()
+        assert KLDivergence.cache_info()["size"] == 0
@@ -0,0 +1,177 @@
+import numpy as np
+import pytest
+
+from kl_evolution.core.data_objects.serie import Serie
+from kl_evolution.core.features.kl_divergence import KLDivergence
+from kl_evolution.core.features.lag_kl_divergence import LagKLDivergence
+
+
+def reference_kl_for_lags(values, lags):
+    serie = Serie(values=values)
+    return np.array(
+        [
+            KLDivergence.compute(p=serie, q=Serie(values=values).shift(shift=lag))
+            for lag in lags
+        ]
+    )
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        np.random.default_rng(0).uniform(1, 10, 200),
+        [np.nan, 1.0, 2.0, np.nan, 4.0, 0.0, 3.0, 2.0, np.nan, 1.0],
+        [0.0, 0.0, 0.0, 1.0, 2.0, 3.0],
+        [1.0, 2.0, 3.0, 0.0, 0.0, 0.0],
+        [-1.0, 2.0, -3.0, 4.0, 1.0, -2.0],
+        [0.0, 0.0, 0.0, 0.0],
+    ],
+)
+def test_it_should_match_kl_on_shifted_series(values):
+    lags = np.arange(1, len(values) + 3)
+    np.testing.assert_allclose(
+        LagKLDivergence.compute(values=values, lags=lags),
+        reference_kl_for_lags(values=values, lags=lags),
+        rtol=1e-9,
+        atol=1e-12,
+    )
+
+
+def test_it_should_not_depend_on_block_size():
+    values = np.random.default_rng(1).uniform(1, 10, 100)
+    lags = np.arange(1, 50)
+    np.testing.assert_allclose(
+        LagKLDivergence.compute(values=values, lags=lags, block_elements=1),
+        LagKLDivergence.compute(values=values, lags=lags),
+        rtol=1e-12,
+    )
+
+
+def test_it_should_accept_non_consecutive_lags():
+    values = np.random.default_rng(2).uniform(1, 10, 100)
+    lags = np.array([7, 1, 30, 2])
+    np.testing.assert_allclose(
+        LagKLDivergence.compute(values=values, lags=lags),
+        reference_kl_for_lags(values=values, lags=lags),
+        rtol=1e-9,
+        atol=1e-12,
+    )
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        np.random.default_rng(3).uniform(1, 10, 300),
+        [np.nan, 1.0, 2.0, np.nan, 4.0, 0.0, 3.0, 2.0, np.nan, 1.0],
+        [0.0, 0.0, 0.0, 1.0, 2.0, 3.0],
+        [1.0, 2.0, 3.0, 0.0, 0.0, 0.0],
+        [-1.0, 2.0, -3.0, 4.0, 1.0, -2.0],
+    ],
+)
+def test_fft_method_should_match_direct_method(values):
+    lags = np.arange(1, len(values) + 3)
+    np.testing.assert_allclose(
+        LagKLDivergence.compute(values=values, lags=lags, method="fft"),
+        LagKLDivergence.compute(values=values, lags=lags, method="direct"),
+        rtol=1e-9,
+        atol=1e-12,
+    )
+
+
+def test_unknown_method_should_raise_error():
+    with pytest.raises(ValueError):
+        LagKLDivergence.compute(values=[1.0, 2.0], lags=[1], method="unknown")
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        np.random.default_rng(4).uniform(1, 10, 300),
+        [np.nan, 1.0, 2.0, np.nan, 4.0, 0.0, 3.0, 2.0, np.nan, 1.0],
+        [0.0, 0.0, 0.0, 1.0, 2.0, 3.0],
+        [1.0, 2.0, 3.0, 0.0, 0.0, 0.0],
+        [-1.0, 2.0, -3.0, 4.0, 1.0, -2.0],
+        [0.0, 0.0, 0.0, 0.0],
+    ],
+)
+@pytest.mark.parametrize("chunk_size", [1, 3, 1000])
+def test_chunked_computation_should_match_in_memory_computation(values, chunk_size):
+    lags = np.arange(1, len(values) + 3)
+    np.testing.assert_allclose(
+        LagKLDivergence.compute_chunked(
+            values=np.asarray(values), lags=lags, chunk_size=chunk_size
+        ),
+        LagKLDivergence.compute(values=values, lags=lags),
+        rtol=1e-9,
+        atol=1e-12,
+    )
+
+
+def reference_histogram_kl_for_lags(values, lags, bins):
+    values = np.asarray(values, dtype=float)
+    edges = KLDivergence.histogram_edges(values=values, bins=bins)
+    kl_divergences = []
+    for lag in lags:
+        p, q = values[lag:], values[: len(values) - lag]
+        kept = ~np.isnan(p) & ~np.isnan(q)
+        p_counts, _ = np.histogram(np.clip(p[kept], edges[0], edges[-1]), bins=edges)
+        q_counts, _ = np.histogram(np.clip(q[kept], edges[0], edges[-1]), bins=edges)
+        kl_divergences.append(
+            KLDivergence.histogram_divergence(p_counts=p_counts, q_counts=q_counts)
+        )
+    return np.array(kl_divergences)
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        np.random.default_rng(5).normal(0, 1, 500),
+        np.concatenate([[np.nan] * 3, np.random.default_rng(6).normal(0, 1, 200)]),
+        np.where(
+            np.random.default_rng(7).uniform(size=200) < 0.1,
+            np.nan,
+            np.random.default_rng(8).normal(0, 1, 200),
+        ),
+    ],
+)
+def test_histogram_estimator_should_match_binning_each_lag(values):
+    lags = np.arange(1, 40)
+    np.testing.assert_allclose(
+        LagKLDivergence.compute_histogram(values=values, lags=lags, bins=16),
+        reference_histogram_kl_for_lags(values=values, lags=lags, bins=16),
+        rtol=1e-12,
+    )
+
+
+def test_histogram_estimator_should_not_depend_on_the_scale():
+    values = np.random.default_rng(9).normal(0, 1, 300)
+    lags = np.arange(1, 20)
+    np.testing.assert_allclose(
+        LagKLDivergence.compute_histogram(values=values, lags=lags),
+        LagKLDivergence.compute_histogram(values=3 * values + 1000, lags=lags),
+        rtol=1e-9,
+    )
+
+
+def test_histogram_estimator_should_be_infinite_beyond_the_serie():
+    kl_divergences = LagKLDivergence.compute_histogram(
+        values=[1.0, 2.0, 3.0], lags=[1, 3]
+    )
+    assert np.isfinite(kl_divergences[0]) and np.isinf(kl_divergences[1])
+
+
+@pytest.mark.parametrize("method", ["direct", "fft"])
+def test_2d_values_should_match_each_row(method):
+    values = np.random.default_rng(0).uniform(0, 10, (4, 50))
+    values[1, 3] = np.nan
+    values[2, :10] = 0.0
+    values[3, 5] = -1.0
+    lags = [1, 2, 5, 20]
+
+    result = LagKLDivergence.compute(values, lags=lags, method=method)
+
+    assert result.shape == (4, 4)
+    for row, expected in zip(values, result):
+        np.testing.assert_allclose(
+            LagKLDivergence.compute(row, lags=lags, method=method), expected
+        )
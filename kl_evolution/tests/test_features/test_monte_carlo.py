@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from kl_evolution.core.features.kl_divergence import KLDivergence
+from kl_evolution.core.features.monte_carlo import MonteCarloKL
+
+
+class TestMonteCarloKL:
+    def setup_method(self):
+        rng = np.random.default_rng(0)
+        self.p = rng.uniform(1, 10, 500)
+        self.p[[3, 40]] = [np.nan, 0.0]
+
+    def draws(self, low: float = 1.0):
+        return lambda generator, n: generator.uniform(low, 10, size=(n, len(self.p)))
+
+    def test_estimate_should_be_the_mean_of_the_draws(self):
+        estimate = MonteCarloKL.estimate(
+            p=self.p, draw=self.draws(), n_draws=50, seed=1
+        )
+
+        divergences = KLDivergence.compute_batch(
+            p=self.p, q=self.draws()(np.random.default_rng(1), 50)
+        )
+        assert estimate.mean == pytest.approx(divergences.mean(), rel=1e-9)
+        half_width = 1.959963984540054 * divergences.std(ddof=1) / np.sqrt(50)
+        assert estimate.high - estimate.mean == pytest.approx(half_width, rel=1e-6)
+        assert estimate.low < estimate.mean < estimate.high
+
+    def test_blocks_should_not_change_the_estimate(self, monkeypatch):
+        whole = MonteCarloKL.estimate(p=self.p, draw=self.draws(), n_draws=20, seed=2)
+        monkeypatch.setattr(MonteCarloKL, "BLOCK_ELEMENTS", 3 * len(self.p))
+        blocks = MonteCarloKL.estimate(p=self.p, draw=self.draws(), n_draws=20, seed=2)
+
+        assert blocks.mean == pytest.approx(whole.mean, rel=1e-12)
+        assert blocks.high == pytest.approx(whole.high, rel=1e-9)
+
+    def test_negative_draws_should_match_compute_batch(self):
+        estimate = MonteCarloKL.estimate(
+            p=self.p, draw=self.draws(low=-1.0), n_draws=10, seed=3
+        )
+        divergences = KLDivergence.compute_batch(
+            p=self.p, q=self.draws(low=-1.0)(np.random.default_rng(3), 10)
+        )
+        assert estimate.mean == np.mean(divergences) == np.inf
+
+    def test_each_distribution_should_get_its_estimate(self):
+        p = np.stack([self.p, self.p[::-1], 2 * self.p])
+        estimate = MonteCarloKL.estimate(
+            p=p,
+            draw=lambda generator, n: generator.uniform(1, 10, size=(3, n, p.shape[1])),
+            n_draws=30,
+            seed=4,
+        )
+
+        assert estimate.mean.shape == (3,)
+        single = MonteCarloKL.estimate(p=self.p, draw=self.draws(), n_draws=30, seed=4)
+        assert estimate.mean[2] == pytest.approx(estimate.mean[0], rel=0.2)
+        assert single.mean == pytest.approx(estimate.mean[0], rel=0.2)
+
+    def test_no_draw_raise_exception(self):
+        with pytest.raises(ValueError):
+            MonteCarloKL.estimate(p=self.p, draw=self.draws(), n_draws=0)
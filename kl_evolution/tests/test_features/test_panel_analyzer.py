@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from kl_evolution.core.data_objects.serie import Serie
+from kl_evolution.core.features.panel_analyzer import PanelAnalyzer
+from kl_evolution.core.features.ts_analyzer import ShiftedSerieAnalyzer
+
+
+@pytest.fixture
+def series():
+    rng = np.random.default_rng(0)
+    return [
+        Serie(values=rng.uniform(1, 10, size), identifier=f"serie_{size}")
+        for size in range(20, 60, 4)
+    ] + [Serie(values=rng.uniform(1, 10, 50), detrend=True)]
+
+
+def test_compute_many_in_pool_should_match_serial_computation(series):
+    analyzer = ShiftedSerieAnalyzer(max_horizon=5, normalized=False)
+    panel = PanelAnalyzer(
+        analyzer=analyzer, n_workers=2, chunk_size=3, min_parallel_points=0
+    )
+    results = panel.compute_many(series)
+
+    assert len(results) == len(series), "Should return one result per serie"
+    for serie, result in zip(series, results):
+        np.testing.assert_allclose(
+            result.values, analyzer.compute(serie=serie).values, rtol=1e-12
+        )
+
+
+def test_compute_many_in_pool_should_keep_the_lags_as_index(series):
+    analyzer = ShiftedSerieAnalyzer(max_horizon=None, lags=[2, 4], normalized=False)
+    serial = PanelAnalyzer(analyzer=analyzer, n_workers=1).compute_many(series)
+    pooled = PanelAnalyzer(
+        analyzer=analyzer, n_workers=2, chunk_size=3, min_parallel_points=0
+    ).compute_many(series)
+
+    for serial_result, pooled_result in zip(serial, pooled):
+        np.testing.assert_array_equal(pooled_result.index, [2, 4])
+        np.testing.assert_array_equal(pooled_result.index, serial_result.index)
+        np.testing.assert_allclose(
+            pooled_result.values, serial_result.values, rtol=1e-12
+        )
+
+
+def test_compute_many_should_not_modify_series(series):
+    original_values = [serie.values.copy() for serie in series]
+    panel = PanelAnalyzer(
+        analyzer=ShiftedSerieAnalyzer(max_horizon=5),
+        n_workers=2,
+        chunk_size=3,
+        min_parallel_points=0,
+    )
+    panel.compute_many(series)
+
+    for serie, values in zip(series, original_values):
+        np.testing.assert_array_equal(serie.values, values)
+
+
+def test_small_inputs_should_be_computed_serially(series, monkeypatch):
+    panel = PanelAnalyzer(analyzer=ShiftedSerieAnalyzer(max_horizon=5), n_workers=2)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("The pool should not be started")
+
+    monkeypatch.setattr(
+        "kl_evolution.core.features.panel_analyzer.ProcessPoolExecutor", fail
+    )
+    assert len(panel.compute_many(series)) == len(series)
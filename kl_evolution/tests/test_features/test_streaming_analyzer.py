@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from kl_evolution.core.data_objects.serie import Serie
+from kl_evolution.core.features.streaming_analyzer import (
+    StreamingShiftedSerieAnalyzer,
+)
+from kl_evolution.core.features.ts_analyzer import ShiftedSerieAnalyzer
+
+
+def observations(size: int, negative: bool = False) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    values = rng.uniform(-5 if negative else 0, 10, size)
+    values[rng.integers(0, size, size // 10)] = np.nan
+    values[rng.integers(0, size, size // 10)] = 0.0
+    return values
+
+
+@pytest.mark.parametrize("negative", [False, True])
+@pytest.mark.parametrize("resync_every", [None, 1000])
+def test_stream_should_match_batch_compute_on_each_window(negative, resync_every):
+    values = observations(size=120, negative=negative)
+    streaming = StreamingShiftedSerieAnalyzer(
+        window_size=30, max_horizon=8, resync_every=resync_every
+    )
+    batch = ShiftedSerieAnalyzer(max_horizon=8, normalized=False)
+
+    results = list(streaming.stream(values))
+
+    assert len(results) == len(values) - 30 + 1, "Should yield once the window is full"
+    for end, result in enumerate(results, start=30):
+        expected = batch.compute(Serie(values=values[end - 30 : end]))
+        np.testing.assert_allclose(
+            result.values, expected.values, rtol=1e-8, atol=1e-12
+        )
+        np.testing.assert_array_equal(result.index, expected.index)
+
+
+def test_negative_value_expiring_after_a_resync_should_leave_no_trace():
+    values = [1.0, -1.0, 2.0, 3.0, 1.0, 2.0, 4.0]
+    streaming = StreamingShiftedSerieAnalyzer(window_size=4, max_horizon=2)
+    batch = ShiftedSerieAnalyzer(max_horizon=2, normalized=False)
+
+    results = list(streaming.stream(values))
+
+    np.testing.assert_allclose(
+        results[-1].values,
+        batch.compute(Serie(values=values[-4:])).values,
+        rtol=1e-8,
+    )
+    assert np.all(np.isfinite(results[-1].values))
+
+
+def test_current_should_work_before_the_window_is_full():
+    values = observations(size=10)
+    streaming = StreamingShiftedSerieAnalyzer(window_size=30, max_horizon=12)
+    for value in values:
+        streaming.update(value)
+
+    expected = ShiftedSerieAnalyzer(max_horizon=12, normalized=False).compute(
+        Serie(values=values)
+    )
+    np.testing.assert_allclose(
+        streaming.current().values, expected.values, rtol=1e-8, atol=1e-12
+    )
+
+
+def test_resync_should_not_change_the_results():
+    values = observations(size=100)
+    results = [
+        StreamingShiftedSerieAnalyzer(
+            window_size=20, max_horizon=5, resync_every=resync_every
+        ).stream(values)
+        for resync_every in (1, 7, 1000)
+    ]
+    for synced, partially_synced, unsynced in zip(*results):
+        np.testing.assert_allclose(synced.values, unsynced.values, rtol=1e-8)
+        np.testing.assert_allclose(partially_synced.values, unsynced.values, rtol=1e-8)
+
+
+def test_window_should_hold_the_last_observations():
+    streaming = StreamingShiftedSerieAnalyzer(window_size=3, max_horizon=1)
+    for value in [1.0, 2.0, 3.0, 4.0]:
+        streaming.update(value)
+    np.testing.assert_array_equal(streaming.window().values, [2.0, 3.0, 4.0])
@@ -1,8 +1,15 @@
+import os
+import tempfile
 import unittest
+from unittest.mock import patch
 import numpy as np
 
 from kl_evolution.core.data_objects.serie import Serie
+from kl_evolution.core.data_objects.serie_frame import SerieFrame
+from kl_evolution.core.features.kl_divergence import KLDivergence
+from kl_evolution.core.features.lag_kl_divergence import LagKLDivergence
 from kl_evolution.core.features.ts_analyzer import ShiftedSerieAnalyzer
+from kl_evolution.core.utils.result_store import ResultStore
 
 
 class TestShiftedSerieAnalyzerEndToEnd(unittest.TestCase):
@@ -17,6 +24,19 @@ class TestShiftedSerieAnalyzerEndToEnd(unittest.TestCase):
             all(isinstance(kl, np.float64) for kl in kl_divergences.values)
         ), "All values should be floats"
 
+    def test_kl_divergences_match_kl_on_shifted_series(self):
+        values = np.random.uniform(low=1, high=10, size=50)
+        serie = Serie(values=values, detrend=True)
+        analyzer = ShiftedSerieAnalyzer(max_horizon=10, normalized=False)
+        kl_divergences = analyzer.compute(serie)
+
+        offset_serie = Serie(values=serie.values + 1000)
+        expected = [
+            KLDivergence.compute(offset_serie, offset_serie.shift(shift=shift))
+            for shift in range(1, 11)
+        ]
+        np.testing.assert_allclose(kl_divergences.values, expected, rtol=1e-6)
+
     def test_kl_divergences_with_normalization(self):
         """
         We do not test that values are lte 1, since the random uniform distribution can be higher than the max value (i.e the informations contained about the future is worst than randomness)
@@ -30,6 +50,282 @@ class TestShiftedSerieAnalyzerEndToEnd(unittest.TestCase):
             all(isinstance(kl, np.float64) for kl in kl_divergences.values)
         ), "All values should be floats"
 
+    def test_fft_method_computes_the_full_curve_by_default(self):
+        serie = Serie(values=np.random.uniform(low=1, high=10, size=40))
+        kl_direct = ShiftedSerieAnalyzer(max_horizon=None, normalized=False).compute(
+            serie
+        )
+        kl_fft = ShiftedSerieAnalyzer(
+            max_horizon=None, normalized=False, method="fft"
+        ).compute(serie)
+
+        self.assertEqual(kl_fft.__len__(), 39), "Should go up to len(serie) - 1"
+        np.testing.assert_allclose(
+            kl_fft.values, kl_direct.values, rtol=1e-9, atol=1e-12
+        )
+
+    def test_chunked_computation_on_memory_mapped_serie(self):
+        values = np.random.uniform(low=1, high=10, size=100)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "values.npy")
+            np.save(path, values)
+            mapped_serie = Serie.__from_npy__(path=path)
+            kl_chunked = ShiftedSerieAnalyzer(
+                max_horizon=10, normalized=False, chunk_size=16
+            ).compute(mapped_serie)
+            normalized_kl_chunked = ShiftedSerieAnalyzer(
+                max_horizon=10, normalized=True, chunk_size=16
+            ).compute(mapped_serie)
+            del mapped_serie
+
+        kl_in_memory = ShiftedSerieAnalyzer(max_horizon=10, normalized=False).compute(
+            Serie(values=values)
+        )
+        np.testing.assert_allclose(kl_chunked.values, kl_in_memory.values, rtol=1e-9)
+        self.assertTrue(np.all(np.isfinite(normalized_kl_chunked.values)))
+
+    def test_histogram_estimator_leaves_detrended_serie_untouched(self):
+        serie = Serie(values=np.random.uniform(low=1, high=10, size=60), detrend=True)
+        values = serie.values.copy()
+        kl_divergences = ShiftedSerieAnalyzer(
+            max_horizon=5, estimator="histogram", bins=8
+        ).compute(serie)
+
+        self.assertEqual(kl_divergences.__len__(), 5), "Should have 5 KL divergences"
+        np.testing.assert_array_equal(serie.values, values)
+
+    def test_seeded_reference_is_reproducible_and_cached(self):
+        ShiftedSerieAnalyzer.REFERENCE_CACHE.clear()
+        serie = Serie(values=np.random.uniform(low=1, high=10, size=100))
+        analyzer = ShiftedSerieAnalyzer(max_horizon=5, reference="seeded", seed=3)
+
+        first_kl = analyzer.compute(serie)
+        second_kl = analyzer.compute(serie)
+
+        np.testing.assert_array_equal(first_kl.values, second_kl.values)
+        self.assertEqual(ShiftedSerieAnalyzer.REFERENCE_CACHE.hits, 1)
+
+    def test_analytic_reference_is_close_to_sampled_reference(self):
+        serie = Serie(values=np.random.uniform(low=1, high=10, size=100_000))
+        seeded_kl = ShiftedSerieAnalyzer(max_horizon=3, reference="seeded").compute(
+            serie
+        )
+        analytic_kl = ShiftedSerieAnalyzer(max_horizon=3, reference="analytic").compute(
+            serie
+        )
+
+        np.testing.assert_allclose(analytic_kl.values, seeded_kl.values, rtol=0.05)
+
+    def test_detrended_serie_is_not_mutated(self):
+        serie = Serie(values=np.random.uniform(low=1, high=10, size=200), detrend=True)
+        values = serie.values
+        values.flags.writeable = False
+
+        kl_divergences = ShiftedSerieAnalyzer(
+            max_horizon=10, normalized=True, reference="seeded"
+        ).compute(serie)
+
+        self.assertIs(serie.values, values)
+        expected = ShiftedSerieAnalyzer(
+            max_horizon=10, normalized=True, reference="seeded"
+        ).compute(Serie(values=values + ShiftedSerieAnalyzer.OFFSET))
+        np.testing.assert_allclose(kl_divergences.values, expected.values, rtol=1e-9)
+
+    def test_parallel_computation_matches_compute(self):
+        serie = Serie(values=np.random.uniform(low=1, high=10, size=500), detrend=True)
+        analyzer = ShiftedSerieAnalyzer(max_horizon=40, reference="seeded")
+
+        np.testing.assert_allclose(
+            analyzer.compute_parallel(serie, n_threads=4).values,
+            analyzer.compute(serie).values,
+            rtol=1e-12,
+        )
+
+    def test_configurations_run_over_a_shared_serie(self):
+        serie = Serie(values=np.random.uniform(low=1, high=10, size=500))
+        analyzers = [
+            ShiftedSerieAnalyzer(max_horizon=horizon, method=method, normalized=False)
+            for horizon in (5, 50)
+            for method in ("direct", "fft")
+        ]
+
+        results = ShiftedSerieAnalyzer.compute_configurations(
+            serie=serie, analyzers=analyzers, n_threads=4
+        )
+
+        self.assertEqual([len(result) for result in results], [5, 5, 50, 50])
+        np.testing.assert_allclose(
+            results[3].values, results[2].values, rtol=1e-9, atol=1e-12
+        )
+
+    def test_explicit_lags_are_the_index_of_the_results(self):
+        serie = Serie(values=np.random.uniform(low=1, high=10, size=300))
+        full = ShiftedSerieAnalyzer(max_horizon=100, normalized=False).compute(serie)
+        lags = ShiftedSerieAnalyzer.log_lags(max_horizon=100, n_lags=12)
+
+        sparse = ShiftedSerieAnalyzer(
+            max_horizon=100, normalized=False, lags=lags
+        ).compute(serie)
+
+        self.assertEqual(lags[0], 1)
+        self.assertEqual(lags[-1], 100)
+        np.testing.assert_array_equal(full.index, np.arange(1, 101))
+        np.testing.assert_array_equal(sparse.index, lags)
+        np.testing.assert_allclose(sparse.values, full.values[lags - 1], rtol=1e-12)
+
+    def test_refinement_densifies_the_steep_part_of_the_curve(self):
+        values = np.random.default_rng(0).uniform(low=1, high=2, size=2000)
+        values = values + np.sin(2 * np.pi * np.arange(2000) / 400) * 5 + 10
+        serie = Serie(values=values)
+        full = ShiftedSerieAnalyzer(max_horizon=200, normalized=False).compute(serie)
+
+        refined = ShiftedSerieAnalyzer(
+            max_horizon=200, normalized=False, refine_tolerance=0.05
+        ).compute(serie)
+
+        lags = np.asarray(refined.index)
+        self.assertLess(len(lags), 100)
+        np.testing.assert_allclose(refined.values, full.values[lags - 1], rtol=1e-12)
+        steps = np.abs(np.diff(refined.values))[np.diff(lags) > 1]
+        self.assertTrue(np.all(steps <= 0.05 * np.ptp(refined.values)))
+
+    def test_early_stopping_ends_on_the_plateau(self):
+        values = np.concatenate([np.linspace(1, 10, 100), np.full(900, 10.0)])
+        serie = Serie(values=values)
+        full = ShiftedSerieAnalyzer(max_horizon=500, normalized=False).compute(serie)
+
+        stopped = ShiftedSerieAnalyzer(
+            max_horizon=500,
+            normalized=False,
+            plateau_tolerance=0.01,
+            plateau_patience=3,
+        ).compute(serie)
+
+        lags = np.asarray(stopped.index)
+        self.assertLess(len(lags), 500)
+        np.testing.assert_array_equal(lags, np.arange(1, len(lags) + 1))
+        np.testing.assert_allclose(stopped.values, full.values[: len(lags)])
+        last_steps = np.abs(np.diff(stopped.values[-4:]))
+        self.assertTrue(np.all(last_steps <= 0.01 * np.abs(stopped.values[-4:-1])))
+
+    def test_store_extends_the_sums_of_an_appended_serie(self):
+        values = np.random.uniform(low=1, high=10, size=400)
+        values[[50, 390]] = np.nan
+        with tempfile.TemporaryDirectory() as directory:
+            store = ResultStore(directory=directory)
+            for method in ("direct", "fft"):
+                stored = ShiftedSerieAnalyzer(
+                    max_horizon=30, reference="seeded", method=method, store=store
+                )
+                for size in (300, 350, 400, 400):
+                    serie = Serie(values=values[:size], identifier=method)
+                    expected = ShiftedSerieAnalyzer(
+                        max_horizon=30, reference="seeded"
+                    ).compute(serie)
+                    np.testing.assert_allclose(
+                        stored.compute(serie).values, expected.values, rtol=1e-9
+                    )
+            self.assertEqual(len(store), 2)
+
+            with patch.object(
+                LagKLDivergence,
+                "sufficient_statistics",
+                wraps=LagKLDivergence.sufficient_statistics,
+            ) as sufficient_statistics:
+                stored.compute(Serie(values=np.append(values, 5.0), identifier="fft"))
+            self.assertEqual(sufficient_statistics.call_args.kwargs["start"], 400)
+
+    def test_store_keeps_unnamed_series_apart(self):
+        first, second = np.random.uniform(low=1, high=10, size=(2, 400))
+        with tempfile.TemporaryDirectory() as directory:
+            store = ResultStore(directory=directory)
+            analyzer = ShiftedSerieAnalyzer(max_horizon=10, store=store)
+            analyzer.compute(Serie(values=first[:300]))
+            analyzer.compute(Serie(values=second[:300]))
+            self.assertEqual(len(store), 2)
+
+            with patch.object(
+                LagKLDivergence,
+                "sufficient_statistics",
+                wraps=LagKLDivergence.sufficient_statistics,
+            ) as sufficient_statistics:
+                analyzer.compute(Serie(values=first))
+            self.assertEqual(sufficient_statistics.call_args.kwargs["start"], 300)
+
+    def test_store_recomputes_a_modified_serie(self):
+        values = np.random.uniform(low=1, high=10, size=200)
+        with tempfile.TemporaryDirectory() as directory:
+            analyzer = ShiftedSerieAnalyzer(
+                max_horizon=10,
+                normalized=False,
+                store=ResultStore(directory=directory),
+            )
+            analyzer.compute(Serie(values=values[:150], identifier="serie"))
+            modified = values.copy()
+            modified[0] = 100.0
+            kl_divergences = analyzer.compute(
+                Serie(values=modified, identifier="serie")
+            )
+
+        expected = ShiftedSerieAnalyzer(max_horizon=10, normalized=False).compute(
+            Serie(values=modified)
+        )
+        np.testing.assert_allclose(kl_divergences.values, expected.values, rtol=1e-9)
+
+    def test_monte_carlo_reference_normalizes_by_the_mean_of_the_draws(self):
+        serie = Serie(values=np.random.uniform(low=1, high=10, size=500))
+        analyzer = ShiftedSerieAnalyzer(
+            max_horizon=10, reference="monte_carlo", n_draws=200, seed=3
+        )
+
+        estimate = analyzer.reference_estimate(serie)
+        raw = ShiftedSerieAnalyzer(max_horizon=10, normalized=False).compute(serie)
+
+        np.testing.assert_allclose(
+            analyzer.compute(serie).values, raw.values / estimate.mean, rtol=1e-12
+        )
+        self.assertEqual(estimate.n_draws, 200)
+        self.assertLess(estimate.high - estimate.low, 0.05 * estimate.mean)
+        with self.assertRaises(ValueError):
+            ShiftedSerieAnalyzer(
+                max_horizon=10, reference="monte_carlo", estimator="histogram"
+            )
+
+    def test_frame_matches_the_analysis_of_each_serie(self):
+        values = np.random.default_rng(0).uniform(low=1, high=10, size=(5, 120))
+        values[1, 7] = np.nan
+        values[2, :] -= 5
+        for options in (
+            {"normalized": False},
+            {"reference": "seeded"},
+            {"reference": "analytic"},
+            {"reference": "monte_carlo", "n_draws": 10},
+            {"reference": "seeded", "estimator": "histogram", "bins": 8},
+        ):
+            for detrend in (False, True):
+                frame = SerieFrame(
+                    values=values, identifiers=list("abcde"), detrend=detrend
+                )
+                analyzer = ShiftedSerieAnalyzer(max_horizon=12, **options)
+
+                result = analyzer.compute(frame)
+
+                self.assertIsInstance(result, SerieFrame)
+                self.assertEqual(result.identifiers, list("abcde"))
+                np.testing.assert_array_equal(result.index, np.arange(1, 13))
+                for row, serie in zip(result.values, frame):
+                    np.testing.assert_allclose(
+                        row, analyzer.compute(serie).values, rtol=1e-9
+                    )
+
+    def test_non_positive_lags_raise_exception(self):
+        with self.assertRaises(ValueError):
+            ShiftedSerieAnalyzer(max_horizon=3, lags=[0, 1, 2])
+
+    def test_unknown_reference_raise_exception(self):
+        with self.assertRaises(ValueError):
+            ShiftedSerieAnalyzer(max_horizon=3, reference="unknown")
+
     def test_empty_serie_raise_exception(self):
         serie = Serie(values=[])
         analyzer = ShiftedSerieAnalyzer(max_horizon=3, normalized=False)
@@ -0,0 +1,38 @@
+import json
+import subprocess
+import sys
+
+ANALYSIS_MODULES = (
+    "kl_evolution.core.data_objects.serie",
+    "kl_evolution.core.features.kl_divergence",
+    "kl_evolution.core.features.ts_analyzer",
+    "kl_evolution.core.results_formatting.evaluation",
+    "kl_evolution.core.results_formatting.plotter",
+)
+HEAVY_MODULES = ("matplotlib", "mplcyberpunk", "pandas", "scipy")
+IMPORT_TIME_BUDGET = 0.5
+
+SCRIPT = f"""
+import json, sys, time
+import numpy
+start = time.perf_counter()
+for module in {ANALYSIS_MODULES!r}:
+    __import__(module)
+print(json.dumps({{
+    "time": time.perf_counter() - start,
+    "loaded": [module for module in {HEAVY_MODULES!r} if module in sys.modules],
+}}))
+"""
+
+
+def test_analysis_api_imports_without_heavy_dependencies():
+    # a new interpreter, since the modules are already imported by the other tests
+    output = subprocess.run(
+        [sys.executable, "-c", SCRIPT], capture_output=True, text=True, check=True
+    ).stdout
+    result = json.loads(output)
+
+    assert result["loaded"] == [], "Heavy dependencies should be imported on first use"
+    assert (
+        result["time"] < IMPORT_TIME_BUDGET
+    ), f"Importing the analysis API took {result['time']:.3f}s"
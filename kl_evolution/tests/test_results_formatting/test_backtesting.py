@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from scipy.stats import entropy
+
+from kl_evolution.core.data_objects.serie import Serie
+from kl_evolution.core.results_formatting.backtesting import RollingOriginBacktest
+from kl_evolution.core.results_formatting.evaluation import ForecastEvaluation
+
+
+def last_week(train_values: np.ndarray, horizon: int) -> np.ndarray:
+    return train_values[-horizon:]
+
+
+@pytest.fixture
+def serie():
+    return Serie(values=np.random.default_rng(0).uniform(1, 10, 300))
+
+
+def test_run_should_evaluate_models_at_each_origin(serie):
+    origins = [100, 150, 200]
+    result = RollingOriginBacktest(horizon=24, seasonal_period=12, seed=0).run(
+        serie=serie, origins=origins, models={"last_week": last_week}
+    )
+
+    assert result.shape == (3, 6)
+    assert list(result.index) == origins
+    for origin in origins:
+        test_set = serie.values[origin : origin + 24]
+        assert result.loc[origin, "last_week"] == pytest.approx(
+            entropy(test_set, serie.values[origin - 24 : origin])
+        )
+        assert result.loc[origin, "naive"] == pytest.approx(
+            entropy(test_set, [serie.values[origin - 1]] * 24)
+        )
+
+
+def test_baselines_of_windows_with_nan_should_match_forecast_evaluation(serie):
+    values = serie.values.copy()
+    values[[120, 130]] = np.nan
+    origins = np.array([100, 110, 250])
+    forecasts = np.random.default_rng(1).uniform(1, 10, (3, 1, 24))
+
+    result = RollingOriginBacktest(horizon=24, seed=0).run(
+        serie=Serie(values=values), origins=origins, forecasts=forecasts
+    )
+
+    expected = ForecastEvaluation.evaluate_forecasts(
+        train_sets=[values[:origin] for origin in origins],
+        test_sets=np.array([values[origin : origin + 24] for origin in origins]),
+        forecasts=forecasts,
+        seed=0,
+    )
+    np.testing.assert_allclose(result.values, expected.values, rtol=1e-6)
+
+
+def test_parallel_run_should_match_serial_run(serie):
+    origins = np.arange(50, 270, 10)
+    forecasts = np.random.default_rng(1).uniform(1, 10, (len(origins), 2, 24))
+    serial = RollingOriginBacktest(horizon=24, seed=0).run(
+        serie=serie, origins=origins, forecasts=forecasts
+    )
+    parallel = RollingOriginBacktest(horizon=24, seed=0, n_workers=2).run(
+        serie=serie, origins=origins, forecasts=forecasts
+    )
+    np.testing.assert_allclose(parallel.values, serial.values)
+    assert list(serial.columns[-2:]) == ["model_0", "model_1"]
+
+
+def test_origins_should_leave_a_full_horizon(serie):
+    with pytest.raises(ValueError):
+        RollingOriginBacktest(horizon=24).run(serie=serie, origins=[290])
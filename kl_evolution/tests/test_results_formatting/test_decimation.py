@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from kl_evolution.core.results_formatting.decimation import Decimation
+
+
+@pytest.fixture
+def values():
+    return np.random.default_rng(0).normal(size=10_000).cumsum()
+
+
+def test_min_max_should_keep_the_extremes_of_each_bucket(values):
+    positions = Decimation.min_max(values=values, buckets=100)
+
+    assert len(positions) <= 200
+    assert np.all(np.diff(positions) > 0), "Positions should be sorted and unique"
+    for bucket in np.array_split(np.arange(len(values)), 100)[:5]:
+        assert values[bucket].min() in values[positions]
+    assert values[positions].max() == values.max()
+
+
+def test_min_max_should_ignore_nans(values):
+    values[:500] = np.nan
+    positions = Decimation.min_max(values=values, buckets=100)
+    assert np.nanmin(values) in values[positions]
+
+
+def test_lttb_should_keep_the_requested_number_of_points(values):
+    positions = Decimation.lttb(values=values, threshold=500)
+
+    assert len(positions) == 500
+    assert positions[0] == 0 and positions[-1] == len(values) - 1
+    assert np.all(np.diff(positions) > 0)
+
+
+def test_lttb_should_keep_spikes():
+    values = np.zeros(1000)
+    values[[123, 640]] = [5.0, -3.0]
+    positions = Decimation.lttb(values=values, threshold=20)
+    assert {123, 640} <= set(positions)
+
+
+def test_short_series_should_be_kept_whole():
+    values = np.arange(10.0)
+    np.testing.assert_array_equal(Decimation.min_max(values, buckets=10), values)
+    np.testing.assert_array_equal(Decimation.lttb(values, threshold=20), values)
+    with pytest.raises(ValueError):
+        Decimation.positions(values, width=5, method="unknown")
@@ -1,7 +1,9 @@
 import unittest
 from unittest.mock import MagicMock
 import numpy as np
-from kl_evolution.core.data_objects.serie import Serie
+from scipy.stats import entropy
+from kl_evolution.core.data_objects.serie import Serie, SerieStatistics
+from kl_evolution.core.data_objects.serie_frame import SerieFrame
 from kl_evolution.core.features.kl_divergence import KLDivergence
 from kl_evolution.core.results_formatting.evaluation import ForecastEvaluation
 
@@ -11,10 +13,9 @@ class TestForecastEvaluation(unittest.TestCase):
         self.test_set = MagicMock(spec=Serie)
         self.train_set = MagicMock(spec=Serie)
 
-        self.test_set.__min__.return_value = 1
-        self.test_set.__max__.return_value = 10
-        self.test_set.__avg__.return_value = 5.5
-        self.test_set.__std__.return_value = 2.0
+        self.test_set.statistics = SerieStatistics(
+            minimum=1, maximum=10, mean=5.5, std=2.0, nan_count=0, all_zero=False
+        )
         self.test_set.__len__.return_value = 100
         self.train_set.values = np.array([3, 4, 5, 6, 7])
         self.forecasts = [
@@ -77,3 +78,201 @@ class TestForecastEvaluation(unittest.TestCase):
         self.assertIn("naive", result)
         self.assertEqual(len(result), 4)
         self.assertEqual(KLDivergence.compute.call_count, 4)
+
+
+class TestBatchedForecastEvaluation(unittest.TestCase):
+    """
+    KLDivergence.compute is mocked by the tests above, expected values are computed with scipy directly.
+    """
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.train_sets = rng.uniform(1, 10, (3, 48))
+        self.test_sets = rng.uniform(1, 10, (3, 24))
+        self.forecasts = rng.uniform(1, 10, (3, 2, 24))
+
+    def test_models_and_baselines_are_evaluated_for_each_test_set(self):
+        result = ForecastEvaluation.evaluate_forecasts(
+            train_sets=self.train_sets,
+            test_sets=self.test_sets,
+            forecasts=self.forecasts,
+            model_names=["model_a", "model_b"],
+            seasonal_period=12,
+        )
+
+        self.assertEqual(result.shape, (3, 7))
+        self.assertEqual(
+            list(result.columns),
+            [
+                "uniform",
+                "white_noise",
+                "random_walk",
+                "naive",
+                "seasonal_naive",
+                "model_a",
+                "model_b",
+            ],
+        )
+        for row in range(3):
+            self.assertAlmostEqual(
+                result.loc[row, "model_b"],
+                entropy(self.test_sets[row], self.forecasts[row, 1]),
+            )
+            self.assertAlmostEqual(
+                result.loc[row, "naive"],
+                entropy(self.test_sets[row], [self.train_sets[row, -1]] * 24),
+            )
+            self.assertAlmostEqual(
+                result.loc[row, "seasonal_naive"],
+                entropy(
+                    self.test_sets[row],
+                    [self.train_sets[row, index % 12] for index in range(24)],
+                ),
+            )
+
+    def test_forecast_series_are_shared_by_all_test_sets(self):
+        forecast = Serie(values=self.forecasts[0, 0], identifier="shared")
+        result = ForecastEvaluation.evaluate_forecasts(
+            train_sets=self.train_sets,
+            test_sets=self.test_sets,
+            forecasts=[forecast],
+        )
+        self.assertEqual(list(result.columns)[-1], "shared")
+        self.assertAlmostEqual(
+            result.loc[2, "shared"], entropy(self.test_sets[2], forecast.values)
+        )
+
+    def test_baselines_are_reused_for_the_same_test_sets(self):
+        ForecastEvaluation.BASELINE_CACHE.clear()
+        first = ForecastEvaluation.evaluate_forecasts(
+            train_sets=self.train_sets,
+            test_sets=self.test_sets,
+            forecasts=self.forecasts,
+        )
+        second = ForecastEvaluation.evaluate_forecasts(
+            train_sets=self.train_sets,
+            test_sets=self.test_sets,
+            forecasts=self.forecasts[:, :1],
+        )
+        self.assertEqual(ForecastEvaluation.BASELINE_CACHE.hits, 1)
+        np.testing.assert_array_equal(
+            first["white_noise"].values, second["white_noise"].values
+        )
+
+    def test_normalized_results_are_relative_to_uniform(self):
+        result = ForecastEvaluation.evaluate_forecasts(
+            train_sets=Serie(values=self.train_sets[0]),
+            test_sets=Serie(values=self.test_sets[0], identifier="test"),
+            forecasts=self.forecasts[0],
+            normalize=True,
+        )
+        self.assertEqual(list(result.index), ["test"])
+        self.assertEqual(result.loc["test", "uniform"], 1.0)
+
+    def test_monte_carlo_baselines_come_with_confidence_intervals(self):
+        result = ForecastEvaluation.evaluate_forecasts(
+            train_sets=self.train_sets,
+            test_sets=self.test_sets,
+            forecasts=self.forecasts,
+            model_names=["model_a", "model_b"],
+            seed=0,
+            n_draws=400,
+        )
+
+        self.assertEqual(
+            list(result.columns)[-6:],
+            [
+                "uniform_low",
+                "white_noise_low",
+                "random_walk_low",
+                "uniform_high",
+                "white_noise_high",
+                "random_walk_high",
+            ],
+        )
+        generator = np.random.default_rng(0)
+        low = self.test_sets.min(axis=1, keepdims=True)[:, np.newaxis]
+        high = self.test_sets.max(axis=1, keepdims=True)[:, np.newaxis]
+        draws = generator.uniform(low=low, high=high, size=(3, 400, 24))
+        expected = [
+            np.mean([entropy(self.test_sets[row], draw) for draw in draws[row]])
+            for row in range(3)
+        ]
+        np.testing.assert_allclose(result["uniform"].values, expected, rtol=1e-9)
+        self.assertTrue(np.all(result["uniform_low"].values < result["uniform"].values))
+        self.assertTrue(
+            np.all(result["uniform"].values < result["uniform_high"].values)
+        )
+
+    def test_serie_frames_match_arrays(self):
+        test_frame = SerieFrame(
+            values=self.test_sets, identifiers=["first", "second", "third"]
+        )
+        result = ForecastEvaluation.evaluate_forecasts(
+            train_sets=SerieFrame(values=self.train_sets),
+            test_sets=test_frame,
+            forecasts=self.forecasts,
+        )
+        expected = ForecastEvaluation.evaluate_forecasts(
+            train_sets=self.train_sets,
+            test_sets=self.test_sets,
+            forecasts=self.forecasts,
+        )
+        self.assertEqual(list(result.index), ["first", "second", "third"])
+        np.testing.assert_allclose(result.values, expected.values)
+
+    def test_one_train_set_per_test_set_is_required(self):
+        with self.assertRaises(ValueError):
+            ForecastEvaluation.evaluate_forecasts(
+                train_sets=self.train_sets[:2],
+                test_sets=self.test_sets,
+                forecasts=self.forecasts,
+            )
+
+
+class TestForecastEvaluationByHorizon(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        self.train_set = Serie(values=rng.uniform(1, 10, 48))
+        self.test_set = Serie(values=rng.uniform(1, 10, 24))
+        self.forecast = Serie(values=rng.uniform(1, 10, 24), identifier="model")
+
+    def test_each_step_is_the_dkl_of_the_prefix(self):
+        result = ForecastEvaluation.evaluate_forecast_by_horizon(
+            train_set=self.train_set,
+            test_set=self.test_set,
+            forecasts=[self.forecast],
+            seasonal_period=12,
+        )
+
+        self.assertEqual(result.shape, (24, 6))
+        self.assertEqual(list(result.index), list(range(1, 25)))
+        for step in (1, 7, 24):
+            self.assertAlmostEqual(
+                result.loc[step, "model"],
+                entropy(self.test_set.values[:step], self.forecast.values[:step]),
+            )
+            self.assertAlmostEqual(
+                result.loc[step, "seasonal_naive"],
+                entropy(
+                    self.test_set.values[:step],
+                    self.train_set.values[np.arange(step) % 12],
+                ),
+            )
+
+    def test_last_step_matches_evaluate_forecasts(self):
+        curves = ForecastEvaluation.evaluate_forecast_by_horizon(
+            train_set=self.train_set,
+            test_set=self.test_set,
+            forecasts=np.array([self.forecast.values]),
+            normalize=True,
+            seed=0,
+        )
+        totals = ForecastEvaluation.evaluate_forecasts(
+            train_sets=self.train_set,
+            test_sets=self.test_set,
+            forecasts=np.array([self.forecast.values]),
+            normalize=True,
+            seed=0,
+        )
+        np.testing.assert_allclose(curves.iloc[-1].values, totals.iloc[0].values)
@@ -1,3 +1,5 @@
+import os
+import tempfile
 import unittest
 from unittest.mock import MagicMock, patch
 import numpy as np
@@ -17,6 +19,7 @@ class TestKLResultsPlotter(unittest.TestCase):
 
         self.kl_results.__avg__.return_value = 0.5
         self.kl_results.__len__.return_value = 10
+        self.kl_results.index = np.arange(1, 11)
         self.kl_results.values = np.random.rand(10)
 
     @patch("matplotlib.pyplot.savefig")
@@ -60,3 +63,60 @@ class TestKLResultsPlotter(unittest.TestCase):
 
         mock_savefig.assert_not_called()
         mock_show.assert_called_once()
+
+    @patch("matplotlib.pyplot.savefig")
+    @patch("matplotlib.pyplot.show")
+    def test_plot_kl_results_with_decimation(self, mock_show, mock_savefig):
+        KLResultsPlotter.plot_kl_results(
+            serie=self.series,
+            kl_results=self.kl_results,
+            decimation="lttb",
+        )
+
+        mock_show.assert_called_once()
+
+
+class TestKLResultsBatchPlotter(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.results = [
+            (
+                Serie(
+                    values=rng.normal(size=100_000).cumsum(), identifier=f"serie/{i}"
+                ),
+                Serie(values=rng.uniform(size=50)),
+            )
+            for i in range(3)
+        ]
+
+    def test_render_should_save_a_decimated_plot(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = KLResultsPlotter.render(
+                serie=self.results[0][0],
+                kl_results=self.results[0][1],
+                save_path=os.path.join(directory, "plot.png"),
+                figsize=(4, 3),
+                dpi=50,
+            )
+            self.assertGreater(os.path.getsize(path), 0)
+
+    def test_plot_many_should_save_one_image_per_serie(self):
+        with tempfile.TemporaryDirectory() as directory:
+            paths = KLResultsPlotter.plot_many(
+                results=self.results,
+                output_dir=os.path.join(directory, "plots"),
+                n_workers=2,
+                figsize=(4, 3),
+                dpi=50,
+            )
+            self.assertEqual(
+                [os.path.basename(path) for path in paths],
+                ["serie_0.png", "serie_1.png", "serie_2.png"],
+            )
+            self.assertTrue(all(os.path.exists(path) for path in paths))
+
+    def test_plot_many_should_reject_duplicate_names(self):
+        with self.assertRaises(ValueError):
+            KLResultsPlotter.plot_many(
+                results=self.results, output_dir="unused", file_names=["a", "a", "b"]
+            )
@@ -0,0 +1,22 @@
+import numpy as np
+
+from kl_evolution.core.utils.hashing import content_hash
+
+
+def test_equal_contents_have_equal_hashes():
+    assert content_hash(np.array([1.0, 2.0])) == content_hash(np.array([1.0, 2.0]))
+
+
+def test_hash_depends_on_values_and_dtype():
+    values = np.array([1.0, 2.0])
+    assert content_hash(values) != content_hash(np.array([1.0, 3.0]))
+    assert content_hash(values) != content_hash(values.astype(np.float32))
+
+
+def test_non_contiguous_arrays_can_be_hashed():
+    values = np.arange(10.0)
+    assert content_hash(values[::2]) == content_hash(values[::2].copy())
+
+
+def test_empty_arrays_can_be_hashed():
+    assert content_hash(np.empty((2, 0))) != content_hash(np.empty((3, 0)))
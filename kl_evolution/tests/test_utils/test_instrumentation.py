@@ -0,0 +1,53 @@
+import json
+
+import numpy as np
+
+from kl_evolution.core.data_objects.serie import Serie
+from kl_evolution.core.features.ts_analyzer import ShiftedSerieAnalyzer
+from kl_evolution.core.utils.instrumentation import Instrumentation, StageCollector
+
+
+def test_stage_is_a_shared_empty_context_without_hooks():
+    assert Instrumentation.stage("a") is Instrumentation.stage("b")
+
+
+def test_hooks_receive_a_record_per_stage():
+    records = []
+    Instrumentation.add_hook(records.append)
+    try:
+        with Instrumentation.stage("outer", items=3):
+            with Instrumentation.stage("inner"):
+                pass
+    finally:
+        Instrumentation.remove_hook(records.append)
+
+    assert [record.name for record in records] == ["inner", "outer"]
+    assert records[1].counts == {"items": 3}
+    assert records[1].duration >= records[0].duration
+    assert records[1].allocated is None, "Memory is only measured when traced"
+    assert not Instrumentation.HOOKS
+
+
+def test_collector_summarizes_analyzer_stages(tmp_path):
+    # the analytic reference keeps KLDivergence.compute, mocked by other tests, out of the run
+    serie = Serie(
+        values=np.random.default_rng(0).uniform(1, 10, 1000).cumsum(), detrend=True
+    )
+    with StageCollector(trace_memory=True) as collector:
+        ShiftedSerieAnalyzer(max_horizon=10, reference="analytic").compute(serie=serie)
+        ShiftedSerieAnalyzer(max_horizon=10, reference="analytic").compute(serie=serie)
+
+    summary = collector.summary()
+    assert list(summary) == [
+        "shifted_serie_analyzer.validation",
+        "shifted_serie_analyzer.shifts",
+        "shifted_serie_analyzer.normalization",
+    ]
+    assert summary["shifted_serie_analyzer.shifts"]["calls"] == 2
+    assert summary["shifted_serie_analyzer.shifts"]["counts"]["shifts"] == 20
+    assert summary["shifted_serie_analyzer.shifts"]["allocated"] >= 999 * 8
+    assert "shifted_serie_analyzer.shifts" in collector.report()
+
+    collector.dump(tmp_path / "summary.json")
+    dumped = json.loads((tmp_path / "summary.json").read_text())
+    assert dumped["shifted_serie_analyzer.validation"]["calls"] == 2
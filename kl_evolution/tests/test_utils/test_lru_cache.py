@@ -0,0 +1,36 @@
+import pytest
+
+from kl_evolution.core.utils.lru_cache import LRUCache
+
+
+def test_get_returns_cached_value_and_counts_hits():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    assert cache.get("a") == 1, "Cached value should be returned"
+    assert cache.get("b") is None, "Missing key should return the default"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert "a" in cache and "c" in cache, "Recently used entries should be kept"
+    assert "b" not in cache, "Least recently used entry should be evicted"
+    assert len(cache) == 2
+
+
+def test_clear_resets_entries_and_counters():
+    cache = LRUCache(maxsize=2)
+    cache.put("a", 1)
+    cache.get("a")
+    cache.clear()
+    assert len(cache) == 0 and cache.hits == 0 and cache.misses == 0
+
+
+def test_maxsize_should_be_positive():
+    with pytest.raises(ValueError):
+        LRUCache(maxsize=0)
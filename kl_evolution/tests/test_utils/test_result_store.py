@@ -0,0 +1,63 @@
+import os
+
+import numpy as np
+import pytest
+
+from kl_evolution.core.utils.result_store import ResultStore
+
+
+def test_put_then_get_returns_the_arrays_and_fingerprint(tmp_path):
+    store = ResultStore(directory=str(tmp_path))
+    store.put(
+        identifier="serie",
+        parameters="lags=1..3",
+        fingerprint="abc",
+        length=10,
+        arrays={"sums": np.arange(3.0)},
+    )
+
+    entry = ResultStore(directory=str(tmp_path)).get(
+        identifier="serie", parameters="lags=1..3"
+    )
+
+    np.testing.assert_array_equal(entry["sums"], np.arange(3.0))
+    assert (entry["fingerprint"], entry["length"]) == ("abc", 10)
+    assert store.get(identifier="serie", parameters="lags=1..4") is None
+
+
+def test_put_replaces_the_entry(tmp_path):
+    store = ResultStore(directory=str(tmp_path))
+    for length in (10, 12):
+        store.put("serie", "p", "abc", length, {"sums": np.zeros(length)})
+
+    assert len(store) == 1
+    assert store.get("serie", "p")["length"] == 12
+
+
+def test_least_recently_used_entries_are_evicted_beyond_the_cap(tmp_path):
+    store = ResultStore(directory=str(tmp_path), max_bytes=10_000)
+    arrays = {"sums": np.zeros(500)}
+    store.put("a", "p", "fa", 500, arrays)
+    store.put("b", "p", "fb", 500, arrays)
+    store.get("a", "p")
+    store.put("c", "p", "fc", 500, arrays)
+
+    assert store.get("b", "p") is None, "Least recently used entry should be evicted"
+    assert store.get("a", "p") is not None and store.get("c", "p") is not None
+    assert store.size <= 10_000
+    assert len([f for f in os.listdir(tmp_path) if f.endswith(".npz")]) == 2
+
+
+def test_missing_file_is_a_miss(tmp_path):
+    store = ResultStore(directory=str(tmp_path))
+    store.put("a", "p", "fa", 1, {"sums": np.zeros(1)})
+    store.clear()
+
+    assert len(store) == 0
+    assert store.get("a", "p") is None
+    assert os.listdir(tmp_path) == [ResultStore.INDEX]
+
+
+def test_empty_store_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        ResultStore(directory=str(tmp_path), max_bytes=0)